@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import mimetypes
 import os
@@ -25,19 +26,31 @@ from config import (
     CONFIG_AUTHENTICATOR,
     CONFIG_CHAT_APPROACH,
     CONFIG_CHAT_HISTORY_CONTAINER_CLIENT,
+    CONFIG_CHAT_HISTORY_WRITER,
     CONFIG_CREDENTIAL,
+    CONFIG_EMBEDDING_CACHE,
     CONFIG_FEEDBACK_CONTAINER_CLIENT,
+    CONFIG_HTTP_SESSIONS,
     CONFIG_KEYVAULT_CLIENT,
     CONFIG_OPENAI_CLIENT,
+    CONFIG_RECOGNIZER_POOL,
     CONFIG_SEARCH_CLIENT,
     CONFIG_SPEECH_SERVICE_ID,
     CONFIG_SPEECH_SERVICE_LOCATION,
     CONFIG_SPEECH_SERVICE_TOKEN,
     CONFIG_SPEECH_TO_TEXT_SERVICE,
+    CONFIG_SPEECH_TOKEN_MANAGER,
     CONFIG_TEXT_TO_SPEECH_SERVICE,
+    CONFIG_TRANSLATOR,
+    CONFIG_TRANSLATOR_SERVICE_API_KEY,
+    CONFIG_TRANSLATOR_SERVICE_ENDPOINT,
+    CONFIG_TRANSLATOR_SERVICE_LOCATION,
     CONFIG_USER_DATABASE,
 )
+from core.answercache import AnswerCache
 from core.authentication import AuthenticationHelper
+from core.embeddingcache import EmbeddingCache, SQLiteEmbeddingCacheBackend
+from core.httpsessions import HTTPSessionRegistry
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
 from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
@@ -45,8 +58,19 @@ from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 from opentelemetry.instrumentation.openai import OpenAIInstrumentor
 from quart import Blueprint, Quart, current_app, redirect
 from quart_cors import cors
+from speech.audio_cache import AudioCache
+from speech.recognizer_pool import RecognizerPool
 from speech.speech_to_text import SpeechToText
 from speech.text_to_speech import TextToSpeech
+from speech.token_manager import SpeechTokenManager
+from speech.translate import Translator
+from utils.chat_history_store import (
+    AppendOnlyChatHistoryStore,
+    ChatHistoryStore,
+    CosmosChatHistoryStore,
+)
+from utils.chat_history_writer import ChatHistoryWriter
+from utils.utils import Utils
 
 bp = Blueprint("routes", __name__, static_folder="static/browser")
 # Fix Windows registry issue with mimetypes
@@ -71,6 +95,9 @@ async def setup_clients():
     AZURE_FEEDBACK_CONTAINER_ID = os.environ["AZURE_FEEDBACK_CONTAINER_ID"]
     AZURE_CHAT_HISTORY_DATABASE_ID = os.environ["AZURE_CHAT_HISTORY_DATABASE_ID"]
     AZURE_CHAT_HISTORY_CONTAINER_ID = os.environ["AZURE_CHAT_HISTORY_CONTAINER_ID"]
+    CHAT_HISTORY_WRITE_QUEUE_SIZE = int(os.getenv("CHAT_HISTORY_WRITE_QUEUE_SIZE", 1000))
+    # "session" keeps each session in one item, "append" stores each turn as its own item
+    AZURE_CHAT_HISTORY_STORAGE_MODE = os.getenv("AZURE_CHAT_HISTORY_STORAGE_MODE", "session").lower()
     AZURE_SEARCH_SERVICE = os.environ["AZURE_SEARCH_SERVICE"]
     AZURE_SEARCH_INDEX = os.environ["AZURE_SEARCH_INDEX"]
     # Shared by all OpenAI deployments
@@ -78,6 +105,13 @@ async def setup_clients():
     OPENAI_CHATGPT_MODEL = os.environ["AZURE_OPENAI_CHATGPT_MODEL"]
     OPENAI_EMB_MODEL = os.getenv("AZURE_OPENAI_EMB_MODEL_NAME", "text-embedding-ada-002")
     OPENAI_EMB_DIMENSIONS = int(os.getenv("AZURE_OPENAI_EMB_DIMENSIONS", 1536))
+    AZURE_OPENAI_EMB_CACHE_MAX_ENTRIES = int(os.getenv("AZURE_OPENAI_EMB_CACHE_MAX_ENTRIES", 1024))
+    AZURE_OPENAI_EMB_CACHE_TTL = float(os.getenv("AZURE_OPENAI_EMB_CACHE_TTL", 24 * 60 * 60))
+    AZURE_OPENAI_EMB_CACHE_SQLITE_PATH = os.getenv("AZURE_OPENAI_EMB_CACHE_SQLITE_PATH")
+    CHAT_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_ANSWER_CACHE_MAX_ENTRIES", 256))
+    CHAT_ANSWER_CACHE_TTL = float(os.getenv("CHAT_ANSWER_CACHE_TTL", 60 * 60))
+    CHAT_ANSWER_CACHE_SIMILARITY_THRESHOLD = os.getenv("CHAT_ANSWER_CACHE_SIMILARITY_THRESHOLD")
+    USE_SPECULATIVE_EMBEDDING = os.getenv("USE_SPECULATIVE_EMBEDDING", "").lower() == "true"
     # Used with Azure OpenAI deployments
     APIM_GATEWAY_URL = os.getenv("APIM_GATEWAY_URL")
     AZURE_OPENAI_CHATGPT_DEPLOYMENT = (
@@ -91,6 +125,8 @@ async def setup_clients():
     AZURE_ENFORCE_ACCESS_CONTROL = os.getenv("AZURE_ENFORCE_ACCESS_CONTROL", "").lower() == "true"
     AZURE_ENABLE_GLOBAL_DOCUMENT_ACCESS = os.getenv("AZURE_ENABLE_GLOBAL_DOCUMENT_ACCESS", "").lower() == "true"
     AZURE_ENABLE_UNAUTHENTICATED_ACCESS = os.getenv("AZURE_ENABLE_UNAUTHENTICATED_ACCESS", "").lower() == "true"
+    AZURE_AUTH_GROUPS_CACHE_TTL = float(os.getenv("AZURE_AUTH_GROUPS_CACHE_TTL", 300))
+    AZURE_AUTH_GROUPS_CACHE_MAX_ENTRIES = int(os.getenv("AZURE_AUTH_GROUPS_CACHE_MAX_ENTRIES", 1024))
     AZURE_SERVER_APP_ID = os.getenv("AZURE_SERVER_APP_ID")
     AZURE_SERVER_APP_SECRET = os.getenv("AZURE_SERVER_APP_SECRET")
     AZURE_CLIENT_APP_ID = os.getenv("AZURE_CLIENT_APP_ID")
@@ -104,8 +140,33 @@ async def setup_clients():
 
     AZURE_SPEECH_SERVICE_ID = os.getenv("AZURE_SPEECH_SERVICE_ID")
     AZURE_SPEECH_SERVICE_LOCATION = os.getenv("AZURE_SPEECH_SERVICE_LOCATION")
+    AZURE_SPEECH_SYNTHESIS_MAX_WORKERS = int(os.getenv("AZURE_SPEECH_SYNTHESIS_MAX_WORKERS", 8))
+    AZURE_SPEECH_SYNTHESIZERS_PER_VOICE = int(os.getenv("AZURE_SPEECH_SYNTHESIZERS_PER_VOICE", 2))
+    AZURE_SPEECH_AUDIO_CACHE_MAX_ENTRIES = int(os.getenv("AZURE_SPEECH_AUDIO_CACHE_MAX_ENTRIES", 256))
+    AZURE_SPEECH_AUDIO_CACHE_DIR = os.getenv("AZURE_SPEECH_AUDIO_CACHE_DIR")
+    AZURE_SPEECH_AUDIO_CACHE_MAX_DISK_MB = int(os.getenv("AZURE_SPEECH_AUDIO_CACHE_MAX_DISK_MB", 512))
+    AZURE_SPEECH_RECOGNIZERS_MIN = int(os.getenv("AZURE_SPEECH_RECOGNIZERS_MIN", 2))
+    AZURE_SPEECH_RECOGNIZERS_MAX_IDLE = int(os.getenv("AZURE_SPEECH_RECOGNIZERS_MAX_IDLE", 8))
+    AZURE_SPEECH_RECOGNIZER_IDLE_TIMEOUT = float(os.getenv("AZURE_SPEECH_RECOGNIZER_IDLE_TIMEOUT", 5 * 60))
+    AZURE_SPEECH_TOKEN_REFRESH_AHEAD = float(os.getenv("AZURE_SPEECH_TOKEN_REFRESH_AHEAD", 10 * 60))
+    # The translator is optional, and only set up when a key is configured
+    AZURE_TRANSLATOR_SERVICE_API_KEY = os.getenv("AZURE_TRANSLATOR_SERVICE_API_KEY")
+    AZURE_TRANSLATOR_SERVICE_ENDPOINT = os.getenv(
+        "AZURE_TRANSLATOR_SERVICE_ENDPOINT", "https://api.cognitive.microsofttranslator.com"
+    )
+    AZURE_TRANSLATOR_SERVICE_LOCATION = os.getenv("AZURE_TRANSLATOR_SERVICE_LOCATION", AZURE_SPEECH_SERVICE_LOCATION)
+    AZURE_TRANSLATOR_MEMORY_SIZE = int(os.getenv("AZURE_TRANSLATOR_MEMORY_SIZE", 1024))
+    LANGUAGE_DETECTOR_PRELOAD = os.getenv("LANGUAGE_DETECTOR_PRELOAD", "true").lower() == "true"
+    LANGUAGE_DETECTOR_LOW_ACCURACY = os.getenv("LANGUAGE_DETECTOR_LOW_ACCURACY", "").lower() == "true"
+
+    HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", 100))
+    HTTP_CONNECTION_LIMIT_PER_HOST = int(os.getenv("HTTP_CONNECTION_LIMIT_PER_HOST", 20))
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
 
     AZURE_KEY_VAULT_ENDPOINT = os.environ["AZURE_KEY_VAULT_ENDPOINT"]
+    AZURE_KEY_VAULT_SECRET_CACHE_TTL = float(os.getenv("AZURE_KEY_VAULT_SECRET_CACHE_TTL", 5 * 60))
+    AZURE_KEY_VAULT_SECRET_REFRESH_AHEAD = float(os.getenv("AZURE_KEY_VAULT_SECRET_REFRESH_AHEAD", 60))
+    JWT_SECRET_KEY_GRACE_PERIOD = os.getenv("JWT_SECRET_KEY_GRACE_PERIOD")
 
     # Use the current user identity to authenticate with Azure OpenAI, AI Search and Blob Storage (no secrets needed,
     # just use 'az login' locally, and managed identity when deployed on Azure). If you need to use keys, use separate AzureKeyCredential instances with the
@@ -130,6 +191,25 @@ async def setup_clients():
     chat_history_database_client = cosmos_client.get_database_client(AZURE_CHAT_HISTORY_DATABASE_ID)
     chat_history_container_client = chat_history_database_client.get_container_client(AZURE_CHAT_HISTORY_CONTAINER_ID)
     current_app.config[CONFIG_CHAT_HISTORY_CONTAINER_CLIENT] = chat_history_container_client
+    chat_history_store: ChatHistoryStore
+    if AZURE_CHAT_HISTORY_STORAGE_MODE == "append":
+        chat_history_store = AppendOnlyChatHistoryStore(chat_history_container_client)
+    elif AZURE_CHAT_HISTORY_STORAGE_MODE == "session":
+        chat_history_store = CosmosChatHistoryStore(chat_history_container_client)
+    else:
+        raise ValueError(f"Unknown chat history storage mode: {AZURE_CHAT_HISTORY_STORAGE_MODE}")
+    # Chat history is stored in the background so responses do not wait for Cosmos DB
+    chat_history_writer = ChatHistoryWriter(chat_history_store, max_queue_size=CHAT_HISTORY_WRITE_QUEUE_SIZE)
+    chat_history_writer.start()
+    current_app.config[CONFIG_CHAT_HISTORY_WRITER] = chat_history_writer
+
+    # Outbound HTTP calls share sessions so they reuse connections instead of opening one per call
+    http_sessions = HTTPSessionRegistry(
+        limit=HTTP_CONNECTION_LIMIT,
+        limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    current_app.config[CONFIG_HTTP_SESSIONS] = http_sessions
 
     # Set up authentication helper
     search_index = None
@@ -150,6 +230,9 @@ async def setup_clients():
         require_access_control=AZURE_ENFORCE_ACCESS_CONTROL,
         enable_global_documents=AZURE_ENABLE_GLOBAL_DOCUMENT_ACCESS,
         enable_unauthenticated_access=AZURE_ENABLE_UNAUTHENTICATED_ACCESS,
+        http_sessions=http_sessions,
+        groups_cache_ttl=AZURE_AUTH_GROUPS_CACHE_TTL,
+        groups_cache_max_entries=AZURE_AUTH_GROUPS_CACHE_MAX_ENTRIES,
     )
 
     # Used by the OpenAI SDK
@@ -161,8 +244,6 @@ async def setup_clients():
         raise ValueError("Azure speech resource not configured correctly, missing AZURE_SPEECH_SERVICE_LOCATION")
     current_app.config[CONFIG_SPEECH_SERVICE_ID] = AZURE_SPEECH_SERVICE_ID
     current_app.config[CONFIG_SPEECH_SERVICE_LOCATION] = AZURE_SPEECH_SERVICE_LOCATION
-    # Wait until token is needed to fetch for the first time
-    current_app.config[CONFIG_SPEECH_SERVICE_TOKEN] = None
     current_app.config[CONFIG_CREDENTIAL] = azure_credential
 
     if OPENAI_HOST.startswith("azure"):
@@ -184,6 +265,28 @@ async def setup_clients():
     current_app.config[CONFIG_SEARCH_CLIENT] = search_client
     current_app.config[CONFIG_AUTH_CLIENT] = auth_helper
 
+    # Query embeddings are cached in the process, and shared between workers through SQLite if a path is given
+    embedding_cache_backend = (
+        SQLiteEmbeddingCacheBackend(AZURE_OPENAI_EMB_CACHE_SQLITE_PATH) if AZURE_OPENAI_EMB_CACHE_SQLITE_PATH else None
+    )
+    embedding_cache = EmbeddingCache(
+        max_size=AZURE_OPENAI_EMB_CACHE_MAX_ENTRIES, ttl=AZURE_OPENAI_EMB_CACHE_TTL, backend=embedding_cache_backend
+    )
+    current_app.config[CONFIG_EMBEDDING_CACHE] = embedding_cache
+
+    # Answers to single-turn questions from the general profile are reused, optionally for similar questions
+    answer_cache = (
+        AnswerCache(
+            max_size=CHAT_ANSWER_CACHE_MAX_ENTRIES,
+            ttl=CHAT_ANSWER_CACHE_TTL,
+            similarity_threshold=(
+                float(CHAT_ANSWER_CACHE_SIMILARITY_THRESHOLD) if CHAT_ANSWER_CACHE_SIMILARITY_THRESHOLD else None
+            ),
+        )
+        if CHAT_ANSWER_CACHE_MAX_ENTRIES > 0
+        else None
+    )
+
     # Various approaches to integrate GPT and external knowledge, most applications will use a single one of these patterns
     # or some derivative, here we include several for exploration purposes
     current_app.config[CONFIG_ASK_APPROACH] = RetrieveThenReadApproach(
@@ -199,6 +302,7 @@ async def setup_clients():
         content_field=KB_FIELDS_CONTENT,
         query_language=AZURE_SEARCH_QUERY_LANGUAGE,
         query_speller=AZURE_SEARCH_QUERY_SPELLER,
+        embedding_cache=embedding_cache,
     )
 
     current_app.config[CONFIG_CHAT_APPROACH] = ChatReadRetrieveReadApproach(
@@ -214,25 +318,87 @@ async def setup_clients():
         content_field=KB_FIELDS_CONTENT,
         query_language=AZURE_SEARCH_QUERY_LANGUAGE,
         query_speller=AZURE_SEARCH_QUERY_SPELLER,
+        embedding_cache=embedding_cache,
+        answer_cache=answer_cache,
+        use_speculative_embedding=USE_SPECULATIVE_EMBEDDING,
     )
 
-    # Create Speech services
-    tts = await TextToSpeech.create()
+    # Build the language detector before the first "spoken" request, loading the models off the event loop
+    await asyncio.to_thread(
+        Utils.configure_language_detector,
+        preload=LANGUAGE_DETECTOR_PRELOAD,
+        low_accuracy=LANGUAGE_DETECTOR_LOW_ACCURACY,
+    )
+
+    # Create Speech services, which keep using the speech token refreshed in the background
+    speech_token_manager = SpeechTokenManager(
+        azure_credential, AZURE_SPEECH_SERVICE_ID, refresh_ahead=AZURE_SPEECH_TOKEN_REFRESH_AHEAD
+    )
+    await speech_token_manager.start()
+    current_app.config[CONFIG_SPEECH_SERVICE_TOKEN] = speech_token_manager.token
+    current_app.config[CONFIG_SPEECH_TOKEN_MANAGER] = speech_token_manager
+    audio_cache = (
+        AudioCache(
+            max_entries=AZURE_SPEECH_AUDIO_CACHE_MAX_ENTRIES,
+            directory=AZURE_SPEECH_AUDIO_CACHE_DIR,
+            max_disk_bytes=AZURE_SPEECH_AUDIO_CACHE_MAX_DISK_MB * 1024 * 1024,
+        )
+        if AZURE_SPEECH_AUDIO_CACHE_MAX_ENTRIES > 0 or AZURE_SPEECH_AUDIO_CACHE_DIR
+        else None
+    )
+    tts = await TextToSpeech.create(
+        max_workers=AZURE_SPEECH_SYNTHESIS_MAX_WORKERS,
+        synthesizers_per_voice=AZURE_SPEECH_SYNTHESIZERS_PER_VOICE,
+        audio_cache=audio_cache,
+    )
     stt = await SpeechToText.create()
     current_app.config[CONFIG_TEXT_TO_SPEECH_SERVICE] = tts
     current_app.config[CONFIG_SPEECH_TO_TEXT_SERVICE] = stt
+    recognizer_pool = RecognizerPool(
+        await stt.getSpeechConfig(),
+        min_size=AZURE_SPEECH_RECOGNIZERS_MIN,
+        max_idle=AZURE_SPEECH_RECOGNIZERS_MAX_IDLE,
+        idle_timeout=AZURE_SPEECH_RECOGNIZER_IDLE_TIMEOUT,
+    )
+    await recognizer_pool.start()
+    current_app.config[CONFIG_RECOGNIZER_POOL] = recognizer_pool
+    speech_token_manager.subscribe(tts.updateAuthToken)
+    speech_token_manager.subscribe(recognizer_pool.updateAuthToken)
+
+    current_app.config[CONFIG_TRANSLATOR] = None
+    if AZURE_TRANSLATOR_SERVICE_API_KEY:
+        current_app.config[CONFIG_TRANSLATOR_SERVICE_API_KEY] = AZURE_TRANSLATOR_SERVICE_API_KEY
+        current_app.config[CONFIG_TRANSLATOR_SERVICE_ENDPOINT] = AZURE_TRANSLATOR_SERVICE_ENDPOINT
+        current_app.config[CONFIG_TRANSLATOR_SERVICE_LOCATION] = AZURE_TRANSLATOR_SERVICE_LOCATION
+        current_app.config[CONFIG_TRANSLATOR] = Translator(
+            session=http_sessions.get_session(), memory_size=AZURE_TRANSLATOR_MEMORY_SIZE
+        )
 
     # Setup for Authentication
     current_app.config[CONFIG_KEYVAULT_CLIENT] = SecretClient(
         vault_url=AZURE_KEY_VAULT_ENDPOINT, credential=azure_credential
     )
-    current_app.config[CONFIG_USER_DATABASE] = AccountAuthenticator()
-    current_app.config[CONFIG_AUTHENTICATOR] = JWTAuthenticator()
+    current_app.config[CONFIG_USER_DATABASE] = AccountAuthenticator(
+        secret_ttl=AZURE_KEY_VAULT_SECRET_CACHE_TTL, secret_refresh_ahead=AZURE_KEY_VAULT_SECRET_REFRESH_AHEAD
+    )
+    current_app.config[CONFIG_AUTHENTICATOR] = JWTAuthenticator(
+        secret_ttl=AZURE_KEY_VAULT_SECRET_CACHE_TTL,
+        secret_refresh_ahead=AZURE_KEY_VAULT_SECRET_REFRESH_AHEAD,
+        grace_period=float(JWT_SECRET_KEY_GRACE_PERIOD) if JWT_SECRET_KEY_GRACE_PERIOD else None,
+    )
 
 
 @bp.after_app_serving
 async def close_clients():
+    await current_app.config[CONFIG_CHAT_HISTORY_WRITER].close()
     await current_app.config[CONFIG_SEARCH_CLIENT].close()
+    await current_app.config[CONFIG_EMBEDDING_CACHE].close()
+    await current_app.config[CONFIG_HTTP_SESSIONS].close()
+    current_app.config[CONFIG_TEXT_TO_SPEECH_SERVICE].close()
+    if current_app.config[CONFIG_TRANSLATOR] is not None:
+        await current_app.config[CONFIG_TRANSLATOR].close()
+    await current_app.config[CONFIG_RECOGNIZER_POOL].close()
+    await current_app.config[CONFIG_SPEECH_TOKEN_MANAGER].close()
 
 
 def create_app():
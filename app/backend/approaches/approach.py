@@ -13,7 +13,6 @@ from typing import (
 )
 from urllib.parse import urljoin
 
-import aiohttp
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import (
     QueryCaptionResult,
@@ -22,6 +21,8 @@ from azure.search.documents.models import (
     VectorQuery,
 )
 from core.authentication import AuthenticationHelper
+from core.embeddingcache import EmbeddingCache
+from core.httpsessions import HTTPSessionRegistry, client_session
 from models.profile import Profile
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
@@ -95,6 +96,11 @@ class ThoughtStep:
 
 
 class Approach(ABC):
+    # Shared cache of query embeddings, or None to call the embeddings API for every query
+    embedding_cache: Optional[EmbeddingCache] = None
+    # Shared HTTP sessions of the app, or None to open a session for every call to the vision API
+    http_sessions: Optional[HTTPSessionRegistry] = None
+
     def __init__(
         self,
         search_client: SearchClient,
@@ -241,13 +247,22 @@ class Approach(ABC):
         dimensions_args: ExtraArgs = (
             {"dimensions": self.embedding_dimensions} if SUPPORTED_DIMENSIONS_MODEL[self.embedding_model] else {}
         )
-        embedding = await self.openai_client.embeddings.create(
-            # Azure OpenAI takes the deployment name as the model name
-            model=self.embedding_deployment if self.embedding_deployment else self.embedding_model,
-            input=q,
-            **dimensions_args,
-        )
-        query_vector = embedding.data[0].embedding
+
+        async def create_embedding() -> List[float]:
+            embedding = await self.openai_client.embeddings.create(
+                # Azure OpenAI takes the deployment name as the model name
+                model=self.embedding_deployment if self.embedding_deployment else self.embedding_model,
+                input=q,
+                **dimensions_args,
+            )
+            return embedding.data[0].embedding
+
+        if self.embedding_cache is not None:
+            query_vector = await self.embedding_cache.get_or_compute(
+                self.embedding_model, dimensions_args.get("dimensions"), q, create_embedding
+            )
+        else:
+            query_vector = await create_embedding()
         # See: https://github.com/Azure/azure-search-vector-samples/blob/main/demo-python/code/e2e-demos/azure-ai-search-e2e-build-demo.ipynb
         return VectorizedQuery(vector=query_vector, k_nearest_neighbors=50, fields="embedding")
 
@@ -259,7 +274,7 @@ class Approach(ABC):
 
         headers["Authorization"] = "Bearer " + await self.vision_token_provider()
 
-        async with aiohttp.ClientSession() as session:
+        async with client_session(self.http_sessions) as session:
             async with session.post(
                 url=endpoint, params=params, headers=headers, json=data, raise_for_status=True
             ) as response:
@@ -1,11 +1,15 @@
 import json
 import re
+import time
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, Optional
+from dataclasses import replace
+from typing import Any, AsyncGenerator, List, Optional
 
 from approaches.approach import Approach
+from core.answercache import AnswerCache, CachedAnswer
 from models.profile import Profile
 from openai.types.chat import ChatCompletion, ChatCompletionMessageParam
+from opentelemetry import trace
 
 
 class ChatApproach(Approach, ABC):
@@ -18,6 +22,8 @@ class ChatApproach(Approach, ABC):
         {"role": "assistant", "content": ""},
     ]
     NO_RESPONSE = "0"
+    # Cache of answers to single-turn questions from the general profile, or None to always generate the answer
+    answer_cache: Optional[AnswerCache] = None
 
     # follow_up_questions_prompt_content = """Generate 3 very brief follow-up questions that the user would likely ask next.
     # Enclose the follow-up questions in double angle brackets. Example:
@@ -111,6 +117,26 @@ class ChatApproach(Approach, ABC):
         auth_claims: dict[str, Any],
         session_state: Any = None,
     ) -> AsyncGenerator[dict, None]:
+        # Single-turn questions from the general profile do not depend on the user, so their answers can be reused
+        answer_cache: Optional[AnswerCache] = None
+        original_user_query = ""
+        query_embedding: Optional[List[float]] = None
+        user_content = messages[-1]["content"] if len(messages) == 1 else None
+        if self.answer_cache is not None and profile.profile_type == "general" and isinstance(user_content, str):
+            answer_cache = self.answer_cache
+            original_user_query = user_content
+            use_similarity = answer_cache.use_similarity
+            cached_answer = answer_cache.get(original_user_query, language, record_miss=not use_similarity)
+            if cached_answer is None and use_similarity:
+                # The question is only embedded when there is no answer to the same question
+                query_embedding = (await self.compute_text_embedding(original_user_query)).vector
+                cached_answer = answer_cache.get_similar(original_user_query, language, query_embedding)
+            answer_cache.record_stats(trace.get_current_span())
+            if cached_answer is not None:
+                async for event in self.replay_cached_answer(cached_answer, original_user_query, session_state):
+                    yield event
+                return
+
         extra_info, chat_coroutine = await self.run_until_final_call(
             messages, profile, language, auth_claims, should_stream=True
         )
@@ -118,28 +144,98 @@ class ChatApproach(Approach, ABC):
 
         followup_questions_started = False
         followup_content = ""
+        answer_content: List[str] = []
         async for event_chunk in await chat_coroutine:
             # "2023-07-01-preview" API version has a bug where first response has empty choices
-            event = event_chunk.model_dump()  # Convert pydantic model to dict
-            if event["choices"]:
-                completion = {"delta": event["choices"][0]["delta"]}
+            if event_chunk.choices:
+                # Read the delta attributes directly, this loop runs for every token so the chunk is not dumped to a dict
+                delta = event_chunk.choices[0].delta
+                content = delta.content or ""  # content may either not exist in delta, or explicitly be None
                 # if event contains << and not >>, it is start of follow-up question, truncate
-                content = completion["delta"].get("content")
-                content = content or ""  # content may either not exist in delta, or explicitly be None
                 if "<<" in content:
                     followup_questions_started = True
                     earlier_content = content[: content.index("<<")]
                     if earlier_content:
-                        completion["delta"]["content"] = earlier_content
-                        yield completion
+                        yield {"delta": {"role": delta.role, "content": earlier_content}}
+                        answer_content.append(earlier_content)
                     followup_content += content[content.index("<<") :]
                 elif followup_questions_started:
                     followup_content += content
                 else:
-                    yield completion
+                    answer_content.append(content)
+                    if delta.content is None and answer_cache is not None:
+                        # The response handler stops reading at the first chunk without content, so cache the answer now
+                        self.cache_answer(
+                            answer_cache, original_user_query, language, extra_info, answer_content, [], query_embedding
+                        )
+                    yield {"delta": {"role": delta.role, "content": delta.content}}
+        followup_questions: List[str] = []
         if followup_content:
             _, followup_questions = self.extract_followup_questions(followup_content)
             yield {"delta": {"role": "assistant"}, "context": {"followup_questions": followup_questions}}
+        if answer_cache is not None:
+            self.cache_answer(
+                answer_cache,
+                original_user_query,
+                language,
+                extra_info,
+                answer_content,
+                followup_questions,
+                query_embedding,
+            )
+
+    def cache_answer(
+        self,
+        answer_cache: AnswerCache,
+        query: str,
+        language: str,
+        extra_info: dict[str, Any],
+        answer_content: List[str],
+        followup_questions: List[str],
+        query_embedding: Optional[List[float]],
+    ):
+        cached_answer = CachedAnswer(
+            query=query,
+            language=language,
+            context=extra_info,
+            content="".join(answer_content),
+            followup_questions=followup_questions,
+        )
+        answer_cache.set(cached_answer, query_embedding)
+
+    async def replay_cached_answer(
+        self, cached_answer: CachedAnswer, query: str, session_state: Any = None
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Function to replay a cached answer with the same events as run_with_streaming
+
+        Args:
+            cached_answer (CachedAnswer): The cached answer to a question
+            query (str): The question asked by the user, which may differ slightly from the cached question
+            session_state (Any): The session state of the request
+
+        Returns:
+            AsyncGenerator[dict, None]: The context event, the answer in word chunks and the closing event
+        """
+        start_time = time.time()
+        thoughts = []
+        for thought in cached_answer.context.get("thoughts", []):
+            if thought.title == "Time taken":
+                thought = replace(thought, description=time.time() - start_time, props={"answer_cache": "hit"})
+            elif thought.title == "Original query":
+                thought = replace(thought, description=query)
+            elif thought.title in ("Total input tokens", "Total output tokens"):
+                thought = replace(thought, description=0)  # No tokens are used to replay an answer
+            thoughts.append(thought)
+        context = {**cached_answer.context, "thoughts": thoughts}
+        yield {"delta": {"role": "assistant"}, "context": context, "session_state": session_state}
+
+        for chunk in re.findall(r"\s*\S+\s*", cached_answer.content):
+            yield {"delta": {"role": None, "content": chunk}}
+        if cached_answer.followup_questions:
+            yield {"delta": {"role": "assistant"}, "context": {"followup_questions": cached_answer.followup_questions}}
+        else:
+            yield {"delta": {"role": None, "content": None}}
 
     async def run(
         self,
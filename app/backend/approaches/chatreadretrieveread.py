@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 from typing import Any, Coroutine, List, Literal, Optional, Union, overload
@@ -13,7 +14,9 @@ from approaches.prompts import (
 )
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import VectorQuery
+from core.answercache import AnswerCache
 from core.authentication import AuthenticationHelper
+from core.embeddingcache import EmbeddingCache
 from models.profile import Profile
 from openai import AsyncOpenAI, AsyncStream
 from openai.types.chat import (
@@ -27,6 +30,7 @@ from openai_messages_token_helper import (
     count_tokens_for_message,
     get_token_limit,
 )
+from text import normalize_query
 
 
 class ChatReadRetrieveReadApproach(ChatApproach):
@@ -51,6 +55,9 @@ class ChatReadRetrieveReadApproach(ChatApproach):
         content_field: str,
         query_language: str,
         query_speller: str,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        use_speculative_embedding: bool = False,
     ):
         self.search_client = search_client
         self.openai_client = openai_client
@@ -64,6 +71,12 @@ class ChatReadRetrieveReadApproach(ChatApproach):
         self.content_field = content_field
         self.query_language = query_language
         self.query_speller = query_speller
+        self.embedding_cache = embedding_cache
+        self.answer_cache = answer_cache
+        # Embed the raw user query while the search query is generated, and reuse the vector if the generated search
+        # query is the same after normalization. Saves an embedding round trip at the cost of an extra embedding call
+        # whenever the search query is rewritten, so it is off unless enabled.
+        self.use_speculative_embedding = use_speculative_embedding
         # See: https://github.com/pamelafox/openai-messages-token-helper/issues/16
         self.chatgpt_token_limit = get_token_limit(chatgpt_model)  # gpt-4o-mini not yet supported
 
@@ -77,6 +90,26 @@ class ChatReadRetrieveReadApproach(ChatApproach):
         {injected_prompt}
         """
 
+    async def get_query_embedding(
+        self, query_text: str, original_user_query: str, speculative_embedding: Optional[asyncio.Task[VectorQuery]]
+    ) -> VectorQuery:
+        """
+        Function to get the embedding of the search query, reusing the speculative embedding of the user query
+        when the generated search query is the same after normalization
+
+        Args:
+            query_text (str): The search query generated by the LLM
+            original_user_query (str): The query entered by the user
+            speculative_embedding (Optional[asyncio.Task[VectorQuery]]): The embedding of the user query, which was
+                started alongside the search query generation, or None if speculative embedding is disabled
+
+        Returns:
+            VectorQuery: The vector query for the search query
+        """
+        if speculative_embedding is not None and normalize_query(query_text) == normalize_query(original_user_query):
+            return await speculative_embedding
+        return await self.compute_text_embedding(query_text)
+
     @overload
     async def run_until_final_call(
         self,
@@ -207,47 +240,61 @@ class ChatReadRetrieveReadApproach(ChatApproach):
             max_tokens=self.chatgpt_token_limit - query_response_token_limit,
         )
 
-        chat_completion: ChatCompletion = await self.openai_client.chat.completions.create(
-            messages=query_messages,  # type: ignore
-            # Azure OpenAI takes the deployment name as the model name
-            model=self.chatgpt_deployment if self.chatgpt_deployment else self.chatgpt_model,
-            temperature=0.0,  # Minimize creativity for search query generation
-            max_tokens=query_response_token_limit,  # Setting too low risks malformed JSON, setting too high may affect performance
-            n=1,
-            tools=tools,
-            seed=seed,
-        )
-        total_input_tokens += chat_completion.usage.prompt_tokens
-        total_output_tokens += chat_completion.usage.completion_tokens
-        query_output = self.get_search_query(chat_completion, original_user_query)
-
-        if query_output == "False":
-            query_text = ""
-            sources_content = ""
-            results = ""
-            content = ""
-        else:
-            query_text = query_output
-            vectors: list[VectorQuery] = []
-            if use_vector_search:
-                vectors.append(await self.compute_text_embedding(query_text))
+        speculative_embedding: Optional[asyncio.Task[VectorQuery]] = None
+        if use_vector_search and self.use_speculative_embedding:
+            # Embed the raw query while the search query is generated, it is used if the search query is the same
+            speculative_embedding = asyncio.create_task(self.compute_text_embedding(original_user_query))
+            # Retrieve any exception so an unused embedding that failed is not reported as never retrieved
+            speculative_embedding.add_done_callback(lambda task: task.cancelled() or task.exception())
 
-            results = await self.search(
-                top,
-                query_text,
-                None,
-                vectors,
-                use_text_search,
-                use_vector_search,
-                use_semantic_ranker,
-                use_semantic_captions,
-                minimum_search_score,
-                minimum_reranker_score,
+        try:
+            chat_completion: ChatCompletion = await self.openai_client.chat.completions.create(
+                messages=query_messages,  # type: ignore
+                # Azure OpenAI takes the deployment name as the model name
+                model=self.chatgpt_deployment if self.chatgpt_deployment else self.chatgpt_model,
+                temperature=0.0,  # Minimize creativity for search query generation
+                max_tokens=query_response_token_limit,  # Setting too low risks malformed JSON, setting too high may affect performance
+                n=1,
+                tools=tools,
+                seed=seed,
             )
+            total_input_tokens += chat_completion.usage.prompt_tokens
+            total_output_tokens += chat_completion.usage.completion_tokens
+            query_output = self.get_search_query(chat_completion, original_user_query)
+
+            if query_output == "False":
+                query_text = ""
+                sources_content = ""
+                results = ""
+                content = ""
+            else:
+                query_text = query_output
+                vectors: list[VectorQuery] = []
+                if use_vector_search:
+                    vectors.append(
+                        await self.get_query_embedding(query_text, original_user_query, speculative_embedding)
+                    )
+
+                results = await self.search(
+                    top,
+                    query_text,
+                    None,
+                    vectors,
+                    use_text_search,
+                    use_vector_search,
+                    use_semantic_ranker,
+                    use_semantic_captions,
+                    minimum_search_score,
+                    minimum_reranker_score,
+                )
 
-            sources_content = self.get_sources_content(results, use_semantic_captions, use_image_citation=False)
+                sources_content = self.get_sources_content(results, use_semantic_captions, use_image_citation=False)
 
-            content = "\n".join(sources_content)
+                content = "\n".join(sources_content)
+        finally:
+            if speculative_embedding is not None:
+                # The search query was rewritten, no search was needed, or the query generation or search failed
+                speculative_embedding.cancel()
         print(f"query_text: {query_text}")
 
         # STEP 2: Generate a contextual and content specific answer using the search results and chat history
@@ -5,6 +5,7 @@ from approaches.chatapproach import ChatApproach
 from azure.search.documents.aio import SearchClient
 from azure.storage.blob.aio import ContainerClient
 from core.authentication import AuthenticationHelper
+from core.httpsessions import HTTPSessionRegistry
 from core.imageshelper import fetch_image
 from openai import AsyncOpenAI, AsyncStream
 from openai.types.chat import (
@@ -43,7 +44,8 @@ class ChatReadRetrieveReadVisionApproach(ChatApproach):
         query_language: str,
         query_speller: str,
         vision_endpoint: str,
-        vision_token_provider: Callable[[], Awaitable[str]]
+        vision_token_provider: Callable[[], Awaitable[str]],
+        http_sessions: Optional[HTTPSessionRegistry] = None,
     ):
         self.search_client = search_client
         self.blob_container_client = blob_container_client
@@ -62,6 +64,7 @@ class ChatReadRetrieveReadVisionApproach(ChatApproach):
         self.query_speller = query_speller
         self.vision_endpoint = vision_endpoint
         self.vision_token_provider = vision_token_provider
+        self.http_sessions = http_sessions
         self.chatgpt_token_limit = get_token_limit(gpt4v_model)
 
     @property
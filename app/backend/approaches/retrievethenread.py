@@ -4,6 +4,7 @@ from approaches.approach import Approach, ThoughtStep
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import VectorQuery
 from core.authentication import AuthenticationHelper
+from core.embeddingcache import EmbeddingCache
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
 from openai_messages_token_helper import build_messages, get_token_limit
@@ -52,6 +53,7 @@ info4.pdf: In-network institutions include Overlake, Swedish and others in the r
         content_field: str,
         query_language: str,
         query_speller: str,
+        embedding_cache: Optional[EmbeddingCache] = None,
     ):
         self.search_client = search_client
         self.chatgpt_deployment = chatgpt_deployment
@@ -66,6 +68,7 @@ info4.pdf: In-network institutions include Overlake, Swedish and others in the r
         self.content_field = content_field
         self.query_language = query_language
         self.query_speller = query_speller
+        self.embedding_cache = embedding_cache
         # See: https://github.com/pamelafox/openai-messages-token-helper/issues/16
         self.chatgpt_token_limit = get_token_limit(chatgpt_model)  # gpt-4o-mini not yet supported
 
@@ -4,6 +4,7 @@ from approaches.approach import Approach, ThoughtStep
 from azure.search.documents.aio import SearchClient
 from azure.storage.blob.aio import ContainerClient
 from core.authentication import AuthenticationHelper
+from core.httpsessions import HTTPSessionRegistry
 from core.imageshelper import fetch_image
 from openai import AsyncOpenAI
 from openai.types.chat import (
@@ -49,7 +50,8 @@ class RetrieveThenReadVisionApproach(Approach):
         query_language: str,
         query_speller: str,
         vision_endpoint: str,
-        vision_token_provider: Callable[[], Awaitable[str]]
+        vision_token_provider: Callable[[], Awaitable[str]],
+        http_sessions: Optional[HTTPSessionRegistry] = None,
     ):
         self.search_client = search_client
         self.blob_container_client = blob_container_client
@@ -66,6 +68,7 @@ class RetrieveThenReadVisionApproach(Approach):
         self.query_speller = query_speller
         self.vision_endpoint = vision_endpoint
         self.vision_token_provider = vision_token_provider
+        self.http_sessions = http_sessions
         self.gpt4v_token_limit = get_token_limit(gpt4v_model)
 
     async def run(
@@ -1,5 +1,11 @@
-from typing import Tuple
+import asyncio
+import functools
+import hashlib
+import hmac
+import secrets
+from typing import List, Tuple
 
+from authentication.secret_cache import SecretCache
 from azure.core.exceptions import ResourceNotFoundError
 from azure.keyvault.secrets.aio import SecretClient
 from config import CONFIG_KEYVAULT_CLIENT
@@ -11,12 +17,28 @@ class AccountAuthenticator:
     """
     An Account Authenticator that checks the user login credentials
 
+    The enabled versions of the username and password are loaded from keyvault into memory as keyed hashes, and
+    refreshed in the background, so a login does not depend on keyvault or on the number of secret versions.
+
     Attributes:
         keyvault_client (SecretClient): The keyvault client used to retrieve the username and password
+        hash_key (bytes): The random key of the hashes, which is only kept in memory
+        credential_caches (dict[str, SecretCache[List[bytes]]]): The hashes of every enabled version of each secret
     """
 
-    def __init__(self):
+    SECRET_NAMES = ("username", "password")
+
+    def __init__(self, secret_ttl: float = 300, secret_refresh_ahead: float = 60):
         self.keyvault_client: SecretClient = current_app.config[CONFIG_KEYVAULT_CLIENT]
+        self.hash_key = secrets.token_bytes(32)
+        self.credential_caches: dict[str, SecretCache[List[bytes]]] = {
+            secret_name: SecretCache(
+                functools.partial(self.load_secret_hashes, secret_name),
+                ttl=secret_ttl,
+                refresh_ahead=secret_refresh_ahead,
+            )
+            for secret_name in self.SECRET_NAMES
+        }
 
     async def verify_user(self, account: Account) -> Tuple[bool, str]:
         """
@@ -32,8 +54,10 @@ class AccountAuthenticator:
             Tuple[bool, str]: A tuple containing a boolean value if both username and password is correct and a message indicating the result
         """
         try:
-            found_password = await self.check_secret("password", account.password)
-            found_username = await self.check_secret("username", account.username)
+            found_password, found_username = await asyncio.gather(
+                self.check_secret("password", account.password),
+                self.check_secret("username", account.username),
+            )
             if found_password and found_username:
                 return True, "Login successful"
             else:
@@ -44,7 +68,7 @@ class AccountAuthenticator:
 
     async def check_secret(self, secret_name: str, user_input: str) -> bool:
         """
-        Function to check if the user username/password matches the stored username/password in keyvault
+        Function to check if the user username/password matches any enabled version of the stored username/password
 
         Args:
             secret_name (str): The secret name to query from keyvault
@@ -54,9 +78,36 @@ class AccountAuthenticator:
             bool: A boolean value indicating if the user username/password matches the stored username/password in keyvault
 
         """
-        async for ver in self.keyvault_client.list_properties_of_secret_versions(secret_name):
-            if ver.enabled:
-                secret = await self.keyvault_client.get_secret(secret_name, ver.version)
-                if secret.value == user_input:
-                    return True
-        return False
+        secret_hashes = await self.credential_caches[secret_name].get()
+        input_hash = self.hash_secret(user_input)
+        found = False
+        for secret_hash in secret_hashes:
+            # Every version is compared in constant time, so the time taken does not reveal which one matched
+            found |= hmac.compare_digest(secret_hash, input_hash)
+        return found
+
+    async def load_secret_hashes(self, secret_name: str) -> List[bytes]:
+        """
+        Function to load the hashes of every enabled version of a secret from keyvault, fetching the versions concurrently
+
+        Args:
+            secret_name (str): The secret name to query from keyvault
+
+        Raises:
+            ResourceNotFoundError: If the secret has not been created/does not exist
+
+        Returns:
+            List[bytes]: The hashes of the enabled versions of the secret
+        """
+        versions = [
+            ver.version
+            async for ver in self.keyvault_client.list_properties_of_secret_versions(secret_name)
+            if ver.enabled
+        ]
+        secrets_found = await asyncio.gather(
+            *[self.keyvault_client.get_secret(secret_name, version) for version in versions]
+        )
+        return [self.hash_secret(secret.value) for secret in secrets_found if secret.value is not None]
+
+    def hash_secret(self, value: str) -> bytes:
+        return hmac.new(self.hash_key, value.encode(), hashlib.sha256).digest()
@@ -1,13 +1,34 @@
 import datetime
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Optional
 
 import jwt
+from authentication.secret_cache import SecretCache
 from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.keyvault.secrets import KeyVaultSecret
 from azure.keyvault.secrets.aio import SecretClient
 from config import CONFIG_KEYVAULT_CLIENT
 from models.account import Account
 from models.payload import Payload
 from quart import current_app, request
 
+SECRET_KEY_NAME = "secretKey"
+# The minimum number of seconds between reloads of the secret keys for a token signed with an unknown key
+DEFAULT_MIN_REFRESH_INTERVAL = 60
+
+
+@dataclass
+class SecretKeys:
+    """
+    The current secret key, and the previous version of the secret key while tokens signed with it are accepted
+    """
+
+    current: str
+    previous: Optional[str] = None
+    previous_valid_until: Optional[datetime.datetime] = None
+
 
 class JWTAuthenticator:
     """
@@ -17,14 +38,99 @@ class JWTAuthenticator:
         ALGORITHM (str): The algorithm used for encoding the JWT token
         EXPIRATION_DELTA (datetime.timedelta): The expiration time used when generating a JWT token
         keyvault_client (SecretClient): The keyvault client used to retrieve the secret key
+        secret_keys_cache (SecretCache[SecretKeys]): The cached secret keys, refreshed from keyvault ahead of expiry
+        grace_period (float): The number of seconds after a new secret key version is created that tokens signed
+            with the previous version are still accepted
+        min_refresh_interval (float): The minimum number of seconds between reloads of the secret keys for a token
+            signed with an unknown key
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        secret_ttl: float = 300,
+        secret_refresh_ahead: float = 60,
+        grace_period: Optional[float] = None,
+        min_refresh_interval: float = DEFAULT_MIN_REFRESH_INTERVAL,
+    ) -> None:
         self.ALGORITHM = "HS256"
         self.EXPIRATION_DELTA = datetime.timedelta(hours=1)
         self.keyvault_client: SecretClient = current_app.config[CONFIG_KEYVAULT_CLIENT]
+        self.secret_keys_cache: SecretCache[SecretKeys] = SecretCache(
+            self.load_secret_keys, ttl=secret_ttl, refresh_ahead=secret_refresh_ahead
+        )
+        # By default, tokens signed before a rotation stay valid for as long as they would have without it
+        self.grace_period = self.EXPIRATION_DELTA.total_seconds() if grace_period is None else grace_period
+        self.min_refresh_interval = min_refresh_interval
 
     async def get_secret_key(self) -> str:
+        """
+        Function to get the secret key, from the cache if it was loaded from the keyvault recently
+
+        Raises:
+            ValueError: If the secret key has not been created/does not exist, or has been disabled
+
+        Returns:
+            secret_key (str): The secret key
+        """
+        return (await self.secret_keys_cache.get()).current
+
+    @staticmethod
+    def get_valid_secret_keys(secret_keys: SecretKeys) -> List[str]:
+        keys = [secret_keys.current]
+        if (
+            secret_keys.previous is not None
+            and secret_keys.previous_valid_until is not None
+            and datetime.datetime.now(datetime.timezone.utc) < secret_keys.previous_valid_until
+        ):
+            keys.append(secret_keys.previous)
+        return keys
+
+    def can_refresh(self) -> bool:
+        loaded_at = self.secret_keys_cache.loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at >= self.min_refresh_interval
+
+    async def load_secret_keys(self) -> SecretKeys:
+        """
+        Function to get the latest version of the secret key from the keyvault, with the previous version if the
+        latest version was created less than the grace period ago
+
+        The previous version is read from the keyvault instead of being remembered when the key changes, so that
+        every worker accepts the same keys whenever it last loaded them.
+
+        Raises:
+            ResourceNotFoundError: If the secret key has not been created/does not exist
+            HttpResponseError: If the secret key has been disabled
+
+        Returns:
+            SecretKeys: The secret keys
+        """
+        secret = await self.load_secret_key()
+        if not secret.value:
+            raise ValueError("Secret key has not been set. Please contact the administrator.")
+        secret_keys = SecretKeys(current=secret.value)
+        created_on = secret.properties.created_on
+        if created_on is None:
+            return secret_keys
+        previous_valid_until = created_on + datetime.timedelta(seconds=self.grace_period)
+        if datetime.datetime.now(datetime.timezone.utc) >= previous_valid_until:
+            return secret_keys
+        try:
+            previous_versions = [
+                (properties.created_on, properties.version)
+                async for properties in self.keyvault_client.list_properties_of_secret_versions(SECRET_KEY_NAME)
+                if properties.enabled and properties.created_on is not None and properties.created_on < created_on
+            ]
+            if previous_versions:
+                _, previous_version = max(previous_versions, key=lambda version: version[0])
+                previous_secret = await self.keyvault_client.get_secret(SECRET_KEY_NAME, previous_version)
+                secret_keys.previous = previous_secret.value
+                secret_keys.previous_valid_until = previous_valid_until
+        except Exception as error:
+            # Tokens signed with the previous key are rejected, which only logs their users out
+            logging.warning("Unable to get the previous version of the secret key: %s", error)
+        return secret_keys
+
+    async def load_secret_key(self) -> KeyVaultSecret:
         """
         Function to get the secret key from the keyvault
 
@@ -33,12 +139,10 @@ class JWTAuthenticator:
             HttpResponseError: If the secret key has been disabled
 
         Returns:
-            secret_key (str): The secret key
+            KeyVaultSecret: The latest version of the secret key
         """
         try:
-            secretKeyObj = await self.keyvault_client.get_secret("secretKey")  # Gets latest version
-            secret_key = secretKeyObj.value
-            return secret_key
+            return await self.keyvault_client.get_secret(SECRET_KEY_NAME)  # Gets latest version
         except ResourceNotFoundError:
             raise ValueError("Secret key has not been set. Please contact the administrator.")
         except HttpResponseError:
@@ -89,11 +193,27 @@ class JWTAuthenticator:
             ValueError: If the token has expired or is invalid
         """
         try:
-            secret_key = await self.get_secret_key()
-            jwt.decode(token, secret_key, algorithms=[self.ALGORITHM])
+            secret_keys = await self.secret_keys_cache.get()
+            try:
+                self.decode_with_secret_keys(token, secret_keys)
+            except jwt.exceptions.InvalidSignatureError:
+                # The token may have been signed by a worker that loaded a newer secret key
+                if not self.can_refresh():
+                    raise
+                self.decode_with_secret_keys(token, await self.secret_keys_cache.refresh())
         except jwt.exceptions.ExpiredSignatureError:
             raise ValueError("Token has expired")
         except jwt.exceptions.InvalidTokenError:
             raise ValueError("Invalid token")
         except Exception as error:
             raise (error)
+
+    def decode_with_secret_keys(self, token: str, secret_keys: SecretKeys):
+        valid_secret_keys = self.get_valid_secret_keys(secret_keys)
+        for i, key in enumerate(valid_secret_keys):
+            try:
+                jwt.decode(token, key, algorithms=[self.ALGORITHM])
+                return
+            except jwt.exceptions.InvalidSignatureError:
+                if i == len(valid_secret_keys) - 1:  # The token was not signed with any of the valid secret keys
+                    raise
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SecretCache(Generic[T]):
+    """
+    A cache of a value loaded from keyvault, so that requests do not each wait on a keyvault round trip
+
+    The value is refreshed in the background shortly before it expires, and concurrent requests that find it
+    missing or expired share a single load.
+
+    Attributes:
+        load (Callable[[], Awaitable[T]]): The function that loads the value from keyvault
+        ttl (float): The number of seconds the value is used before it has to be loaded again
+        refresh_ahead (float): The number of seconds before expiry at which the value is refreshed in the background
+        loaded_at (Optional[float]): The monotonic time the value was last loaded, or None if it was never loaded
+        loads (int): The number of times the value was loaded from keyvault
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Awaitable[T]],
+        ttl: float,
+        refresh_ahead: float = 0.0,
+    ):
+        self.load = load
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.value: Optional[T] = None
+        self.expires_at = 0.0
+        self.loaded_at: Optional[float] = None
+        self.loading: Optional[asyncio.Future[T]] = None
+        self.background_refresh: Optional[asyncio.Future[None]] = None
+        self.loads = 0
+
+    async def get(self) -> T:
+        """
+        Function to get the cached value, loading it if it has not been loaded or has expired
+
+        Raises:
+            Exception: Any exception raised while loading the value, if there is no valid value to fall back on
+
+        Returns:
+            T: The value
+        """
+        now = time.monotonic()
+        if self.value is not None and now < self.expires_at:
+            refreshing = self.loading is not None or (
+                self.background_refresh is not None and not self.background_refresh.done()
+            )
+            if now >= self.expires_at - self.refresh_ahead and not refreshing:
+                self.background_refresh = asyncio.ensure_future(self.refresh_in_background())
+            return self.value
+        return await self.refresh()
+
+    async def refresh(self) -> T:
+        """
+        Function to load the value now, joining the load that is already in progress if there is one
+
+        Returns:
+            T: The loaded value
+        """
+        if self.loading is None:
+            self.loading = asyncio.ensure_future(self.load_value())
+        # The load is shielded so that a cancelled request does not cancel it for the other requests waiting on it
+        return await asyncio.shield(self.loading)
+
+    async def refresh_in_background(self):
+        try:
+            await self.refresh()
+        except Exception as error:
+            # The current value is kept until it expires, and the next request after expiry retries the load
+            logging.warning("Unable to refresh secret ahead of expiry: %s", error)
+
+    async def load_value(self) -> T:
+        try:
+            value = await self.load()
+            self.loads += 1
+            self.value = value
+            self.loaded_at = time.monotonic()
+            self.expires_at = self.loaded_at + self.ttl
+            return value
+        finally:
+            self.loading = None
+
+    def invalidate(self):
+        self.expires_at = 0.0
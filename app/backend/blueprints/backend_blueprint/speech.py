@@ -13,7 +13,7 @@ async def speech_endpoint():
         request_json = await request.get_json()
         speech_request = SpeechRequest(**request_json)
         tts = current_app.config[CONFIG_TEXT_TO_SPEECH_SERVICE]
-        audio_data = tts.readText(speech_request.text, False)
+        audio_data = await tts.readTextAsync(speech_request.text, False)
         return audio_data, 200, {"Content-Type": "audio/mp3"}
     except Exception as e:
         logging.error(f"Exception in /speech. {e}")
@@ -1,14 +1,18 @@
 import asyncio
 import logging
-import queue
 import signal
+from typing import Optional
 
-from config import CONFIG_SPEECH_TO_TEXT_SERVICE
+from config import CONFIG_RECOGNIZER_POOL
 from quart import Blueprint, current_app, websocket
-from speech.speech_to_text import SpeechAsync, SpeechToText
+from speech.recognizer_pool import RecognizerPool
+from speech.speech_to_text import SpeechAsync
 
 transcription = Blueprint("transcription", __name__, url_prefix="/ws")
 
+# The number of seconds to wait for the remaining results to be sent once recognition has finished
+RESULTS_SENT_TIMEOUT = 5
+
 
 @transcription.websocket("/transcribe")
 async def ws_transcribe():
@@ -16,30 +20,32 @@ async def ws_transcribe():
 
     asyncio.get_running_loop().slow_callback_duration = 1
 
-    # create stt object
-    stt: SpeechToText = current_app.config[CONFIG_SPEECH_TO_TEXT_SERVICE]
-    speech_config = await stt.getSpeechConfig()
-    stt_async = await SpeechAsync.create(speech_config)
-    start_transcription = False
+    # a pre-warmed recognizer is checked out when audio arrives, and returned once its transcription is completed
+    recognizer_pool: RecognizerPool = current_app.config[CONFIG_RECOGNIZER_POOL]
+    stt_async: Optional[SpeechAsync] = None
     send_task = None
 
     # Function to handle sending results
-    async def send_results():
+    async def send_results(session: SpeechAsync):
         while True:
             try:
-                result = stt_async.getQueue().get(timeout=0.1)
-                await websocket.send_json(result)
-            except queue.Empty:
-                await asyncio.sleep(0.1)
+                result = await session.getQueue().get()
+                try:
+                    await websocket.send_json(result)
+                finally:
+                    session.getQueue().task_done()
             except Exception as e:
                 logging.error(f"Error sending result: {e}")
                 break
 
     async def stop_transcription():
-        nonlocal start_transcription
         nonlocal send_task
+        nonlocal stt_async
 
-        stt_async.getSpeechRecognizer().stop_continuous_recognition_async()
+        if stt_async is None:
+            return
+        session, stt_async = stt_async, None
+        session.getSpeechRecognizer().stop_continuous_recognition_async()
         if send_task is not None:
             send_task.cancel()
             try:
@@ -47,9 +53,8 @@ async def ws_transcribe():
             except asyncio.CancelledError:
                 send_task = None
 
-        stt_async.reset()
-
-        start_transcription = False
+        # the recognizer is rebuilt in the pool, and the next transcription starts on another pre-warmed one
+        recognizer_pool.release(session)
 
         logging.info("Transcribed audio successfully")
 
@@ -64,22 +69,23 @@ async def ws_transcribe():
     try:
         while True:
             data = await asyncio.wait_for(websocket.receive(), timeout=1800)  # 30 minutes timeout
-            if not start_transcription:
-                logging.info("Starting transcription")
-                send_task = asyncio.create_task(send_results())  # Start the result sending task
-                stt_async.getSpeechRecognizer().start_continuous_recognition_async()
-                start_transcription = True
-
             if isinstance(data, str) and data == "completed":  # wait for frontend to send completed message
-                while (
-                    not stt_async.finished_recognising or stt_async.getQueue().empty()
-                ):  # stt_async.getQueue().empty() ensures that empty audio is transcribed
-                    stt_async.getStream().write(b" ")  # empty bytes needed to trigger recognition if audio too short
-
-                while not stt_async.getQueue().empty():  # Ensure all results are sent before stopping transcription
-                    await asyncio.sleep(0.1)
+                if stt_async is None:
+                    continue  # no audio was sent since the last transcription
+                await stt_async.finishRecognition()
+                try:
+                    # Ensure all results are sent before stopping transcription
+                    await asyncio.wait_for(stt_async.getQueue().join(), timeout=RESULTS_SENT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logging.warning("Timed out sending transcription results")
                 await stop_transcription()
                 continue
+
+            if stt_async is None:
+                logging.info("Starting transcription")
+                stt_async = recognizer_pool.acquire()
+                send_task = asyncio.create_task(send_results(stt_async))  # Start the result sending task
+                stt_async.getSpeechRecognizer().start_continuous_recognition_async()
             stt_async.getStream().write(data)
     except asyncio.TimeoutError:
         logging.info("WebSocket connection timed out")
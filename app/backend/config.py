@@ -9,8 +9,17 @@ CONFIG_OPENAI_CLIENT = "openai_client"
 CONFIG_SPEECH_SERVICE_ID = "speech_service_id"
 CONFIG_SPEECH_SERVICE_LOCATION = "speech_service_location"
 CONFIG_SPEECH_SERVICE_TOKEN = "speech_service_token"
+CONFIG_SPEECH_TOKEN_MANAGER = "speech_token_manager"
 CONFIG_TEXT_TO_SPEECH_SERVICE = "text_to_speech_service_token"
 CONFIG_SPEECH_TO_TEXT_SERVICE = "speech_to_text_service_token"
+CONFIG_RECOGNIZER_POOL = "recognizer_pool"
+CONFIG_TRANSLATOR_SERVICE_API_KEY = "translator_service_api_key"
+CONFIG_TRANSLATOR_SERVICE_ENDPOINT = "translator_service_endpoint"
+CONFIG_TRANSLATOR_SERVICE_LOCATION = "translator_service_location"
+CONFIG_TRANSLATOR = "translator"
 CONFIG_USER_DATABASE = "user_database"
 CONFIG_AUTHENTICATOR = "authenticator"
 CONFIG_KEYVAULT_CLIENT = "keyvault_client"
+CONFIG_EMBEDDING_CACHE = "embedding_cache"
+CONFIG_CHAT_HISTORY_WRITER = "chat_history_writer"
+CONFIG_HTTP_SESSIONS = "http_sessions"
@@ -0,0 +1,149 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from opentelemetry import trace
+from text import normalize_query
+from utils.lru_cache import LRUCache
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    language: str
+    context: dict[str, Any]
+    content: str
+    followup_questions: List[str]
+
+
+class AnswerCache:
+    """
+    A cache of complete answers to single-turn questions from the general profile, which only depend on
+    the question, the language and the retrieved sources
+
+    Answers are looked up by the normalized question, and optionally by the cosine similarity of the question
+    embedding to the questions already answered in the same language.
+
+    Attributes:
+        memory (LRUCache[CachedAnswer]): The answers, keyed by language and normalized question
+        similarity_threshold (Optional[float]): The minimum cosine similarity for a different question to reuse
+            an answer, or None to only reuse answers to the same question
+        embeddings (dict[Tuple[str, str], np.ndarray]): The normalized embedding of every cached question
+        hits (int): The number of answers reused for the same question
+        semantic_hits (int): The number of answers reused for a similar but different question
+        misses (int): The number of questions without a cached answer
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None, similarity_threshold: Optional[float] = None):
+        self.memory: LRUCache[CachedAnswer] = LRUCache(max_size, ttl)
+        self.similarity_threshold = similarity_threshold
+        self.lock = threading.Lock()
+        self.embeddings: dict[Tuple[str, str], np.ndarray] = {}
+        self.index: Optional[Tuple[List[Tuple[str, str]], np.ndarray]] = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def use_similarity(self) -> bool:
+        return self.similarity_threshold is not None
+
+    @staticmethod
+    def get_key(query: str, language: str) -> Tuple[str, str]:
+        return language, normalize_query(query)
+
+    def get(self, query: str, language: str, record_miss: bool = True) -> Optional[CachedAnswer]:
+        """
+        Function to get the cached answer to the same question
+
+        Args:
+            query (str): The question asked by the user
+            language (str): The language of the answer
+            record_miss (bool): Whether a missing answer is counted as a miss, which is left to get_similar when
+                the caller looks for a similar question next
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer, or None if the question has not been answered recently
+        """
+        answer = self.memory.get(self.get_key(query, language), record_miss=False)
+        if answer is not None:
+            self.hits += 1
+        elif record_miss:
+            self.misses += 1
+        return answer
+
+    def get_similar(self, query: str, language: str, embedding: List[float]) -> Optional[CachedAnswer]:
+        """
+        Function to get the cached answer to a similar question, when there is no answer to the same question
+
+        Args:
+            query (str): The question asked by the user
+            language (str): The language of the answer
+            embedding (List[float]): The embedding of the question, compared to the cached questions
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer to the most similar question above the similarity threshold,
+            or None if there is none
+        """
+        answer = None
+        if self.use_similarity:
+            similar_key = self.find_similar(self.get_key(query, language), embedding)
+            if similar_key is not None:
+                answer = self.memory.get(similar_key, record_miss=False)
+        if answer is not None:
+            self.semantic_hits += 1
+        else:
+            self.misses += 1
+        return answer
+
+    def set(self, answer: CachedAnswer, embedding: Optional[List[float]] = None):
+        key = self.get_key(answer.query, answer.language)
+        self.memory.set(key, answer)
+        if embedding is None or not self.use_similarity:
+            return
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self.lock:
+            self.embeddings[key] = vector / (np.linalg.norm(vector) or 1.0)
+            # Drop the embeddings of answers evicted from the cache
+            for evicted_key in [cached_key for cached_key in self.embeddings if cached_key not in self.memory]:
+                del self.embeddings[evicted_key]
+            self.index = None
+
+    def find_similar(self, key: Tuple[str, str], embedding: List[float]) -> Optional[Tuple[str, str]]:
+        with self.lock:
+            if not self.embeddings:
+                return None
+            if self.index is None:
+                # The index is rebuilt lazily after a new answer is cached
+                keys = list(self.embeddings)
+                self.index = keys, np.stack([self.embeddings[cached_key] for cached_key in keys])
+            keys, matrix = self.index
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        similarities = matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+        same_language = np.array([cached_key[0] == key[0] for cached_key in keys])
+        similarities[~same_language] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return keys[best]
+
+    def get_stats(self) -> dict[str, Any]:
+        memory_stats = self.memory.get_stats()
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": memory_stats["size"],
+            "max_entries": memory_stats["max_size"],
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "evictions": memory_stats["evictions"],
+        }
+
+    def record_stats(self, span: trace.Span):
+        stats = self.get_stats()
+        span.set_attribute("Answer cache hit rate", stats["hit_rate"])
+        span.set_attribute("Answer cache semantic hits", stats["semantic_hits"])
+        span.set_attribute("Answer cache entries", stats["entries"])
@@ -1,12 +1,15 @@
 # Refactored from https://github.com/Azure-Samples/ms-identity-python-on-behalf-of
 
+import hashlib
 import json
 import logging
-from typing import Any, Optional
+from typing import Any, Optional, Tuple
 
 import aiohttp
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.indexes.models import SearchIndex
+from core.httpsessions import HTTPSessionRegistry, client_session
+from core.jwkscache import JWKSCache, parse_max_age
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 from msal import ConfidentialClientApplication
@@ -17,6 +20,14 @@ from tenacity import (
     stop_after_attempt,
     wait_random_exponential,
 )
+from utils.lru_cache import LRUCache
+
+DEFAULT_GROUPS_CACHE_TTL = 5 * 60
+DEFAULT_GROUPS_CACHE_MAX_ENTRIES = 1024
+DEFAULT_SECURITY_FILTER_CACHE_MAX_ENTRIES = 4096
+# The key set is downloaded with a single quick retry, the cache serves the expired keys during a longer outage
+JWKS_FETCH_ATTEMPTS = 2
+JWKS_FETCH_TIMEOUT = 5
 
 
 # AuthError is raised when the authentication token sent by the client UI cannot be parsed or there is an authentication error accessing the graph API
@@ -43,8 +54,17 @@ class AuthenticationHelper:
         require_access_control: bool = False,
         enable_global_documents: bool = False,
         enable_unauthenticated_access: bool = False,
+        http_sessions: Optional[HTTPSessionRegistry] = None,
+        groups_cache_ttl: float = DEFAULT_GROUPS_CACHE_TTL,
+        groups_cache_max_entries: int = DEFAULT_GROUPS_CACHE_MAX_ENTRIES,
     ):
         self.use_authentication = use_authentication
+        self.http_sessions = http_sessions
+        # The groups of users with a groups overage claim are read from Microsoft Graph one page at a time,
+        # so they are kept per user for a while instead of being read again on every chat turn
+        self.groups_cache: LRUCache[list[str]] = LRUCache(groups_cache_max_entries, ttl=groups_cache_ttl)
+        # Filters are wrapped in a tuple, as None is a valid filter
+        self.security_filter_cache: LRUCache[Tuple[Optional[str]]] = LRUCache(DEFAULT_SECURITY_FILTER_CACHE_MAX_ENTRIES)
         self.server_app_id = server_app_id
         self.server_app_secret = server_app_secret
         self.client_app_id = client_app_id
@@ -59,6 +79,7 @@ class AuthenticationHelper:
         self.valid_audiences = [f"api://{server_app_id}", str(server_app_id)]
         # See https://learn.microsoft.com/entra/identity-platform/access-tokens#validate-the-issuer for more information on token validation
         self.key_url = f"{self.authority}/discovery/v2.0/keys"
+        self.jwks_cache = JWKSCache(self.fetch_jwks)
 
         if self.use_authentication:
             field_names = [field.name for field in search_index.fields] if search_index else []
@@ -148,6 +169,19 @@ class AuthenticationHelper:
                 error="oids and groups must be defined in the search index to use authentication", status_code=400
             )
 
+        # The filter only depends on the claims and the enabled filters, and users in many groups get long filters
+        groups_hash = hashlib.sha256("\n".join(auth_claims.get("groups", [])).encode()).hexdigest()
+        cache_key = (
+            auth_claims.get("oid", ""),
+            groups_hash,
+            bool(use_oid_security_filter),
+            bool(use_groups_security_filter),
+            self.enable_global_documents,
+        )
+        cached_filter = self.security_filter_cache.get(cache_key)
+        if cached_filter is not None:
+            return cached_filter[0]
+
         oid_security_filter = (
             "oids/any(g:search.in(g, '{}'))".format(auth_claims.get("oid", "")) if use_oid_security_filter else None
         )
@@ -174,16 +208,21 @@ class AuthenticationHelper:
             if security_filter:
                 security_filter = f"({security_filter} or {global_documents_filter})"
 
+        self.security_filter_cache.set(cache_key, (security_filter,))
         return security_filter
 
     @staticmethod
-    async def list_groups(graph_resource_access_token: dict) -> list[str]:
+    async def list_groups(
+        graph_resource_access_token: dict, http_sessions: Optional[HTTPSessionRegistry] = None
+    ) -> list[str]:
         headers = {"Authorization": "Bearer " + graph_resource_access_token["access_token"]}
         groups = []
-        async with aiohttp.ClientSession(headers=headers) as session:
+        async with client_session(http_sessions) as session:
             resp_json = None
             resp_status = None
-            async with session.get(url="https://graph.microsoft.com/v1.0/me/transitiveMemberOf?$select=id") as resp:
+            async with session.get(
+                url="https://graph.microsoft.com/v1.0/me/transitiveMemberOf?$select=id", headers=headers
+            ) as resp:
                 resp_json = await resp.json()
                 resp_status = resp.status
                 if resp_status != 200:
@@ -195,7 +234,7 @@ class AuthenticationHelper:
                     groups.append(group["id"])
                 next_link = resp_json.get("@odata.nextLink")
                 if next_link:
-                    async with session.get(url=next_link) as resp:
+                    async with session.get(url=next_link, headers=headers) as resp:
                         resp_json = await resp.json()
                         resp_status = resp.status
                 else:
@@ -240,7 +279,11 @@ class AuthenticationHelper:
             )
             if missing_groups_claim or has_group_overage_claim:
                 # Read the user's groups from Microsoft Graph
-                auth_claims["groups"] = await AuthenticationHelper.list_groups(graph_resource_access_token)
+                groups = self.groups_cache.get(auth_claims["oid"])
+                if groups is None:
+                    groups = await AuthenticationHelper.list_groups(graph_resource_access_token, self.http_sessions)
+                    self.groups_cache.set(auth_claims["oid"], groups)
+                auth_claims["groups"] = list(groups)
             return auth_claims
         except AuthError as e:
             logging.exception("Exception getting authorization information - " + json.dumps(e.error))
@@ -283,30 +326,35 @@ class AuthenticationHelper:
         return allowed
 
     # See https://github.com/Azure-Samples/ms-identity-python-on-behalf-of/blob/939be02b11f1604814532fdacc2c2eccd198b755/FlaskAPI/helpers/authorization.py#L44
-    async def validate_access_token(self, token: str):
-        """
-        Validate an access token is issued by Entra
-        """
+    async def fetch_jwks(self) -> Tuple[dict[str, Any], Optional[float]]:
         jwks = None
+        max_age = None
         async for attempt in AsyncRetrying(
             retry=retry_if_exception_type(AuthError),
-            wait=wait_random_exponential(min=15, max=60),
-            stop=stop_after_attempt(5),
+            wait=wait_random_exponential(max=1),
+            stop=stop_after_attempt(JWKS_FETCH_ATTEMPTS),
+            reraise=True,
         ):
             with attempt:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url=self.key_url) as resp:
+                async with client_session(self.http_sessions) as session:
+                    timeout = aiohttp.ClientTimeout(total=JWKS_FETCH_TIMEOUT)
+                    async with session.get(url=self.key_url, timeout=timeout) as resp:
                         resp_status = resp.status
                         if resp_status in [500, 502, 503, 504]:
                             raise AuthError(
                                 error=f"Failed to get keys info: {await resp.text()}", status_code=resp_status
                             )
                         jwks = await resp.json()
+                        max_age = parse_max_age(resp.headers.get("Cache-Control"))
 
         if not jwks or "keys" not in jwks:
             raise AuthError({"code": "invalid_keys", "description": "Unable to get keys to validate auth token."}, 401)
+        return jwks, max_age
 
-        rsa_key = None
+    async def validate_access_token(self, token: str):
+        """
+        Validate an access token is issued by Entra
+        """
         issuer = None
         audience = None
         try:
@@ -314,16 +362,17 @@ class AuthenticationHelper:
             unverified_claims = jwt.get_unverified_claims(token)
             issuer = unverified_claims.get("iss")
             audience = unverified_claims.get("aud")
-            for key in jwks["keys"]:
-                if key["kid"] == unverified_header["kid"]:
-                    rsa_key = {"kty": key["kty"], "kid": key["kid"], "use": key["use"], "n": key["n"], "e": key["e"]}
-                    break
+            kid = unverified_header["kid"]
         except Exception as exc:
             raise AuthError(
                 {"code": "invalid_header", "description": "Unable to parse authorization token."}, 401
             ) from exc
-        if not rsa_key:
+
+        # The signing keys are cached, so the key set is only downloaded when it expires or the key is unknown
+        key = await self.jwks_cache.get_key(kid)
+        if not key:
             raise AuthError({"code": "invalid_header", "description": "Unable to find appropriate key"}, 401)
+        rsa_key = {"kty": key["kty"], "kid": key["kid"], "use": key["use"], "n": key["n"], "e": key["e"]}
 
         if issuer not in self.valid_issuers:
             raise AuthError(
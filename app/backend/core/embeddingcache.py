@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from typing import Any, Awaitable, Callable, List, Optional
+
+from opentelemetry import trace
+from text import normalize_query
+from utils.lru_cache import LRUCache
+
+
+class EmbeddingCacheBackend(ABC):
+    """
+    A store of query embeddings shared between processes, such as the gunicorn workers of the app
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[List[float]]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, embedding: List[float], ttl: Optional[float]):
+        pass
+
+    async def close(self):
+        pass
+
+
+class SQLiteEmbeddingCacheBackend(EmbeddingCacheBackend):
+    """
+    An embedding cache backend in a local SQLite database, which is shared by every process on the same machine
+    """
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, embedding BLOB, expires_at REAL)"
+            )
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: str, embedding: List[float], ttl: Optional[float]):
+        await asyncio.to_thread(self.set_sync, key, embedding, ttl)
+
+    async def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get_sync(self, key: str) -> Optional[List[float]]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT embedding FROM embeddings WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return array("d", row[0]).tolist()
+
+    def set_sync(self, key: str, embedding: List[float], ttl: Optional[float]):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO embeddings (key, embedding, expires_at) VALUES (?, ?, ?)",
+                (key, array("d", embedding).tobytes(), expires_at),
+            )
+            # Expired embeddings are only skipped on read, so they are cleaned up as new ones are written
+            self.connection.execute("DELETE FROM embeddings WHERE expires_at <= ?", (time.time(),))
+
+
+class EmbeddingCache:
+    """
+    A cache of query embeddings, keyed by the embedding model, the dimensions and the normalized query
+
+    Recently used embeddings are kept in a bounded in-process LRU with a time to live. An optional backend shares
+    the embeddings between processes, and is checked when an embedding is not in the process.
+
+    Attributes:
+        memory (LRUCache[List[float]]): The in-process tier
+        backend (Optional[EmbeddingCacheBackend]): The shared tier, or None if embeddings are not shared
+        ttl (Optional[float]): The number of seconds an embedding stays valid, or None if embeddings never expire
+        hits (int): The number of embeddings found in either tier
+        misses (int): The number of embeddings computed because they were not cached
+        miss_seconds (float): The total time spent computing the embeddings that were not cached
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None, backend: Optional[EmbeddingCacheBackend] = None):
+        self.memory: LRUCache[List[float]] = LRUCache(max_size, ttl)
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def get_key(model: str, dimensions: Optional[int], text: str) -> str:
+        return hashlib.sha256(f"{model}\n{dimensions}\n{normalize_query(text)}".encode()).hexdigest()
+
+    async def get_or_compute(
+        self,
+        model: str,
+        dimensions: Optional[int],
+        text: str,
+        compute: Callable[[], Awaitable[List[float]]],
+    ) -> List[float]:
+        """
+        Function to get the embedding of a query from the cache, computing and caching it if it is not cached
+
+        Args:
+            model (str): The embedding model
+            dimensions (Optional[int]): The dimensions requested from the model, or None for the model default
+            text (str): The query to embed
+            compute (Callable[[], Awaitable[List[float]]]): The function that calls the embeddings API
+
+        Returns:
+            List[float]: The embedding of the query
+        """
+        key = self.get_key(model, dimensions, text)
+        embedding = self.memory.get(key, record_miss=False)
+        if embedding is None and self.backend is not None:
+            try:
+                embedding = await self.backend.get(key)
+            except Exception as error:
+                logging.warning("Unable to read from the embedding cache backend: %s", error)
+            if embedding is not None:
+                self.memory.set(key, embedding)
+
+        span = trace.get_current_span()
+        span.set_attribute("Embedding cache hit", embedding is not None)
+        if embedding is not None:
+            self.hits += 1
+            self.record_stats(span)
+            return embedding
+
+        start_time = time.monotonic()
+        embedding = await compute()
+        self.misses += 1
+        self.miss_seconds += time.monotonic() - start_time
+
+        self.memory.set(key, embedding)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, embedding, self.ttl)
+            except Exception as error:
+                logging.warning("Unable to write to the embedding cache backend: %s", error)
+        self.record_stats(span)
+        return embedding
+
+    def record_stats(self, span: trace.Span):
+        stats = self.get_stats()
+        span.set_attribute("Embedding cache hit rate", stats["hit_rate"])
+        span.set_attribute("Embedding cache saved seconds", stats["saved_seconds"])
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Function to get the hit rate of the cache and an estimate of the latency it saved
+
+        Returns:
+            dict[str, Any]: The hits, misses, hit rate, the number of cached embeddings in the process,
+            and the saved latency, estimated from the average time taken by the embeddings API on a miss
+        """
+        lookups = self.hits + self.misses
+        average_miss_seconds = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "saved_seconds": self.hits * average_miss_seconds,
+        }
@@ -0,0 +1,169 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Optional
+
+import aiohttp
+from opentelemetry import trace
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 20
+DEFAULT_KEEPALIVE_TIMEOUT = 60
+DEFAULT_DNS_CACHE_TTL = 300
+
+
+class HTTPSessionRegistry:
+    """
+    The aiohttp sessions shared by the app for outbound HTTP calls, so that calls reuse open TCP and TLS connections
+
+    Sessions are created on first use, on the event loop of the app, and closed when the app stops serving.
+    Requests through the sessions are traced to report the connection pool usage of every host, which is set on
+    the span of the calling request and logged when the sessions are closed.
+
+    Attributes:
+        limit (int): The maximum number of connections of a session
+        limit_per_host (int): The maximum number of connections of a session to a single host
+        keepalive_timeout (float): The number of seconds an idle connection is kept open for reuse
+        ttl_dns_cache (int): The number of seconds resolved host names are cached
+        sessions (dict[str, aiohttp.ClientSession]): The open sessions, by name
+        host_stats (dict[str, dict[str, int]]): The connection pool counters of every host
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache: int = DEFAULT_DNS_CACHE_TTL,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.sessions: dict[str, aiohttp.ClientSession] = {}
+        self.stats_lock = threading.Lock()
+        self.host_stats: dict[str, dict[str, int]] = {}
+
+    def get_session(self, name: str = "default") -> aiohttp.ClientSession:
+        """
+        Function to get a shared session, creating it on first use
+
+        Args:
+            name (str): The name of the session, so that callers needing separate connection limits do not share one
+
+        Returns:
+            aiohttp.ClientSession: The session, which must not be closed by the caller
+        """
+        session = self.sessions.get(name)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.ttl_dns_cache,
+            )
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[self.create_trace_config()])
+            self.sessions[name] = session
+        return session
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+        for host, stats in self.get_stats().items():
+            logging.info("HTTP connection pool usage for %s: %s", host, stats)
+
+    def create_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def on_event(counter: str, delta: int = 1):
+            async def callback(session: aiohttp.ClientSession, context: SimpleNamespace, params: Any):
+                self.record(context.host, counter, delta)
+
+            return callback
+
+        async def on_request_start(
+            session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestStartParams
+        ):
+            # The connection events do not carry the url, so the host is kept on the request context
+            context.host = params.url.host
+            self.record(context.host, "requests")
+            self.record(context.host, "in_flight")
+
+        async def on_request_end(
+            session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestEndParams
+        ):
+            self.record(context.host, "in_flight", -1)
+            self.record_stats(trace.get_current_span(), context.host)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_event("in_flight", -1))
+        trace_config.on_request_exception.append(on_event("errors"))
+        trace_config.on_connection_create_end.append(on_event("new_connections"))
+        trace_config.on_connection_reuseconn.append(on_event("reused_connections"))
+        trace_config.on_connection_queued_start.append(on_event("queued"))
+        trace_config.on_dns_cache_hit.append(on_event("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(on_event("dns_cache_misses"))
+        return trace_config
+
+    def record(self, host: str, counter: str, delta: int = 1):
+        with self.stats_lock:
+            stats = self.host_stats.setdefault(
+                host,
+                {
+                    "requests": 0,
+                    "in_flight": 0,
+                    "errors": 0,
+                    "new_connections": 0,
+                    "reused_connections": 0,
+                    "queued": 0,
+                    "dns_cache_hits": 0,
+                    "dns_cache_misses": 0,
+                },
+            )
+            stats[counter] += delta
+
+    def record_stats(self, span: trace.Span, host: str):
+        stats = self.get_stats().get(host)
+        if stats is None:
+            return
+        span.set_attribute("HTTP connection pool host", host)
+        span.set_attribute("HTTP connection reuse rate", stats["reuse_rate"])
+        span.set_attribute("HTTP requests queued for a connection", stats["queued"])
+        span.set_attribute("HTTP requests in flight", stats["in_flight"])
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Function to get the connection pool usage of every host called through the shared sessions
+
+        Returns:
+            dict[str, dict[str, Any]]: For every host, the number of requests, requests in flight and failed requests,
+            the connections opened and reused, the requests that waited for a free connection, the DNS cache hits
+            and misses, and the fraction of requests that reused a connection
+        """
+        with self.stats_lock:
+            host_stats: dict[str, dict[str, Any]] = {host: dict(stats) for host, stats in self.host_stats.items()}
+        for stats in host_stats.values():
+            connections = stats["new_connections"] + stats["reused_connections"]
+            stats["reuse_rate"] = stats["reused_connections"] / connections if connections else 0.0
+        return host_stats
+
+
+@asynccontextmanager
+async def client_session(http_sessions: Optional[HTTPSessionRegistry]) -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Utility function to get the shared session from the registry, or a session for a single call if there is none
+
+    Args:
+        http_sessions (Optional[HTTPSessionRegistry]): The registry of the app, or None outside of the app
+
+    Returns:
+        AsyncIterator[aiohttp.ClientSession]: The session, which is only closed if it was created for the call
+    """
+    if http_sessions is not None:
+        yield http_sessions.get_session()
+    else:
+        async with aiohttp.ClientSession() as session:
+            yield session
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+DEFAULT_JWKS_MAX_AGE = 60 * 60
+DEFAULT_JWKS_MAX_STALE = 24 * 60 * 60
+DEFAULT_JWKS_MIN_REFRESH_INTERVAL = 60
+
+
+def parse_max_age(cache_control: Optional[str]) -> Optional[float]:
+    """
+    Utility function to get the number of seconds a response can be cached for from its Cache-Control header
+
+    Args:
+        cache_control (Optional[str]): The Cache-Control header of the response
+
+    Returns:
+        Optional[float]: The max-age of the response, 0 if it must not be cached, or None if the header does not say
+    """
+    if not cache_control:
+        return None
+    directives = cache_control.lower()
+    if "no-store" in directives or "no-cache" in directives:
+        return 0.0
+    match = re.search(r"max-age=(\d+)", directives)
+    return float(match.group(1)) if match else None
+
+
+class JWKSCache:
+    """
+    A cache of the signing keys of a JSON Web Key Set, keyed by key id, so that tokens are validated without
+    downloading the key set for every request
+
+    The key set is kept for the max-age of its Cache-Control header. Once it expires, the expired keys are still used
+    while the key set is downloaded again in the background, and for up to max_stale seconds if the download fails,
+    so that an outage of the identity provider does not fail every request. A token signed with an unknown key
+    triggers a download, as the keys may have been rotated, but at most once every min_refresh_interval seconds.
+    Concurrent downloads are shared.
+
+    Attributes:
+        fetch (Callable[[], Awaitable[Tuple[dict[str, Any], Optional[float]]]]): The function that downloads the key
+            set, returning it and its max-age
+        default_max_age (float): The number of seconds the key set is kept if the response does not have a max-age
+        max_stale (float): The number of seconds after expiry the key set is still used while it cannot be downloaded
+        min_refresh_interval (float): The minimum number of seconds between two downloads
+        keys (dict[str, dict[str, Any]]): The signing keys, by key id
+        fetches (int): The number of times the key set was downloaded
+        stale_hits (int): The number of keys returned after the key set expired
+        rate_limited (int): The number of unknown key ids not looked up because the key set was downloaded recently
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Tuple[dict[str, Any], Optional[float]]]],
+        default_max_age: float = DEFAULT_JWKS_MAX_AGE,
+        max_stale: float = DEFAULT_JWKS_MAX_STALE,
+        min_refresh_interval: float = DEFAULT_JWKS_MIN_REFRESH_INTERVAL,
+    ):
+        self.fetch = fetch
+        self.default_max_age = default_max_age
+        self.max_stale = max_stale
+        self.min_refresh_interval = min_refresh_interval
+        self.keys: dict[str, dict[str, Any]] = {}
+        self.expires_at = 0.0
+        self.last_fetch: Optional[float] = None
+        self.fetching: Optional[asyncio.Future[None]] = None
+        self.background_refresh: Optional[asyncio.Future[None]] = None
+        self.fetches = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.rate_limited = 0
+
+    async def get_key(self, kid: str) -> Optional[dict[str, Any]]:
+        """
+        Function to get the signing key with a key id
+
+        Args:
+            kid (str): The key id from the header of the token
+
+        Raises:
+            Exception: Any exception raised while downloading the key set, if there are no keys to fall back on
+
+        Returns:
+            Optional[dict[str, Any]]: The key, or None if the key set does not have it
+        """
+        now = time.monotonic()
+        if not self.keys or now >= self.expires_at + self.max_stale:
+            await self.refresh()
+        elif now >= self.expires_at and self.can_refresh(now) and not self.is_refreshing():
+            self.background_refresh = asyncio.ensure_future(self.refresh_in_background())
+
+        key = self.keys.get(kid)
+        if key is None:
+            # The key set may have been rotated since it was downloaded
+            if self.is_refreshing() or self.can_refresh(now):
+                try:
+                    await self.refresh()
+                except Exception as error:
+                    logging.warning("Unable to refresh signing keys for key %s: %s", kid, error)
+                key = self.keys.get(kid)
+            else:
+                self.rate_limited += 1
+        if key is not None:
+            self.hits += 1
+            if time.monotonic() >= self.expires_at:
+                self.stale_hits += 1
+        return key
+
+    def can_refresh(self, now: float) -> bool:
+        return self.last_fetch is None or now - self.last_fetch >= self.min_refresh_interval
+
+    def is_refreshing(self) -> bool:
+        return self.fetching is not None or (self.background_refresh is not None and not self.background_refresh.done())
+
+    async def refresh(self):
+        """
+        Function to download the key set, joining the download that is already in progress if there is one
+        """
+        if self.fetching is None:
+            self.fetching = asyncio.ensure_future(self.load())
+        # The download is shielded so that a cancelled request does not cancel it for the other requests waiting on it
+        await asyncio.shield(self.fetching)
+
+    async def refresh_in_background(self):
+        try:
+            await self.refresh()
+        except Exception as error:
+            logging.warning("Unable to refresh signing keys, using the expired keys: %s", error)
+
+    async def load(self):
+        try:
+            self.last_fetch = time.monotonic()
+            jwks, max_age = await self.fetch()
+            self.fetches += 1
+            self.keys = {key["kid"]: key for key in jwks["keys"]}
+            self.expires_at = time.monotonic() + (max_age if max_age is not None else self.default_max_age)
+        finally:
+            self.fetching = None
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "keys": len(self.keys),
+            "expires_in": self.expires_at - time.monotonic(),
+            "fetches": self.fetches,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,26 @@
+import time
+from typing import List, Literal
+
+from models.chat_message import ChatMessageWithSource
+from pydantic import BaseModel, Field
+
+
+class ChatTurn(BaseModel):
+    session_id: str
+    created_at: str
+    chat_messages: List[ChatMessageWithSource]
+    # Orders the turns of a session when each turn is stored as its own item
+    sequence: int = Field(default_factory=time.time_ns)
+
+
+class ChatTurnItem(ChatTurn):
+    id: str
+    type: Literal["turn"] = "turn"
+
+    @staticmethod
+    def get_id(session_id: str, sequence: int) -> str:
+        return f"{session_id}:{sequence}"
+
+    @classmethod
+    def from_turn(cls, turn: ChatTurn) -> "ChatTurnItem":
+        return cls(id=cls.get_id(turn.session_id, turn.sequence), **turn.model_dump())
@@ -8,6 +8,7 @@ from azure.core.credentials_async import AsyncTokenCredential
 from azure.identity.aio import AzureDeveloperCliCredential, get_bearer_token_provider
 from prepdocslib.blobmanager import BlobManager
 from prepdocslib.embeddings import (
+    DEFAULT_EMBEDDING_CONCURRENCY,
     AzureOpenAIEmbeddingService,
     ImageEmbeddings,
     OpenAIEmbeddingService,
@@ -113,6 +114,9 @@ def setup_embeddings_service(
     openai_org: Union[str, None],
     disable_vectors: bool = False,
     disable_batch_vectors: bool = False,
+    max_concurrency: int = DEFAULT_EMBEDDING_CONCURRENCY,
+    tokens_per_minute: Optional[int] = None,
+    requests_per_minute: Optional[int] = None,
 ):
     if disable_vectors:
         logger.info("Not setting up embeddings service")
@@ -130,6 +134,9 @@ def setup_embeddings_service(
             open_ai_dimensions=openai_dimensions,
             credential=azure_open_ai_credential,
             disable_batch=disable_batch_vectors,
+            max_concurrency=max_concurrency,
+            tokens_per_minute=tokens_per_minute,
+            requests_per_minute=requests_per_minute,
         )
     else:
         if openai_key is None:
@@ -140,6 +147,9 @@ def setup_embeddings_service(
             credential=openai_key,
             organization=openai_org,
             disable_batch=disable_batch_vectors,
+            max_concurrency=max_concurrency,
+            tokens_per_minute=tokens_per_minute,
+            requests_per_minute=requests_per_minute,
         )
 
 
@@ -308,6 +318,25 @@ if __name__ == "__main__":
     parser.add_argument(
         "--disablebatchvectors", action="store_true", help="Don't compute embeddings in batch for the sections"
     )
+    parser.add_argument(
+        "--openaiconcurrency",
+        required=False,
+        default=DEFAULT_EMBEDDING_CONCURRENCY,
+        type=int,
+        help="Optional. Number of embedding requests sent at the same time for a document (defaults to 4). With several index workers, each sends this many at once",
+    )
+    parser.add_argument(
+        "--openaitpm",
+        required=False,
+        type=int,
+        help="Optional. Tokens per minute quota of the embedding model deployment, which embedding requests are kept within",
+    )
+    parser.add_argument(
+        "--openairpm",
+        required=False,
+        type=int,
+        help="Optional. Requests per minute quota of the embedding model deployment, which embedding requests are kept within",
+    )
 
     parser.add_argument(
         "--openaicustomurl",
@@ -366,6 +395,37 @@ if __name__ == "__main__":
         required=False,
         help="Required if --useintvectorization is specified. Enable Integrated vectorizer indexer support which is in preview)",
     )
+    parser.add_argument(
+        "--concurrency",
+        required=False,
+        default=1,
+        type=int,
+        help="Optional. Number of files parsed, uploaded, embedded and indexed at the same time (defaults to 1, one file at a time)",
+    )
+    parser.add_argument(
+        "--parseworkers",
+        required=False,
+        type=int,
+        help="Optional. Number of files parsed at the same time (defaults to --concurrency)",
+    )
+    parser.add_argument(
+        "--uploadworkers",
+        required=False,
+        type=int,
+        help="Optional. Number of files uploaded to Azure Blob Storage at the same time (defaults to --concurrency)",
+    )
+    parser.add_argument(
+        "--embedworkers",
+        required=False,
+        type=int,
+        help="Optional. Number of files whose images are embedded at the same time (defaults to --concurrency)",
+    )
+    parser.add_argument(
+        "--indexworkers",
+        required=False,
+        type=int,
+        help="Optional. Number of files embedded and indexed at the same time (defaults to --concurrency). Each sends up to --openaiconcurrency embedding requests at once",
+    )
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     args = parser.parse_args()
 
@@ -431,9 +491,13 @@ if __name__ == "__main__":
         openai_org=args.openaiorg,
         disable_vectors=args.novectors,
         disable_batch_vectors=args.disablebatchvectors,
+        max_concurrency=args.openaiconcurrency,
+        tokens_per_minute=args.openaitpm,
+        requests_per_minute=args.openairpm,
     )
 
     ingestion_strategy: Strategy
+    image_embeddings_service: Optional[ImageEmbeddings] = None
     if use_int_vectorization:
         ingestion_strategy = IntegratedVectorizerStrategy(
             search_info=search_info,
@@ -471,7 +535,18 @@ if __name__ == "__main__":
             search_analyzer_name=args.searchanalyzername,
             use_acls=args.useacls,
             category=args.category,
+            concurrency=args.concurrency,
+            parse_workers=args.parseworkers,
+            upload_workers=args.uploadworkers,
+            embed_workers=args.embedworkers,
+            index_workers=args.indexworkers,
         )
 
-    loop.run_until_complete(main(ingestion_strategy, setup_index=not args.remove and not args.removeall))
-    loop.close()
+    try:
+        loop.run_until_complete(main(ingestion_strategy, setup_index=not args.remove and not args.removeall))
+    finally:
+        if openai_embeddings_service is not None:
+            loop.run_until_complete(openai_embeddings_service.close())
+        if image_embeddings_service is not None:
+            loop.run_until_complete(image_embeddings_service.close())
+        loop.close()
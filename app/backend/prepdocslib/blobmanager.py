@@ -6,6 +6,7 @@ from typing import List, Optional, Union
 
 import fitz  # type: ignore
 from azure.core.credentials_async import AsyncTokenCredential
+from azure.core.exceptions import ResourceExistsError
 from azure.storage.blob import BlobSasPermissions, UserDelegationKey, generate_blob_sas
 from azure.storage.blob.aio import BlobServiceClient, ContainerClient
 from PIL import Image, ImageDraw, ImageFont
@@ -45,7 +46,11 @@ class BlobManager:
             account_url=self.endpoint, credential=self.credential, max_single_put_size=4 * 1024 * 1024
         ) as service_client, service_client.get_container_client(self.container) as container_client:
             if not await container_client.exists():
-                await container_client.create_container()
+                try:
+                    await container_client.create_container()
+                except ResourceExistsError:
+                    # The container was created by a concurrent upload
+                    pass
 
             # Re-open and upload the original file
             if file.url is None:
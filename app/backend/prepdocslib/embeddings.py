@@ -1,14 +1,22 @@
+import asyncio
 import logging
+import time
 from abc import ABC
-from typing import Awaitable, Callable, List, Optional, Union
+from typing import Any, Awaitable, Callable, List, Optional, Union
 from urllib.parse import urljoin
 
 import aiohttp
+import httpx
 import tiktoken
 from azure.core.credentials import AzureKeyCredential
 from azure.core.credentials_async import AsyncTokenCredential
 from azure.identity.aio import get_bearer_token_provider
-from openai import AsyncAzureOpenAI, AsyncOpenAI, RateLimitError
+from openai import (
+    AsyncAzureOpenAI,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    RateLimitError,
+)
 from tenacity import (
     AsyncRetrying,
     retry_if_exception_type,
@@ -17,8 +25,12 @@ from tenacity import (
 )
 from typing_extensions import TypedDict
 
+from .ratelimiter import RateLimiter, get_retry_after
+
 logger = logging.getLogger("ingester")
 
+DEFAULT_EMBEDDING_CONCURRENCY = 4
+
 
 class EmbeddingBatch:
     """
@@ -38,6 +50,7 @@ class OpenAIEmbeddings(ABC):
     """
     Contains common logic across both OpenAI and Azure OpenAI embedding services
     Can split source text into batches for more efficient embedding calls
+    Batches are sent concurrently, within the tokens and requests per minute budget of the deployment if one is given
     """
 
     SUPPORTED_BATCH_AOAI_MODEL = {
@@ -51,17 +64,55 @@ class OpenAIEmbeddings(ABC):
         "text-embedding-3-large": True,
     }
 
-    def __init__(self, open_ai_model_name: str, open_ai_dimensions: int, disable_batch: bool = False):
+    def __init__(
+        self,
+        open_ai_model_name: str,
+        open_ai_dimensions: int,
+        disable_batch: bool = False,
+        max_concurrency: int = DEFAULT_EMBEDDING_CONCURRENCY,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+    ):
         self.open_ai_model_name = open_ai_model_name
         self.open_ai_dimensions = open_ai_dimensions
         self.disable_batch = disable_batch
+        self.max_concurrency = max(max_concurrency, 1)
+        self.rate_limiter = RateLimiter(tokens_per_minute, requests_per_minute)
+        self.retry_backoff = wait_random_exponential(min=1, max=60)
+        self.client: Optional[AsyncOpenAI] = None
 
     async def create_client(self) -> AsyncOpenAI:
         raise NotImplementedError
 
+    async def get_client(self) -> AsyncOpenAI:
+        # The client is kept so that its connections are reused across batches
+        if self.client is None:
+            self.client = await self.create_client()
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        async def on_response(response: httpx.Response):
+            self.rate_limiter.update(response.headers)
+
+        return DefaultAsyncHttpxClient(event_hooks={"response": [on_response]})
+
     def before_retry_sleep(self, retry_state):
         logger.info("Rate limited on the OpenAI embeddings API, sleeping before retrying...")
 
+    def get_retry_wait(self, retry_state) -> float:
+        exception = retry_state.outcome.exception() if retry_state.outcome else None
+        retry_after = get_retry_after(exception.response.headers) if isinstance(exception, RateLimitError) else None
+        if retry_after is None:
+            return self.retry_backoff(retry_state)
+        # The other requests pause as well, as they would be rate limited too
+        self.rate_limiter.pause(retry_after)
+        return retry_after
+
     def calculate_token_length(self, text: str) -> int:
         encoding = tiktoken.encoding_for_model(self.open_ai_model_name)
         return len(encoding.encode(text))
@@ -99,44 +150,78 @@ class OpenAIEmbeddings(ABC):
 
     async def create_embedding_batch(self, texts: List[str], dimensions_args: ExtraArgs) -> List[List[float]]:
         batches = self.split_text_into_batches(texts)
-        embeddings = []
-        client = await self.create_client()
-        for batch in batches:
-            async for attempt in AsyncRetrying(
-                retry=retry_if_exception_type(RateLimitError),
-                wait=wait_random_exponential(min=15, max=60),
-                stop=stop_after_attempt(15),
-                before_sleep=self.before_retry_sleep,
-            ):
-                with attempt:
-                    emb_response = await client.embeddings.create(
-                        model=self.open_ai_model_name, input=batch.texts, **dimensions_args
-                    )
-                    embeddings.extend([data.embedding for data in emb_response.data])
-                    logger.info(
-                        "Computed embeddings in batch. Batch size: %d, Token count: %d",
-                        len(batch.texts),
-                        batch.token_length,
-                    )
+        client = await self.get_client()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def create_embedding(batch: EmbeddingBatch) -> List[List[float]]:
+            async with semaphore:
+                return await self.create_embedding_request(client, batch, dimensions_args)
+
+        start_time = time.monotonic()
+        tasks = [asyncio.ensure_future(create_embedding(batch)) for batch in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        elapsed = time.monotonic() - start_time
+        token_length = sum(batch.token_length for batch in batches)
+        logger.info(
+            "Computed embeddings in %d batches. Token count: %d, Tokens per second: %.0f, Overall tokens per second: %.0f",
+            len(batches),
+            token_length,
+            token_length / elapsed if elapsed > 0 else 0.0,
+            self.get_stats()["tokens_per_second"],
+        )
+        return [embedding for result in results for embedding in result]
 
-        return embeddings
+    async def create_embedding_request(
+        self, client: AsyncOpenAI, batch: EmbeddingBatch, dimensions_args: ExtraArgs
+    ) -> List[List[float]]:
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(RateLimitError),
+            wait=self.get_retry_wait,
+            stop=stop_after_attempt(15),
+            before_sleep=self.before_retry_sleep,
+        ):
+            with attempt:
+                await self.rate_limiter.acquire(batch.token_length)
+                emb_response = await client.embeddings.create(
+                    model=self.open_ai_model_name, input=batch.texts, **dimensions_args
+                )
+                self.rate_limiter.record(emb_response.usage.total_tokens)
+                logger.info(
+                    "Computed embeddings in batch. Batch size: %d, Token count: %d",
+                    len(batch.texts),
+                    batch.token_length,
+                )
+        return [data.embedding for data in emb_response.data]
 
     async def create_embedding_single(self, text: str, dimensions_args: ExtraArgs) -> List[float]:
-        client = await self.create_client()
+        client = await self.get_client()
+        # Counting the tokens of the text is only needed to keep within a tokens per minute budget
+        token_length = self.calculate_token_length(text) if self.rate_limiter.tokens else 0
         async for attempt in AsyncRetrying(
             retry=retry_if_exception_type(RateLimitError),
-            wait=wait_random_exponential(min=15, max=60),
+            wait=self.get_retry_wait,
             stop=stop_after_attempt(15),
             before_sleep=self.before_retry_sleep,
         ):
             with attempt:
+                await self.rate_limiter.acquire(token_length)
                 emb_response = await client.embeddings.create(
                     model=self.open_ai_model_name, input=text, **dimensions_args
                 )
+                self.rate_limiter.record(emb_response.usage.total_tokens)
                 logger.info("Computed embedding for text section. Character count: %d", len(text))
 
         return emb_response.data[0].embedding
 
+    def get_stats(self) -> dict[str, Any]:
+        return self.rate_limiter.get_stats()
+
     async def create_embeddings(self, texts: List[str]) -> List[List[float]]:
         dimensions_args: ExtraArgs = (
             {"dimensions": self.open_ai_dimensions}
@@ -165,8 +250,18 @@ class AzureOpenAIEmbeddingService(OpenAIEmbeddings):
         credential: Union[AsyncTokenCredential, AzureKeyCredential],
         open_ai_custom_url: Union[str, None] = None,
         disable_batch: bool = False,
+        max_concurrency: int = DEFAULT_EMBEDDING_CONCURRENCY,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
     ):
-        super().__init__(open_ai_model_name, open_ai_dimensions, disable_batch)
+        super().__init__(
+            open_ai_model_name,
+            open_ai_dimensions,
+            disable_batch,
+            max_concurrency,
+            tokens_per_minute,
+            requests_per_minute,
+        )
         self.open_ai_service = open_ai_service
         if open_ai_service:
             self.open_ai_endpoint = f"https://{open_ai_service}.openai.azure.com"
@@ -196,6 +291,7 @@ class AzureOpenAIEmbeddingService(OpenAIEmbeddings):
             azure_endpoint=self.open_ai_endpoint,
             azure_deployment=self.open_ai_deployment,
             api_version="2023-05-15",
+            http_client=self.create_http_client(),
             **auth_args,
         )
 
@@ -213,13 +309,25 @@ class OpenAIEmbeddingService(OpenAIEmbeddings):
         credential: str,
         organization: Optional[str] = None,
         disable_batch: bool = False,
+        max_concurrency: int = DEFAULT_EMBEDDING_CONCURRENCY,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
     ):
-        super().__init__(open_ai_model_name, open_ai_dimensions, disable_batch)
+        super().__init__(
+            open_ai_model_name,
+            open_ai_dimensions,
+            disable_batch,
+            max_concurrency,
+            tokens_per_minute,
+            requests_per_minute,
+        )
         self.credential = credential
         self.organization = organization
 
     async def create_client(self) -> AsyncOpenAI:
-        return AsyncOpenAI(api_key=self.credential, organization=self.organization)
+        return AsyncOpenAI(
+            api_key=self.credential, organization=self.organization, http_client=self.create_http_client()
+        )
 
 
 class ImageEmbeddings:
@@ -231,27 +339,39 @@ class ImageEmbeddings:
     def __init__(self, endpoint: str, token_provider: Callable[[], Awaitable[str]]):
         self.token_provider = token_provider
         self.endpoint = endpoint
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # The session is kept so that its connections are reused across batches of images
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
 
     async def create_embeddings(self, blob_urls: List[str]) -> List[List[float]]:
+        session = self.get_session()
         endpoint = urljoin(self.endpoint, "computervision/retrieval:vectorizeImage")
         headers = {"Content-Type": "application/json"}
         params = {"api-version": "2023-02-01-preview", "modelVersion": "latest"}
         headers["Authorization"] = "Bearer " + await self.token_provider()
 
         embeddings: List[List[float]] = []
-        async with aiohttp.ClientSession(headers=headers) as session:
-            for blob_url in blob_urls:
-                async for attempt in AsyncRetrying(
-                    retry=retry_if_exception_type(Exception),
-                    wait=wait_random_exponential(min=15, max=60),
-                    stop=stop_after_attempt(15),
-                    before_sleep=self.before_retry_sleep,
-                ):
-                    with attempt:
-                        body = {"url": blob_url}
-                        async with session.post(url=endpoint, params=params, json=body) as resp:
-                            resp_json = await resp.json()
-                            embeddings.append(resp_json["vector"])
+        for blob_url in blob_urls:
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(Exception),
+                wait=wait_random_exponential(min=15, max=60),
+                stop=stop_after_attempt(15),
+                before_sleep=self.before_retry_sleep,
+            ):
+                with attempt:
+                    body = {"url": blob_url}
+                    async with session.post(url=endpoint, params=params, headers=headers, json=body) as resp:
+                        resp_json = await resp.json()
+                        embeddings.append(resp_json["vector"])
 
         return embeddings
 
@@ -1,5 +1,7 @@
+import asyncio
 import logging
-from typing import List, Optional
+import time
+from typing import Awaitable, Callable, List, Optional
 
 from .blobmanager import BlobManager
 from .embeddings import ImageEmbeddings, OpenAIEmbeddings
@@ -10,6 +12,9 @@ from .strategy import DocumentAction, SearchInfo, Strategy
 
 logger = logging.getLogger("ingester")
 
+# Each stage of the concurrent pipeline holds at most this many files per worker waiting for it
+QUEUE_SIZE_PER_WORKER = 2
+
 
 async def parse_file(
     file: File,
@@ -33,9 +38,27 @@ async def parse_file(
     return sections
 
 
+class FileIngestion:
+    """
+    A file going through the stages of the concurrent ingestion pipeline, with the results of the stages it went through
+    """
+
+    def __init__(self, file: File):
+        self.file = file
+        self.sections: List[Section] = []
+        self.blob_sas_uris: Optional[List[str]] = None
+        self.blob_image_embeddings: Optional[List[List[float]]] = None
+
+
 class FileStrategy(Strategy):
     """
     Strategy for ingesting documents into a search service from files stored either locally or in a data lake storage account
+
+    Files are ingested one at a time by default. With more than one worker in any stage, files go through a pipeline
+    of parse, upload, embed and index stages, each with its own workers, so the network calls of different files
+    overlap. Each stage has as many workers as the concurrency unless its own number of workers is given.
+    The stages are connected by bounded queues, so a slow stage holds back the files listed ahead of it instead of
+    keeping every file open in memory.
     """
 
     def __init__(
@@ -50,6 +73,11 @@ class FileStrategy(Strategy):
         search_analyzer_name: Optional[str] = None,
         use_acls: bool = False,
         category: Optional[str] = None,
+        concurrency: int = 1,
+        parse_workers: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        index_workers: Optional[int] = None,
     ):
         self.list_file_strategy = list_file_strategy
         self.blob_manager = blob_manager
@@ -61,6 +89,11 @@ class FileStrategy(Strategy):
         self.search_info = search_info
         self.use_acls = use_acls
         self.category = category
+        self.concurrency = max(concurrency, 1)
+        self.parse_workers = parse_workers or self.concurrency
+        self.upload_workers = upload_workers or self.concurrency
+        self.embed_workers = embed_workers or self.concurrency
+        self.index_workers = index_workers or self.concurrency
 
     async def setup(self):
         search_manager = SearchManager(
@@ -77,7 +110,10 @@ class FileStrategy(Strategy):
         search_manager = SearchManager(
             self.search_info, self.search_analyzer_name, self.use_acls, False, self.embeddings
         )
-        if self.document_action == DocumentAction.Add:
+        use_pipeline = max(self.parse_workers, self.upload_workers, self.embed_workers, self.index_workers) > 1
+        if self.document_action == DocumentAction.Add and use_pipeline:
+            await self.run_pipeline(search_manager)
+        elif self.document_action == DocumentAction.Add:
             files = self.list_file_strategy.list()
             async for file in files:
                 try:
@@ -100,6 +136,114 @@ class FileStrategy(Strategy):
             await self.blob_manager.remove_blob()
             await search_manager.remove_content()
 
+    async def run_pipeline(self, search_manager: SearchManager):
+        """
+        Function to ingest the listed files through the concurrent pipeline
+
+        Args:
+            search_manager (SearchManager): The search manager used to index the sections of the files
+
+        Raises:
+            Exception: The first exception raised by a stage, after the other stages are cancelled
+        """
+
+        async def parse(ingestion: FileIngestion) -> bool:
+            ingestion.sections = await parse_file(
+                ingestion.file, self.file_processors, self.category, self.image_embeddings
+            )
+            return len(ingestion.sections) > 0
+
+        async def upload(ingestion: FileIngestion) -> bool:
+            ingestion.blob_sas_uris = await self.blob_manager.upload_blob(ingestion.file)
+            return True
+
+        async def embed(ingestion: FileIngestion) -> bool:
+            if self.image_embeddings and ingestion.blob_sas_uris:
+                ingestion.blob_image_embeddings = await self.image_embeddings.create_embeddings(ingestion.blob_sas_uris)
+            return True
+
+        async def index(ingestion: FileIngestion) -> bool:
+            await search_manager.update_content(
+                ingestion.sections, ingestion.blob_image_embeddings, url=ingestion.file.url
+            )
+            return True
+
+        if self.embeddings:
+            # Every index worker sends the embedding requests of its file concurrently
+            logger.info(
+                "Up to %d embedding requests in flight, from %d index workers",
+                self.index_workers * self.embeddings.max_concurrency,
+                self.index_workers,
+            )
+
+        stages: List[tuple[str, int, Callable[[FileIngestion], Awaitable[bool]]]] = [
+            ("parse", self.parse_workers, parse),
+            ("upload", self.upload_workers, upload),
+        ]
+        if self.image_embeddings:
+            stages.append(("embed", self.embed_workers, embed))
+        stages.append(("index", self.index_workers, index))
+        queues: List[asyncio.Queue[Optional[FileIngestion]]] = [
+            asyncio.Queue(maxsize=workers * QUEUE_SIZE_PER_WORKER) for _, workers, _ in stages
+        ]
+        indexed_files = 0
+
+        async def list_files():
+            async for file in self.list_file_strategy.list():
+                await queues[0].put(FileIngestion(file))
+            # Each worker of the first stage stops when it gets an empty item
+            for _ in range(stages[0][1]):
+                await queues[0].put(None)
+
+        async def work(stage: int):
+            nonlocal indexed_files
+            name, _, process = stages[stage]
+            while True:
+                ingestion = await queues[stage].get()
+                if ingestion is None:
+                    return
+                try:
+                    keep = await process(ingestion)
+                except Exception:
+                    logger.error("Failed to %s '%s'", name, ingestion.file.filename())
+                    ingestion.file.close()
+                    raise
+                if keep and stage + 1 < len(stages):
+                    await queues[stage + 1].put(ingestion)
+                else:
+                    if keep:
+                        indexed_files += 1
+                    ingestion.file.close()
+
+        async def run_stage(stage: int):
+            await asyncio.gather(*[work(stage) for _ in range(stages[stage][1])])
+            if stage + 1 < len(stages):
+                for _ in range(stages[stage + 1][1]):
+                    await queues[stage + 1].put(None)
+
+        start_time = time.monotonic()
+        tasks = [asyncio.ensure_future(list_files())]
+        tasks.extend(asyncio.ensure_future(run_stage(stage)) for stage in range(len(stages)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Close the files still waiting in the queues
+            for queue in queues:
+                while not queue.empty():
+                    ingestion = queue.get_nowait()
+                    if ingestion is not None:
+                        ingestion.file.close()
+            raise
+        logger.info(
+            "Ingested %d files in %.1f seconds with %s workers",
+            indexed_files,
+            time.monotonic() - start_time,
+            ", ".join(f"{workers} {name}" for name, workers, _ in stages),
+        )
+
 
 class UploadUserFileStrategy:
     """
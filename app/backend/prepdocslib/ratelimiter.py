@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import Any, Mapping, Optional
+
+logger = logging.getLogger("ingester")
+
+
+def get_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Get the number of seconds to wait before retrying a rate limited request from its response headers
+    """
+    if not headers:
+        return None
+    for header, scale in (("retry-after-ms", 1000), ("retry-after", 1)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(float(value) / scale, 0.0)
+        except ValueError:
+            # Retry-After may also be an HTTP date, which the OpenAI services do not send
+            continue
+    return None
+
+
+class TokenBucket:
+    """
+    A bucket refilled continuously up to a budget per minute, which requests take their cost from
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def get_wait_time(self, cost: float) -> float:
+        self.refill()
+        # A request costing more than the whole budget waits for a full bucket instead of forever
+        missing = min(cost, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+
+    def take(self, cost: float):
+        self.refill()
+        self.level -= cost
+
+    def limit(self, remaining: float):
+        self.refill()
+        self.level = min(self.level, remaining)
+
+    def resize(self, per_minute: float):
+        self.refill()
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+
+
+class RateLimiter:
+    """
+    Limits requests to the tokens per minute and requests per minute budget of a deployment
+
+    Requests wait their turn until both buckets hold their cost. The buckets follow the remaining budget reported by
+    the service in the x-ratelimit-remaining-* response headers, which accounts for other clients of the deployment,
+    and every request waits while the service asks for a pause with Retry-After. A budget that is not given is
+    learnt from the x-ratelimit-limit-* response headers, or from the largest remaining budget reported if the
+    service does not send the limit.
+    """
+
+    def __init__(self, tokens_per_minute: Optional[int] = None, requests_per_minute: Optional[int] = None):
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        # The buckets created from the response headers, which grow when the service reports a larger budget
+        self.learnt: set[str] = set()
+        self.lock = asyncio.Lock()
+        self.paused_until = 0.0
+        self.started_at: Optional[float] = None
+        self.total_tokens = 0
+        self.total_requests = 0
+        self.waited = 0.0
+
+    async def acquire(self, tokens: int):
+        # Requests are admitted one at a time, in the order they arrived
+        async with self.lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            while True:
+                wait_time = max(
+                    self.paused_until - time.monotonic(),
+                    self.tokens.get_wait_time(tokens) if self.tokens else 0.0,
+                    self.requests.get_wait_time(1) if self.requests else 0.0,
+                )
+                if wait_time <= 0:
+                    break
+                self.waited += wait_time
+                await asyncio.sleep(wait_time)
+            if self.tokens:
+                self.tokens.take(tokens)
+            if self.requests:
+                self.requests.take(1)
+            self.total_requests += 1
+
+    def record(self, tokens: int):
+        # The tokens the service reports it used, which the achieved throughput is measured with
+        self.total_tokens += tokens
+
+    def update(self, headers: Mapping[str, str]):
+        for name in ("tokens", "requests"):
+            remaining = self.get_header_value(headers, f"x-ratelimit-remaining-{name}")
+            limit = self.get_header_value(headers, f"x-ratelimit-limit-{name}")
+            bucket: Optional[TokenBucket] = getattr(self, name)
+            if bucket is None:
+                per_minute = limit if limit is not None else remaining
+                if not per_minute:
+                    continue
+                bucket = TokenBucket(int(per_minute))
+                setattr(self, name, bucket)
+                self.learnt.add(name)
+                logger.info("Limiting embedding requests to %d %s per minute reported by the service", per_minute, name)
+            elif name in self.learnt:
+                per_minute = max(limit if limit is not None else 0.0, remaining or 0.0)
+                if per_minute > bucket.capacity:
+                    bucket.resize(per_minute)
+            if remaining is not None:
+                bucket.limit(remaining)
+
+    @staticmethod
+    def get_header_value(headers: Mapping[str, str], header: str) -> Optional[float]:
+        value = headers.get(header)
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            logger.debug("Ignoring invalid %s header: %s", header, value)
+            return None
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def get_stats(self) -> dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        return {
+            "tokens": self.total_tokens,
+            "requests": self.total_requests,
+            "elapsed": elapsed,
+            "waited": self.waited,
+            "tokens_per_second": self.total_tokens / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Any, List, Optional, Tuple
+
+from utils.lru_cache import LRUCache
+
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+# Pruning the disk tier removes files until it is back under this fraction of its limit, so it is not pruned on
+# every write
+DISK_PRUNE_TARGET = 0.9
+
+
+class AudioCache:
+    """
+    A content-addressed cache of synthesized audio, keyed by the normalized text, the voice and the output format
+
+    Recently used audio is kept in a bounded in-memory LRU. When a directory is given, audio is also written
+    to disk, so it survives evictions and restarts and is shared by every worker on the same machine. Once the
+    directory grows past max_disk_bytes, the least recently used files are deleted.
+
+    Attributes:
+        memory (LRUCache[bytes]): The in-memory tier
+        directory (Optional[str]): The directory of the on-disk tier, or None if the disk tier is disabled
+        max_disk_bytes (int): The maximum size of the on-disk tier
+        disk_bytes (int): The size of the on-disk tier, as last measured and updated by this process
+        disk_hits (int): The number of lookups that missed the memory tier but were found on disk
+        misses (int): The number of lookups that were not found in either tier
+        disk_evictions (int): The number of files deleted to keep the on-disk tier within max_disk_bytes
+    """
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None, max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.memory: LRUCache[bytes] = LRUCache(max_entries)
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.stats_lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self.disk_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self.listDiskFiles(directory))
+
+    @staticmethod
+    def getKey(text: str, voice_name: str, output_format: Any) -> str:
+        normalized_text = re.sub(r"\s+", " ", text).strip()
+        return hashlib.sha256(f"{voice_name}\n{output_format}\n{normalized_text}".encode()).hexdigest()
+
+    def peek(self, key: str) -> Optional[bytes]:
+        """
+        Function to look up audio in the memory tier only, so it can be called from the event loop
+
+        Args:
+            key (str): The key of the audio
+
+        Returns:
+            Optional[bytes]: The cached audio, or None if it is not in memory
+        """
+        return self.memory.get(key, record_miss=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        audio_data = self.memory.get(key, record_miss=False)
+        if audio_data is not None:
+            return audio_data
+
+        audio_data = self.readFromDisk(key)
+        with self.stats_lock:
+            if audio_data is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+        if audio_data is not None:
+            self.memory.set(key, audio_data)
+        return audio_data
+
+    def set(self, key: str, audio_data: bytes):
+        self.memory.set(key, audio_data)
+        self.writeToDisk(key, audio_data)
+
+    @staticmethod
+    def getPath(directory: str, key: str) -> str:
+        return os.path.join(directory, f"{key}.mp3")
+
+    def readFromDisk(self, key: str) -> Optional[bytes]:
+        directory = self.directory
+        if not directory:
+            return None
+        path = self.getPath(directory, key)
+        try:
+            with open(path, "rb") as file:
+                audio_data = file.read()
+            # The modification time orders the files for eviction, so reading a file marks it as recently used
+            os.utime(path)
+            return audio_data
+        except FileNotFoundError:
+            return None
+        except OSError as error:
+            logging.warning("Unable to read cached audio %s: %s", key, error)
+            return None
+
+    def writeToDisk(self, key: str, audio_data: bytes):
+        directory = self.directory
+        if not directory:
+            return
+        try:
+            # Write to a temporary file first so other workers never read a partially written file
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(audio_data)
+            os.replace(temp_path, self.getPath(directory, key))
+        except OSError as error:
+            logging.warning("Unable to write cached audio %s: %s", key, error)
+            return
+        with self.stats_lock:
+            self.disk_bytes += len(audio_data)
+            if self.disk_bytes > self.max_disk_bytes:
+                self.pruneDisk(directory)
+
+    @staticmethod
+    def listDiskFiles(directory: str) -> List[Tuple[float, int, str]]:
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".mp3"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Deleted by another worker
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def pruneDisk(self, directory: str):
+        """
+        Function to delete the least recently used files of the on-disk tier until it is back under its limit
+
+        The directory is measured again, as it is shared with the other workers on the machine
+        """
+        files = sorted(self.listDiskFiles(directory))
+        disk_bytes = sum(size for _, size, _ in files)
+        target = self.max_disk_bytes * DISK_PRUNE_TARGET
+        for _, size, path in files:
+            if disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self.disk_evictions += 1
+            except FileNotFoundError:
+                pass
+            except OSError as error:
+                logging.warning("Unable to delete cached audio %s: %s", path, error)
+                continue
+            disk_bytes -= size
+        self.disk_bytes = disk_bytes
+
+    def getStats(self) -> dict[str, Any]:
+        memory_stats = self.memory.get_stats()
+        with self.stats_lock:
+            hits = memory_stats["hits"] + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_entries": memory_stats["size"],
+                "max_memory_entries": memory_stats["max_size"],
+                "memory_hits": memory_stats["hits"],
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": memory_stats["evictions"],
+                "disk_bytes": self.disk_bytes,
+                "disk_evictions": self.disk_evictions,
+            }
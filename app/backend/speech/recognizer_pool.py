@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+import azure.cognitiveservices.speech as speechsdk
+from opentelemetry import trace
+
+from .speech_to_text import SpeechAsync
+
+DEFAULT_MIN_RECOGNIZERS = 2
+DEFAULT_MAX_IDLE_RECOGNIZERS = 8
+DEFAULT_RECOGNIZER_IDLE_TIMEOUT = 300
+
+
+class RecognizerPool:
+    """
+    A pool of pre-warmed speech recognition sessions for the transcription websockets
+
+    A session is checked out by one websocket at a time. When it is returned, its recognizer and audio stream are
+    rebuilt and connected ahead of the next websocket, so websockets do not wait for either. The pool is only used
+    from the event loop it was started on, which is the loop the sessions deliver their results to.
+
+    Attributes:
+        speech_config (SpeechConfig): The speech config used to create the sessions
+        min_size (int): The number of idle sessions kept warm in the pool
+        max_idle (int): The maximum number of idle sessions, beyond which returned sessions are discarded
+        idle_timeout (float): The number of seconds an idle session above the warm minimum is kept before it is evicted
+        idle (Deque[Tuple[SpeechAsync, float]]): The idle sessions, with the time they were returned to the pool
+        in_use (int): The number of sessions checked out
+        created (int): The number of sessions created by the pool
+        acquired (int): The number of sessions checked out
+        warm_hits (int): The number of sessions checked out from the idle sessions instead of being created
+        evicted (int): The number of idle sessions evicted after the idle timeout
+        unhealthy (int): The number of idle sessions discarded because their recognizer was canceled or disconnected
+    """
+
+    def __init__(
+        self,
+        speech_config: speechsdk.SpeechConfig,
+        min_size: int = DEFAULT_MIN_RECOGNIZERS,
+        max_idle: int = DEFAULT_MAX_IDLE_RECOGNIZERS,
+        idle_timeout: float = DEFAULT_RECOGNIZER_IDLE_TIMEOUT,
+    ):
+        self.speech_config = speech_config
+        self.min_size = min_size
+        self.max_idle = max(max_idle, min_size)
+        self.idle_timeout = idle_timeout
+        self.idle: Deque[Tuple[SpeechAsync, float]] = deque()
+        # Every live session, including checked out ones, so a new token reaches all of them
+        self.sessions: weakref.WeakSet[SpeechAsync] = weakref.WeakSet()
+        self.maintenance: Optional[asyncio.Task] = None
+        self.in_use = 0
+        self.created = 0
+        self.acquired = 0
+        self.warm_hits = 0
+        self.evicted = 0
+        self.unhealthy = 0
+
+    async def start(self):
+        self.fill()
+        if self.maintenance is None:
+            self.maintenance = asyncio.create_task(self.maintain())
+
+    async def close(self):
+        if self.maintenance is not None:
+            self.maintenance.cancel()
+            self.maintenance = None
+        self.idle.clear()
+
+    def createSession(self) -> SpeechAsync:
+        session = SpeechAsync(self.speech_config)
+        self.created += 1
+        self.sessions.add(session)
+        self.preconnect(session)
+        return session
+
+    def preconnect(self, session: SpeechAsync):
+        try:
+            session.preconnect()
+        except Exception as error:
+            logging.warning("Unable to pre-connect speech recognizer: %s", error)
+
+    def acquire(self) -> SpeechAsync:
+        """
+        Function to check out a session for a websocket, creating one if no healthy session is idle
+
+        Returns:
+            SpeechAsync: The session, which has to be returned with release once the websocket closes
+        """
+        session = None
+        while self.idle and session is None:
+            # The most recently returned session is the most likely to still be connected
+            session, _ = self.idle.pop()
+            if not session.isHealthy():
+                self.unhealthy += 1
+                session = None
+        warm = session is not None
+        if session is None:
+            session = self.createSession()
+        else:
+            self.warm_hits += 1
+        self.acquired += 1
+        self.in_use += 1
+
+        span = trace.get_current_span()
+        span.set_attribute("Recognizer pool warm hit", warm)
+        span.set_attribute("Recognizer pool utilization", self.getStats()["utilization"])
+        return session
+
+    def release(self, session: SpeechAsync):
+        """
+        Function to return a session to the pool, rebuilding its recognizer for the next websocket
+
+        Args:
+            session (SpeechAsync): The session checked out with acquire
+        """
+        self.in_use -= 1
+        if len(self.idle) >= self.max_idle:
+            return
+        try:
+            session.reset()
+        except Exception as error:
+            logging.warning("Unable to rebuild speech recognizer, discarding it: %s", error)
+            return
+        self.preconnect(session)
+        self.idle.append((session, time.monotonic()))
+
+    def updateAuthToken(self, auth_token: str):
+        """
+        Function to switch the pool to a new authorization token, for new and existing recognizers
+
+        Args:
+            auth_token (str): The new authorization token
+        """
+        # Recognizers rebuilt on release are created from the speech config
+        self.speech_config.authorization_token = auth_token
+        for session in list(self.sessions):
+            session.getSpeechRecognizer().authorization_token = auth_token
+
+    def evictIdle(self):
+        now = time.monotonic()
+        # The least recently returned sessions are at the front, and sessions above the warm minimum are evicted first
+        while len(self.idle) > self.min_size and now - self.idle[0][1] >= self.idle_timeout:
+            self.idle.popleft()
+            self.evicted += 1
+        healthy = deque(entry for entry in self.idle if entry[0].isHealthy())
+        self.unhealthy += len(self.idle) - len(healthy)
+        self.idle = healthy
+
+    def fill(self):
+        while len(self.idle) < self.min_size:
+            self.idle.append((self.createSession(), time.monotonic()))
+
+    async def maintain(self):
+        interval = max(min(self.idle_timeout / 2, 60), 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evictIdle()
+                self.fill()
+            except Exception as error:
+                logging.warning("Unable to maintain speech recognizer pool: %s", error)
+
+    def getStats(self) -> dict[str, Any]:
+        """
+        Function to get the utilization of the pool
+
+        Returns:
+            dict[str, Any]: The pool limits, the number of idle and checked out sessions, the fraction of sessions
+            checked out, and the counters of created, checked out, warm, evicted and unhealthy sessions
+        """
+        total = len(self.idle) + self.in_use
+        return {
+            "min_size": self.min_size,
+            "max_idle": self.max_idle,
+            "idle": len(self.idle),
+            "in_use": self.in_use,
+            "utilization": self.in_use / total if total else 0.0,
+            "created": self.created,
+            "acquired": self.acquired,
+            "warm_hits": self.warm_hits,
+            "evicted": self.evicted,
+            "unhealthy": self.unhealthy,
+        }
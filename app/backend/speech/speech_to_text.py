@@ -1,5 +1,5 @@
+import asyncio
 import logging
-import queue
 import time
 
 import azure.cognitiveservices.speech as speechsdk
@@ -11,6 +11,9 @@ from config import (
 )
 from quart import current_app
 
+# The number of seconds to wait for the recognizer to finish after the end of the audio
+RECOGNITION_COMPLETION_TIMEOUT = 10
+
 
 class SpeechToText:
     def __init__(self, speech_token):
@@ -48,6 +51,8 @@ class SpeechToText:
 class SpeechAsync:
     def __init__(self, speech_config):
         self.speech_config = speech_config
+        # The recognizer calls back on its own threads, so results are handed to the event loop of the websocket
+        self.loop = asyncio.get_running_loop()
         self.auto_detect_source_language_config = speechsdk.languageconfig.AutoDetectSourceLanguageConfig(
             languages=["en-SG", "zh-CN", "ta-IN", "ms-MY"]
         )
@@ -63,12 +68,50 @@ class SpeechAsync:
     def getStream(self):
         return self.stream
 
-    def getQueue(self):
+    def getQueue(self) -> asyncio.Queue:
         return self.result_queue
 
+    def putResult(self, result):
+        self.loop.call_soon_threadsafe(self.result_queue.put_nowait, result)
+
     def reset(self):
+        # Stop the previous recognizer from calling back into the results of the next transcription
+        for signal in (
+            self.speech_recognizer.recognizing,
+            self.speech_recognizer.recognized,
+            self.speech_recognizer.canceled,
+            self.speech_recognizer.session_stopped,
+        ):
+            signal.disconnect_all()
         self.setup()
 
+    def preconnect(self):
+        """
+        Function to open the connection of the recognizer ahead of the first audio, so it does not pay for the handshake
+        """
+        self.connection = speechsdk.Connection.from_recognizer(self.speech_recognizer)
+        self.connection.disconnected.connect(self.disconnected_cb)
+        self.connection.open(True)
+
+    def isHealthy(self) -> bool:
+        return not self.canceled and not self.disconnected
+
+    async def finishRecognition(self, timeout: float = RECOGNITION_COMPLETION_TIMEOUT):
+        """
+        Function to end the audio stream and wait for the recognizer to queue the results of the remaining audio
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the recognizer to stop
+        """
+        self.stream.close()
+        try:
+            await asyncio.wait_for(self.session_stopped.wait(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Timed out waiting for speech recognition to finish")
+        if not self.finished_recognising:
+            # The frontend waits for a final result, which is not recognized if the audio was empty or timed out
+            self.result_queue.put_nowait({"text": self.all_result + self.recognizing_text, "is_final": True})
+
     def setup(self):
         self.stream = speechsdk.audio.PushAudioInputStream()
         audio_config = speechsdk.audio.AudioConfig(stream=self.stream)
@@ -82,22 +125,39 @@ class SpeechAsync:
         self.speech_recognizer.recognizing.connect(self.recognizing_cb)
         self.speech_recognizer.recognized.connect(self.recognized_cb)
         self.speech_recognizer.canceled.connect(self.canceled_cb)
-        self.result_queue = queue.Queue()
+        self.speech_recognizer.session_stopped.connect(self.session_stopped_cb)
+        self.connection = None
+        self.canceled = False
+        self.disconnected = False
+        self.result_queue: asyncio.Queue = asyncio.Queue()
+        self.session_stopped = asyncio.Event()
         self.all_result = ""
+        self.recognizing_text = ""
         self.finished_recognising = False
 
     # Set up callbacks
     def recognizing_cb(self, evt):
         self.finished_recognising = False
+        self.recognizing_text = evt.result.text
         logging.info(f"Recognizing: {evt.result.text}")
-        self.result_queue.put({"text": self.all_result + evt.result.text, "is_final": False})
+        self.putResult({"text": self.all_result + evt.result.text, "is_final": False})
 
     def recognized_cb(self, evt):
         self.finished_recognising = True
+        self.recognizing_text = ""
         self.all_result += evt.result.text + " "
         logging.info(f"Recognized: {evt.result.text}")
-        self.result_queue.put({"text": self.all_result, "is_final": True})
+        self.putResult({"text": self.all_result, "is_final": True})
 
     def canceled_cb(self, evt):
         logging.warning(f"Recognition canceled: {evt.result.reason}")
         # self.result_queue.put({"error": f"Recognition canceled: {evt.result.reason}"})
+        self.canceled = True
+        self.loop.call_soon_threadsafe(self.session_stopped.set)
+
+    def session_stopped_cb(self, evt):
+        # Scheduled after the results already queued, so they are on the queue once the event is set
+        self.loop.call_soon_threadsafe(self.session_stopped.set)
+
+    def disconnected_cb(self, evt):
+        self.disconnected = True
@@ -0,0 +1,67 @@
+import asyncio
+from collections import deque
+from typing import AsyncGenerator, Deque, List, Tuple
+
+from .text_to_speech import TextToSpeech
+
+
+class SynthesisPipeline:
+    """
+    Synthesizes the sentences of a streamed response in the background while the response is still being generated.
+    Audio is handed back in the same order that the sentences were submitted.
+
+    Attributes:
+        text_to_speech (TextToSpeech): The text to speech service used to synthesize each sentence
+        language (str): The language of the voice used for every sentence
+        pending (Deque[Tuple[str, asyncio.Task]]): The submitted sentences and their synthesis tasks, oldest first
+    """
+
+    def __init__(self, text_to_speech: TextToSpeech, language: str):
+        self.text_to_speech = text_to_speech
+        self.language = language
+        self.pending: Deque[Tuple[str, asyncio.Task]] = deque()
+
+    def submit(self, text: str):
+        """
+        Function to start synthesizing a sentence without waiting for the audio
+
+        Args:
+            text (str): The sentence to synthesize
+        """
+        task = asyncio.create_task(self.text_to_speech.readTextAsync(text, True, self.language))
+        self.pending.append((text, task))
+
+    def ready(self) -> List[Tuple[str, str]]:
+        """
+        Function to collect the audio that can be sent without breaking the order of the sentences
+
+        Returns:
+            List[Tuple[str, str]]: The sentences at the head of the pipeline that have finished synthesizing,
+            along with their base64 encoded audio
+        """
+        results = []
+        while self.pending and self.pending[0][1].done():
+            text, task = self.pending.popleft()
+            results.append((text, task.result()))
+        return results
+
+    async def drain(self) -> AsyncGenerator[Tuple[str, str], None]:
+        """
+        Function to wait for every submitted sentence to finish synthesizing
+
+        Returns:
+            AsyncGenerator[Tuple[str, str], None]: The remaining sentences and their base64 encoded audio, in order
+        """
+        while self.pending:
+            text, task = self.pending[0]
+            audio_data = await task
+            self.pending.popleft()
+            yield text, audio_data
+
+    def cancel(self):
+        """
+        Function to stop waiting for sentences that have not been sent, e.g. when the client disconnects
+        """
+        while self.pending:
+            _, task = self.pending.popleft()
+            task.cancel()
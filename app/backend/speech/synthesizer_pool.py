@@ -0,0 +1,113 @@
+import logging
+import queue
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Iterator, Tuple
+
+from azure.cognitiveservices.speech import (
+    Connection,
+    SpeechConfig,
+    SpeechSynthesisOutputFormat,
+    SpeechSynthesizer,
+)
+
+
+class SynthesizerPool:
+    """
+    A pool of pre-warmed speech synthesizers for a single voice
+
+    Every pool owns its SpeechConfig, so synthesizers for different voices never share mutable state.
+    A synthesizer is checked out by one synthesis at a time and returned to the pool afterwards.
+
+    Attributes:
+        voice_name (str): The name of the voice used by every synthesizer in the pool
+        size (int): The number of idle synthesizers kept warm in the pool
+        speech_config (SpeechConfig): The speech config used to create the synthesizers
+        created (int): The number of synthesizers created by the pool, including overflow synthesizers
+    """
+
+    def __init__(
+        self,
+        auth_token: str,
+        region: str,
+        voice_name: str,
+        output_format: SpeechSynthesisOutputFormat,
+        size: int,
+    ):
+        self.voice_name = voice_name
+        self.size = size
+        self.speech_config = SpeechConfig(auth_token=auth_token, region=region)
+        self.speech_config.speech_synthesis_voice_name = voice_name
+        self.speech_config.speech_synthesis_output_format = output_format
+        # Synthesizers are pooled along with their connection, which has to outlive the pre-connect
+        self.idle: queue.Queue[Tuple[SpeechSynthesizer, Connection]] = queue.Queue(maxsize=size)
+        # Every live synthesizer, including checked out and overflow ones, so a new token reaches all of them
+        self.synthesizers: weakref.WeakSet[SpeechSynthesizer] = weakref.WeakSet()
+        self.stats_lock = threading.Lock()
+        self.created = 0
+        self.checked_out = 0
+        for _ in range(size):
+            self.idle.put_nowait(self.createSynthesizer())
+
+    def createSynthesizer(self) -> Tuple[SpeechSynthesizer, Connection]:
+        speech_synthesizer = SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        connection = Connection.from_speech_synthesizer(speech_synthesizer)
+        try:
+            # Connect ahead of the first synthesis so it does not pay for the handshake
+            connection.open(True)
+        except Exception as error:
+            logging.warning("Unable to pre-connect speech synthesizer for %s: %s", self.voice_name, error)
+        with self.stats_lock:
+            self.created += 1
+            self.synthesizers.add(speech_synthesizer)
+        return speech_synthesizer, connection
+
+    def updateAuthToken(self, auth_token: str):
+        """
+        Function to switch the pool to a new authorization token, for new and existing synthesizers
+
+        Args:
+            auth_token (str): The new authorization token
+        """
+        self.speech_config.authorization_token = auth_token
+        with self.stats_lock:
+            synthesizers = list(self.synthesizers)
+        for speech_synthesizer in synthesizers:
+            speech_synthesizer.authorization_token = auth_token
+
+    @contextmanager
+    def checkout(self) -> Iterator[SpeechSynthesizer]:
+        """
+        Function to borrow a synthesizer from the pool for a single synthesis
+
+        A new synthesizer is created when every pooled synthesizer is in use, and it is discarded
+        on return if the pool is already full
+
+        Returns:
+            Iterator[SpeechSynthesizer]: The synthesizer, which is returned to the pool when the context exits
+        """
+        try:
+            pooled_synthesizer = self.idle.get_nowait()
+        except queue.Empty:
+            pooled_synthesizer = self.createSynthesizer()
+        with self.stats_lock:
+            self.checked_out += 1
+        try:
+            yield pooled_synthesizer[0]
+        finally:
+            with self.stats_lock:
+                self.checked_out -= 1
+            try:
+                self.idle.put_nowait(pooled_synthesizer)
+            except queue.Full:
+                pass
+
+    def getStats(self) -> dict[str, Any]:
+        with self.stats_lock:
+            return {
+                "size": self.size,
+                "idle": self.idle.qsize(),
+                "checked_out": self.checked_out,
+                "created": self.created,
+            }
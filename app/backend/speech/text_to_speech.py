@@ -1,13 +1,16 @@
+import asyncio
 import base64
+import logging
 import re
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
 
 from azure.cognitiveservices.speech import (
     ResultReason,
-    SpeechConfig,
     SpeechSynthesisOutputFormat,
     SpeechSynthesisResult,
-    SpeechSynthesizer,
 )
 from config import (
     CONFIG_CREDENTIAL,
@@ -16,25 +19,69 @@ from config import (
     CONFIG_SPEECH_SERVICE_TOKEN,
 )
 from models.language import LanguageBCP47
+from opentelemetry import trace
 from quart import current_app
 from utils.utils import Utils
 
+from .audio_cache import AudioCache
+from .synthesizer_pool import SynthesizerPool
+
+DEFAULT_SYNTHESIS_WORKERS = 8
+DEFAULT_SYNTHESIZERS_PER_VOICE = 2
+
 
 class TextToSpeech:
+    """
+    Text to speech service backed by Azure Speech
+
+    Synthesis through the SDK blocks until the audio is ready, so async callers go through readTextAsync,
+    which runs readText on a bounded pool of synthesis workers instead of on the event loop.
+    Each supported language has its own pool of pre-warmed synthesizers, created when the service is created.
+
+    Attributes:
+        synthesizer_pools (dict[str, SynthesizerPool]): The synthesizer pool for each supported language
+        audio_cache (Optional[AudioCache]): The cache of previously synthesized audio, or None if caching is disabled
+        max_workers (int): The maximum number of sentences synthesized at the same time
+        queued (int): The number of synthesis requests waiting for a free worker
+        in_flight (int): The number of synthesis requests currently being synthesized
+    """
 
-    def __init__(self, speech_token) -> None:
+    def __init__(
+        self,
+        speech_token,
+        max_workers: int = DEFAULT_SYNTHESIS_WORKERS,
+        synthesizers_per_voice: int = DEFAULT_SYNTHESIZERS_PER_VOICE,
+        audio_cache: Optional[AudioCache] = None,
+    ) -> None:
         self.resource_id = current_app.config.get(CONFIG_SPEECH_SERVICE_ID)
         self.region = current_app.config[CONFIG_SPEECH_SERVICE_LOCATION]
         self.speech_token = speech_token
         self.auth_token = self.getAuthToken()
-        self.speech_config = SpeechConfig(auth_token=self.auth_token, region=self.region)
-        self.speech_config.speech_synthesis_output_format = SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3
-        self.speech_synthesizer = SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        self.output_format = SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3
+        self.synthesizer_pools = {
+            language: SynthesizerPool(
+                self.auth_token, self.region, voice_name, self.output_format, synthesizers_per_voice
+            )
+            for language, voice_name in LanguageBCP47.voice_mapping.items()
+        }
+
+        self.audio_cache = audio_cache
+
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="text_to_speech")
+        self.stats_lock = threading.Lock()
+        self.queued = 0
+        self.in_flight = 0
 
     @classmethod
-    async def create(cls):
+    async def create(
+        cls,
+        max_workers: int = DEFAULT_SYNTHESIS_WORKERS,
+        synthesizers_per_voice: int = DEFAULT_SYNTHESIZERS_PER_VOICE,
+        audio_cache: Optional[AudioCache] = None,
+    ):
         speech_token = await cls.getCredential()
-        return cls(speech_token)
+        return cls(speech_token, max_workers, synthesizers_per_voice, audio_cache)
 
     @staticmethod
     async def getCredential():
@@ -49,28 +96,135 @@ class TextToSpeech:
     def getAuthToken(self):
         return "aad#" + self.resource_id + "#" + self.speech_token.token
 
+    def updateAuthToken(self, auth_token: str):
+        self.auth_token = auth_token
+        for pool in self.synthesizer_pools.values():
+            pool.updateAuthToken(auth_token)
+
+    def getStats(self) -> dict[str, Any]:
+        """
+        Function to get the current load of the synthesis worker pool and the synthesizer pools
+
+        Returns:
+            dict[str, Any]: The pool size, the number of queued requests, the number of requests being synthesized,
+            the state of the synthesizer pool for each language and the audio cache hit/miss counters
+        """
+        with self.stats_lock:
+            stats: dict[str, Any] = {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+            }
+        stats["synthesizers"] = {language: pool.getStats() for language, pool in self.synthesizer_pools.items()}
+        if self.audio_cache is not None:
+            stats["audio_cache"] = self.audio_cache.getStats()
+        return stats
+
+    async def readTextAsync(self, text, encode: bool, language=None):
+        """
+        Function to synthesize text on the synthesis worker pool without blocking the event loop
+
+        Args:
+            text (str): The text to synthesize
+            encode (bool): Whether to return the audio as a base64 string instead of bytes
+            language (str): The language of the voice to use, detected from the text if not given
+
+        Returns:
+            The synthesized audio, as a base64 string if encode is True or as bytes otherwise
+        """
+        audio_cache = self.audio_cache
+        if language is not None and audio_cache is not None:
+            # Cached audio in memory is returned right away instead of waiting for a free worker
+            audio_data = audio_cache.peek(self.getCacheKey(self.cleanText(text), language))
+            if audio_data is not None:
+                self.recordCacheStats()
+                return self.encodeAudio(audio_data, encode)
+
+        with self.stats_lock:
+            self.queued += 1
+            trace.get_current_span().set_attribute("Speech synthesis queue depth", self.queued)
+        future = self.executor.submit(self._readTextOnWorker, text, encode, language)
+        future.add_done_callback(self._onSynthesisDone)
+        result = await asyncio.wrap_future(future)
+        self.recordCacheStats()
+        return result
+
+    def recordCacheStats(self):
+        # Exported on the request span, as the workers synthesizing the audio run outside of it
+        if self.audio_cache is None:
+            return
+        stats = self.audio_cache.getStats()
+        span = trace.get_current_span()
+        span.set_attribute("Audio cache hit rate", stats["hit_rate"])
+        span.set_attribute("Audio cache memory hits", stats["memory_hits"])
+        span.set_attribute("Audio cache disk hits", stats["disk_hits"])
+        span.set_attribute("Audio cache misses", stats["misses"])
+        span.set_attribute("Audio cache memory entries", stats["memory_entries"])
+        span.set_attribute("Audio cache disk bytes", stats["disk_bytes"])
+
+    def _readTextOnWorker(self, text, encode: bool, language=None):
+        with self.stats_lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return self.readText(text, encode, language)
+        finally:
+            with self.stats_lock:
+                self.in_flight -= 1
+
+    def _onSynthesisDone(self, future: Future):
+        # A request cancelled while still queued never reaches a worker
+        if future.cancelled():
+            with self.stats_lock:
+                self.queued -= 1
+
     def readText(self, text, encode: bool, language=None):
         if language is None:
             language = Utils.get_language(text)
 
-        # Force output language for /voice endpoint
-        self.speech_config.speech_synthesis_voice_name = LanguageBCP47.voice_mapping[language]
-        self.speech_synthesizer = SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        text = self.cleanText(text)
+        audio_cache = self.audio_cache
+        if audio_cache is None:
+            return self.encodeAudio(self.synthesize(text, language), encode)
+        cache_key = self.getCacheKey(text, language)
+        audio_data = audio_cache.get(cache_key)
+        if audio_data is None:
+            audio_data = self.synthesize(text, language)
+            audio_cache.set(cache_key, audio_data)
+        return self.encodeAudio(audio_data, encode)
 
-        text = re.sub(r"[*#]", "", text)  # remove * and # from markdown
-        text = re.sub(r"-{2,}", "", text)  # remove 2 or more consecutive `-` from markdown
-        result: SpeechSynthesisResult = self.speech_synthesizer.speak_text_async(text).get()
+    def synthesize(self, text, language) -> bytes:
+        # Force output language for /voice endpoint
+        with self.synthesizer_pools[language].checkout() as speech_synthesizer:
+            result: SpeechSynthesisResult = speech_synthesizer.speak_text_async(text).get()
         if result.reason == ResultReason.SynthesizingAudioCompleted:
-            if encode:
-                return base64.b64encode(result.audio_data).decode("utf-8")
-            else:
-                return result.audio_data
+            return result.audio_data
         elif result.reason == ResultReason.Canceled:
             cancellation_details = result.cancellation_details
-            current_app.logger.error(
+            # readText runs on synthesis workers, outside of the app context
+            logging.error(
                 "Speech synthesis canceled: %s %s", cancellation_details.reason, cancellation_details.error_details
             )
             raise Exception("Speech synthesis canceled. Check logs for details.")
         else:
-            current_app.logger.error("Unexpected result reason: %s", result.reason)
+            logging.error("Unexpected result reason: %s", result.reason)
             raise Exception("Speech synthesis failed. Check logs for details.")
+
+    @staticmethod
+    def cleanText(text: str) -> str:
+        text = re.sub(r"[*#]", "", text)  # remove * and # from markdown
+        text = re.sub(r"-{2,}", "", text)  # remove 2 or more consecutive `-` from markdown
+        return text
+
+    @staticmethod
+    def encodeAudio(audio_data: bytes, encode: bool):
+        if encode:
+            return base64.b64encode(audio_data).decode("utf-8")
+        else:
+            return audio_data
+
+    def getCacheKey(self, text, language) -> str:
+        return AudioCache.getKey(text, LanguageBCP47.voice_mapping[language], self.output_format)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+from azure.core.credentials import AccessToken
+from azure.core.credentials_async import AsyncTokenCredential
+
+SPEECH_TOKEN_SCOPE = "https://cognitiveservices.azure.com/.default"
+DEFAULT_TOKEN_REFRESH_AHEAD = 10 * 60
+DEFAULT_TOKEN_RETRY_INTERVAL = 30
+
+
+class SpeechTokenManager:
+    """
+    Keeps the Azure AD token of the speech resource fresh for the speech services, which live as long as the app
+
+    The token is refreshed in the background ahead of its expiry, and every subscriber is called with the new
+    authorization token, so pooled synthesizers and recognizers switch to it without being rebuilt.
+
+    Attributes:
+        credential (AsyncTokenCredential): The credential used to get the token
+        resource_id (str): The resource id of the speech service
+        refresh_ahead (float): The number of seconds before expiry at which the token is refreshed
+        retry_interval (float): The number of seconds to wait before retrying a failed refresh
+        token (Optional[AccessToken]): The current token, or None before the manager is started
+        subscribers (List[Callable[[str], None]]): Called with the authorization token after every refresh
+        refreshes (int): The number of times a new token was received
+        failures (int): The number of refreshes that failed
+    """
+
+    def __init__(
+        self,
+        credential: AsyncTokenCredential,
+        resource_id: str,
+        refresh_ahead: float = DEFAULT_TOKEN_REFRESH_AHEAD,
+        retry_interval: float = DEFAULT_TOKEN_RETRY_INTERVAL,
+    ):
+        self.credential = credential
+        self.resource_id = resource_id
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self.token: Optional[AccessToken] = None
+        self.subscribers: List[Callable[[str], None]] = []
+        self.refresher: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+
+    async def start(self):
+        """
+        Function to get the first token and start refreshing it in the background
+        """
+        await self.refresh()
+        if self.refresher is None:
+            self.refresher = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self.refresher is not None:
+            self.refresher.cancel()
+            self.refresher = None
+
+    def subscribe(self, callback: Callable[[str], None]):
+        self.subscribers.append(callback)
+
+    def getAuthToken(self) -> str:
+        if self.token is None:
+            raise RuntimeError("The speech token manager has not been started")
+        return "aad#" + self.resource_id + "#" + self.token.token
+
+    async def refresh(self) -> bool:
+        """
+        Function to get the token from the credential, notifying the subscribers if it changed
+
+        Returns:
+            bool: Whether a new token was received
+        """
+        token = await self.credential.get_token(SPEECH_TOKEN_SCOPE)
+        if self.token is not None and token.token == self.token.token:
+            # The credential returns its cached token until it is close enough to expiry
+            return False
+        self.token = token
+        self.refreshes += 1
+        auth_token = self.getAuthToken()
+        for callback in self.subscribers:
+            try:
+                callback(auth_token)
+            except Exception as error:
+                logging.error("Unable to update speech authorization token: %s", error)
+        return True
+
+    def getRefreshDelay(self) -> float:
+        if self.token is None:
+            return 0.0
+        return max(self.token.expires_on - self.refresh_ahead - time.time(), 0.0)
+
+    async def run(self):
+        delay = self.getRefreshDelay()
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                refreshed = await self.refresh()
+            except Exception as error:
+                self.failures += 1
+                logging.warning("Unable to refresh speech token: %s", error)
+                refreshed = False
+            delay = self.getRefreshDelay() if refreshed else self.retry_interval
+
+    def getStats(self) -> dict[str, Any]:
+        return {
+            "expires_in": self.token.expires_on - time.time() if self.token is not None else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -1,17 +1,40 @@
+import asyncio
 import uuid
+from typing import Any, List, Optional, Tuple
 
-import requests
+import aiohttp
 from config import (
     CONFIG_TRANSLATOR_SERVICE_API_KEY,
     CONFIG_TRANSLATOR_SERVICE_ENDPOINT,
     CONFIG_TRANSLATOR_SERVICE_LOCATION,
 )
 from quart import current_app
+from utils.lru_cache import LRUCache
+
+# The Translator API accepts up to 1000 texts and 50000 characters per request, smaller batches are sent concurrently
+MAX_BATCH_TEXTS = 100
+MAX_BATCH_CHARACTERS = 10000
+DEFAULT_TRANSLATION_MEMORY_SIZE = 1024
 
 
 class Translator:
+    """
+    Translator service backed by the Azure AI Translator API
+
+    Requests go through a shared aiohttp session, so connections to the API are reused. Texts are translated in
+    batches, and translations are kept in a translation memory so repeated sentences are not translated again.
 
-    def __init__(self):
+    Attributes:
+        session (Optional[aiohttp.ClientSession]): The session used for requests, created on first use if not given
+        memory (LRUCache[str]): The translation memory, keyed by source language, target language and text
+        requests (int): The number of requests sent to the API
+    """
+
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        memory_size: int = DEFAULT_TRANSLATION_MEMORY_SIZE,
+    ):
         self.key = current_app.config[CONFIG_TRANSLATOR_SERVICE_API_KEY]
         self.location = current_app.config[CONFIG_TRANSLATOR_SERVICE_LOCATION]
         self.endpoint = current_app.config[CONFIG_TRANSLATOR_SERVICE_ENDPOINT]
@@ -21,21 +44,87 @@ class Translator:
             "Ocp-Apim-Subscription-Key": self.key,
             "Ocp-Apim-Subscription-Region": self.location,
             "Content-type": "application/json",
-            "X-ClientTraceId": str(uuid.uuid4()),
         }
+        self.session = session
+        self.owns_session = session is None
+        self.memory: LRUCache[str] = LRUCache(memory_size)
+        self.requests = 0
+
+    def getSession(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def close(self):
+        if self.owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def translate(self, text: str, lang: str) -> str:
+        return await self.translateToLang(text, lang)
+
+    async def translateToLang(self, text: str, lang: str) -> str:
+        return (await self.translateBatch([text], "en", lang))[0]
+
+    async def translateToEng(self, text: str, lang: str) -> str:
+        return (await self.translateBatch([text], lang, "en"))[0]
 
-    def translateToLang(self, text, lang):
-        params = {"api-version": "3.0", "from": "en", "to": lang}
-        body = [{"text": text}]
-        request = requests.post(self.url, params=params, headers=self.headers, json=body)
-        response = request.json()
-        print(response)
-        return response[0]["translations"][0]["text"]
-
-    def translateToEng(self, text, lang):
-        params = {"api-version": "3.0", "from": lang, "to": "en"}
-        body = [{"text": text}]
-        request = requests.post(self.url, params=params, headers=self.headers, json=body)
-        response = request.json()
-        print(response)
-        return response[0]["translations"][0]["text"]
+    async def translateBatch(self, texts: List[str], from_lang: str, to_lang: str) -> List[str]:
+        """
+        Function to translate texts, sending the texts missing from the translation memory in as few requests as possible
+
+        Args:
+            texts (List[str]): The texts to translate
+            from_lang (str): The language of the texts
+            to_lang (str): The language to translate the texts to
+
+        Raises:
+            aiohttp.ClientResponseError: If the API returns an error
+
+        Returns:
+            List[str]: The translations, in the same order as the texts
+        """
+        cached = {text: self.memory.get((from_lang, to_lang, text)) for text in texts}
+        translations = {text: translation for text, translation in cached.items() if translation is not None}
+        # Repeated texts are only translated once
+        missing = [text for text in cached if text not in translations]
+        results = await asyncio.gather(
+            *[self.sendBatch(batch, from_lang, to_lang) for batch in self.getBatches(missing)]
+        )
+        for batch, batch_translations in results:
+            for text, translation in zip(batch, batch_translations):
+                translations[text] = translation
+                self.memory.set((from_lang, to_lang, text), translation)
+        return [translations[text] for text in texts]
+
+    @staticmethod
+    def getBatches(texts: List[str]) -> List[List[str]]:
+        batches: List[List[str]] = []
+        characters = 0
+        for text in texts:
+            if not batches or len(batches[-1]) >= MAX_BATCH_TEXTS or characters + len(text) > MAX_BATCH_CHARACTERS:
+                batches.append([])
+                characters = 0
+            batches[-1].append(text)
+            characters += len(text)
+        return batches
+
+    async def sendBatch(self, texts: List[str], from_lang: str, to_lang: str) -> Tuple[List[str], List[str]]:
+        params = {"api-version": "3.0", "from": from_lang, "to": to_lang}
+        headers = {**self.headers, "X-ClientTraceId": str(uuid.uuid4())}
+        body = [{"text": text} for text in texts]
+        self.requests += 1
+        async with self.getSession().post(self.url, params=params, headers=headers, json=body) as response:
+            response.raise_for_status()
+            response_json = await response.json()
+        return texts, [item["translations"][0]["text"] for item in response_json]
+
+    def getStats(self) -> dict[str, Any]:
+        memory_stats = self.memory.get_stats()
+        return {
+            "requests": self.requests,
+            "memory_entries": memory_stats["size"],
+            "memory_hits": memory_stats["hits"],
+            "memory_misses": memory_stats["misses"],
+            "memory_hit_rate": memory_stats["hit_rate"],
+        }
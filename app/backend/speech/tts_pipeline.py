@@ -1,25 +1,31 @@
+from config import CONFIG_TEXT_TO_SPEECH_SERVICE, CONFIG_TRANSLATOR
+from quart import current_app
+
 from .text_to_speech import TextToSpeech
 from .translate import Translator
 
 
 class TTSPipeline:
 
-    def __init__(self):
-        self.text_to_speech = None
-        self.translator = Translator()
+    def __init__(self, text_to_speech: TextToSpeech, translator: Translator):
+        self.text_to_speech = text_to_speech
+        self.translator = translator
 
     @classmethod
     async def create(cls):
-        pipeline = cls()
-        pipeline.text_to_speech = await TextToSpeech.create()
-        return pipeline
+        # The services are shared by the app, so their synthesizer pools and connections are reused
+        text_to_speech = current_app.config[CONFIG_TEXT_TO_SPEECH_SERVICE]
+        translator = current_app.config.get(CONFIG_TRANSLATOR)
+        if translator is None:
+            raise ValueError("Translator not configured, missing AZURE_TRANSLATOR_SERVICE_API_KEY")
+        return cls(text_to_speech, translator)
 
     async def process_and_stream_audio(self, chunk, language):
         if language == "en":
             translated_chunk = chunk
         else:
             translated_chunk = await self.translator.translate(chunk, language)
-        audio_data = await self.text_to_speech.readText(translated_chunk)
+        audio_data = await self.text_to_speech.readTextAsync(translated_chunk, True)
         if audio_data:
             return audio_data
             # return {audio_data: audio_data, translated_chunk: translated_chunk}
@@ -1,2 +1,9 @@
+import re
+
+
 def nonewlines(s: str) -> str:
     return s.replace("\n", " ").replace("\r", " ")
+
+
+def normalize_query(s: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", s.casefold()).split())
@@ -0,0 +1,174 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional
+
+from azure.cosmos.aio import ContainerProxy
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from models.chat_history import ChatHistory
+from models.chat_turn import ChatTurn, ChatTurnItem
+
+
+class ChatHistoryStore(ABC):
+    """
+    A store of the chat history of every session
+    """
+
+    @abstractmethod
+    async def append_turns(self, session_id: str, turns: List[ChatTurn]):
+        """
+        Function to append turns to the chat history of a session
+
+        Args:
+            session_id (str): The session id of the chat
+            turns (List[ChatTurn]): The turns to append, in the order they happened
+        """
+        pass
+
+    @abstractmethod
+    async def read_history(self, session_id: str) -> Optional[ChatHistory]:
+        """
+        Function to read the chat history of a session
+
+        Args:
+            session_id (str): The session id of the chat
+
+        Returns:
+            Optional[ChatHistory]: The chat history, or None if nothing has been stored for the session
+        """
+        pass
+
+
+class CosmosChatHistoryStore(ChatHistoryStore):
+    """
+    A store that keeps the chat history of each session in a single Cosmos DB item
+
+    Attributes:
+        container_client (ContainerProxy): The client of the chat history container
+    """
+
+    def __init__(self, container_client: ContainerProxy):
+        self.container_client = container_client
+
+    async def append_turns(self, session_id: str, turns: List[ChatTurn]):
+        chat_messages = [message for turn in turns for message in turn.chat_messages]
+        try:
+            chat_history_item = await self.container_client.read_item(item=session_id, partition_key=session_id)
+            chat_history = ChatHistory(**chat_history_item)
+            chat_history.chat_messages.extend(chat_messages)
+            chat_history.last_modified = turns[-1].created_at
+        except CosmosResourceNotFoundError:  # If the chat history does not exist
+            chat_history = ChatHistory(
+                id=session_id,
+                session_id=session_id,
+                created_at=turns[0].created_at,
+                last_modified=turns[-1].created_at,
+                chat_messages=chat_messages,
+            )
+        await self.container_client.upsert_item(chat_history.model_dump())
+
+    async def read_history(self, session_id: str) -> Optional[ChatHistory]:
+        try:
+            chat_history_item = await self.container_client.read_item(item=session_id, partition_key=session_id)
+        except CosmosResourceNotFoundError:
+            return None
+        return ChatHistory(**chat_history_item)
+
+
+class AppendOnlyChatHistoryStore(ChatHistoryStore):
+    """
+    A store that keeps each turn as its own Cosmos DB item in the partition of its session
+
+    Turns are only ever created, so storing a turn costs the same however long the chat is, and turns written
+    concurrently for the same session do not overwrite each other. Sessions stored as a single item before
+    switching to this store are still read, with their messages before the turns stored since.
+
+    Attributes:
+        container_client (ContainerProxy): The client of the chat history container
+    """
+
+    def __init__(self, container_client: ContainerProxy):
+        self.container_client = container_client
+
+    async def append_turns(self, session_id: str, turns: List[ChatTurn]):
+        # Item ids are derived from the turn, so a retried write replaces the item instead of duplicating it
+        await asyncio.gather(
+            *[self.container_client.upsert_item(ChatTurnItem.from_turn(turn).model_dump()) for turn in turns]
+        )
+
+    async def read_history(self, session_id: str) -> Optional[ChatHistory]:
+        items = [
+            item
+            async for item in self.container_client.query_items(
+                query="SELECT * FROM c WHERE c.session_id = @session_id",
+                parameters=[{"name": "@session_id", "value": session_id}],
+                partition_key=session_id,
+            )
+        ]
+        return build_chat_history(session_id, items)
+
+
+class InMemoryChatHistoryStore(ChatHistoryStore):
+    """
+    A store that keeps the chat history in memory, used in place of Cosmos DB for local testing
+
+    Attributes:
+        chat_histories (dict[str, ChatHistory]): The chat history of each session
+    """
+
+    def __init__(self):
+        self.chat_histories: dict[str, ChatHistory] = {}
+
+    async def append_turns(self, session_id: str, turns: List[ChatTurn]):
+        chat_history = self.chat_histories.get(session_id)
+        if chat_history is None:
+            chat_history = ChatHistory(
+                id=session_id,
+                session_id=session_id,
+                created_at=turns[0].created_at,
+                last_modified=turns[0].created_at,
+                chat_messages=[],
+            )
+            self.chat_histories[session_id] = chat_history
+        for turn in turns:
+            chat_history.chat_messages.extend(turn.chat_messages)
+        chat_history.last_modified = turns[-1].created_at
+
+    async def read_history(self, session_id: str) -> Optional[ChatHistory]:
+        return self.chat_histories.get(session_id)
+
+
+def build_chat_history(session_id: str, items: List[dict[str, Any]]) -> Optional[ChatHistory]:
+    """
+    Utility function to reassemble the chat history of a session from its items
+
+    Args:
+        session_id (str): The session id of the chat
+        items (List[dict[str, Any]]): The turn items of the session, in any order, and the session item if the
+            session was stored before turns were stored as separate items
+
+    Returns:
+        Optional[ChatHistory]: The chat history, or None if there are no items
+    """
+    chat_history = None
+    turns: List[ChatTurnItem] = []
+    for item in items:
+        if item.get("type") == "turn":
+            turns.append(ChatTurnItem(**item))
+        else:
+            chat_history = ChatHistory(**item)
+    turns.sort(key=lambda turn: turn.sequence)
+
+    if chat_history is None:
+        if not turns:
+            return None
+        chat_history = ChatHistory(
+            id=session_id,
+            session_id=session_id,
+            created_at=turns[0].created_at,
+            last_modified=turns[0].created_at,
+            chat_messages=[],
+        )
+    for turn in turns:
+        chat_history.chat_messages.extend(turn.chat_messages)
+        chat_history.last_modified = turn.created_at
+    return chat_history
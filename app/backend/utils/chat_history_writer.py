@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from models.chat_turn import ChatTurn
+from tenacity import AsyncRetrying, stop_after_attempt, wait_random_exponential
+from utils.chat_history_store import ChatHistoryStore
+
+
+class ChatHistoryWriter:
+    """
+    A write-behind writer of chat history, so that responses do not wait for the chat history to be stored
+
+    Turns are put on a bounded queue and stored by a background flusher. The flusher takes every turn waiting
+    on the queue and stores the turns of each session in a single write, in the order they were queued.
+    When the queue is full, callers wait for space, which slows responses down instead of dropping turns.
+
+    Attributes:
+        store (ChatHistoryStore): The store the chat history is written to
+        queue (asyncio.Queue[ChatTurn]): The turns waiting to be stored
+        max_batch_size (int): The maximum number of turns taken from the queue in one flush
+        retry_attempts (int): The number of attempts to store the turns of a session before they are dropped
+        retry_wait_max (float): The maximum number of seconds to wait between attempts
+        flusher (Optional[asyncio.Task]): The background task storing the queued turns
+        written (int): The number of turns stored
+        failed (int): The number of turns dropped after every attempt to store them failed
+    """
+
+    def __init__(
+        self,
+        store: ChatHistoryStore,
+        max_queue_size: int = 1000,
+        max_batch_size: int = 100,
+        retry_attempts: int = 5,
+        retry_wait_max: float = 10.0,
+    ):
+        self.store = store
+        self.queue: asyncio.Queue[ChatTurn] = asyncio.Queue(maxsize=max_queue_size)
+        self.max_batch_size = max_batch_size
+        self.retry_attempts = retry_attempts
+        self.retry_wait_max = retry_wait_max
+        self.flusher: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self.run())
+
+    async def write(self, turn: ChatTurn):
+        """
+        Function to queue a turn to be stored, waiting for space if the queue is full
+
+        Args:
+            turn (ChatTurn): The turn to store
+        """
+        await self.queue.put(turn)
+
+    async def run(self):
+        while True:
+            turns = [await self.queue.get()]
+            while len(turns) < self.max_batch_size and not self.queue.empty():
+                turns.append(self.queue.get_nowait())
+            try:
+                await self.flush_turns(turns)
+            finally:
+                for _ in turns:
+                    self.queue.task_done()
+
+    async def flush_turns(self, turns: List[ChatTurn]):
+        # Turns are grouped by session in queue order, and the sessions are written concurrently
+        sessions: dict[str, List[ChatTurn]] = {}
+        for turn in turns:
+            sessions.setdefault(turn.session_id, []).append(turn)
+        await asyncio.gather(*[self.write_session(session_id, turns) for session_id, turns in sessions.items()])
+
+    async def write_session(self, session_id: str, turns: List[ChatTurn]):
+        try:
+            async for attempt in AsyncRetrying(
+                wait=wait_random_exponential(min=0.1, max=self.retry_wait_max),
+                stop=stop_after_attempt(self.retry_attempts),
+                reraise=True,
+            ):
+                with attempt:
+                    await self.store.append_turns(session_id, turns)
+            self.written += len(turns)
+        except Exception as error:
+            self.failed += len(turns)
+            logging.error("Error storing chat history for session %s: %s", session_id, error)
+
+    async def flush(self):
+        """
+        Function to wait until every queued turn has been stored or dropped
+        """
+        await self.queue.join()
+
+    async def close(self, timeout: float = 30.0):
+        """
+        Function to store the queued turns and stop the background flusher
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the queued turns to be stored
+        """
+        if self.flusher is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logging.error("Timed out storing chat history, %d turns were not stored", self.queue.qsize())
+        self.flusher.cancel()
+        self.flusher = None
+
+    def get_stats(self) -> dict[str, int]:
+        return {"queued": self.queue.qsize(), "written": self.written, "failed": self.failed}
@@ -1,10 +1,17 @@
 import dataclasses
 import json
 import logging
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
 from error.error import error_response
 
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # orjson is optional, the standard library encoder is used without it
+    HAS_ORJSON = False
+
 
 class JSONEncoder(json.JSONEncoder):
     """
@@ -25,3 +32,51 @@ class JSONEncoder(json.JSONEncoder):
         except Exception as error:
             logging.exception("Exception while generating response stream: %s", error)
             yield json.dumps(error_response(error, language))
+
+    @staticmethod
+    def dumps(o: Any) -> str:
+        """
+        Function to encode an object into compact json, using orjson when it is installed
+
+        Args:
+            o (Any): The object to encode, which may contain dataclasses
+
+        Returns:
+            str: The json string, with non-ascii characters kept as is
+        """
+        if HAS_ORJSON:
+            return orjson.dumps(o).decode("utf-8")
+        return json.dumps(o, ensure_ascii=False, separators=(",", ":"), cls=JSONEncoder)
+
+    @staticmethod
+    async def format_as_events(r: AsyncGenerator[dict, None], language: str) -> AsyncGenerator[dict, None]:
+        """
+        Function to pass the events of the LLM response through as dicts, without encoding them to json and back
+
+        The ThoughtSteps in the context event are converted to dicts, which is the only part of the stream
+        that is not json-compatible already. An exception raised by the stream is turned into an error event.
+
+        Args:
+            r (AsyncGenerator[dict, None]): The events of the LLM response
+            language (str): The language of the response chosen by the user, used for the error message
+
+        Returns:
+            AsyncGenerator[dict, None]: The events, followed by an error event if the stream failed
+        """
+        try:
+            async for event in r:
+                context = event.get("context")
+                if context and context.get("thoughts"):
+                    thoughts = [
+                        (
+                            dataclasses.asdict(thought)
+                            if dataclasses.is_dataclass(thought) and not isinstance(thought, type)
+                            else thought
+                        )
+                        for thought in context["thoughts"]
+                    ]
+                    event = {**event, "context": {**context, "thoughts": thoughts}}
+                yield event
+        except Exception as error:
+            logging.exception("Exception while generating response stream: %s", error)
+            yield error_response(error, language)
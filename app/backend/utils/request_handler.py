@@ -1,4 +1,6 @@
-from typing import Any, List
+import asyncio
+import logging
+from typing import Any, List, Optional
 
 from azure.search.documents.aio import SearchClient
 from config import CONFIG_SEARCH_CLIENT
@@ -7,10 +9,13 @@ from models.feedback import FeedbackRequest
 from models.language import LanguageSelected
 from models.profile import Profile
 from models.request import Request
-from models.source import SourceWithChunk
+from models.source import Source, SourceWithChunk
 from quart import current_app
 from utils.utils import Utils
 
+CHUNK_NOT_FOUND = "Chunk for source cannot be found"
+CHUNK_LOOKUP_CONCURRENCY = 10
+
 
 class RequestHandler:
     """
@@ -22,28 +27,46 @@ class RequestHandler:
         """
         Function to retrieve the text chunks for the sources in the chat history
 
+        Chunks already in the request are reused, and the remaining ids are looked up once each, concurrently
+
         Args:
             feedback_request (FeedbackRequest): FeedbackRequest object to add the retrieved text chunks to
 
         Returns:
             FeedbackRequest object with the text chunks added to the sources
         """
-        search_client: SearchClient = current_app.config[CONFIG_SEARCH_CLIENT]
+        chunks: dict[str, str] = {
+            source.id: source.chunk
+            for chatHistory in feedback_request.chat_history
+            for source in chatHistory.sources
+            if isinstance(source, SourceWithChunk)
+        }
+        missing_ids = list(
+            dict.fromkeys(
+                id
+                for chatHistory in feedback_request.chat_history
+                for source in chatHistory.sources
+                if isinstance(source, Source)
+                for id in source.ids
+                if id not in chunks
+            )
+        )
+        chunks.update(await get_chunks_by_id(missing_ids))
+
         for chatHistory in feedback_request.chat_history:
             sources: List[SourceWithChunk] = []
             for source in chatHistory.sources:
+                if isinstance(source, SourceWithChunk):
+                    sources.append(source)
+                    continue
                 for id in source.ids:
-                    try:
-                        result = await search_client.get_document(id)  # Retrieve text chunks via id
-                    except Exception:
-                        result = {"chunks": "Chunk for source cannot be found"}
                     src = SourceWithChunk(
                         id=id,
                         title=source.title,
                         cover_image_url=source.cover_image_url,
                         full_url=source.full_url,
                         content_category=source.content_category,
-                        chunk=result["chunks"],
+                        chunk=chunks.get(id, CHUNK_NOT_FOUND),
                         category_description=source.category_description,
                         pr_name=source.pr_name,
                         date_modified=source.date_modified,
@@ -114,3 +137,30 @@ class RequestHandler:
             chat_history=data["chat_history"],
         )
         return feedback_request
+
+
+async def get_chunks_by_id(ids: List[str]) -> dict[str, str]:
+    """
+    Utility function to retrieve the text chunks of documents from the search index, looking up a bounded number of ids at a time
+
+    Args:
+        ids (List[str]): The unique ids of the documents
+
+    Returns:
+        dict[str, str]: The text chunk of each id that was found
+    """
+    search_client: SearchClient = current_app.config[CONFIG_SEARCH_CLIENT]
+    # The id key field is not filterable in the default index schema, so ids are looked up one document at a time
+    semaphore = asyncio.Semaphore(CHUNK_LOOKUP_CONCURRENCY)
+
+    async def get_chunk(id: str) -> Optional[str]:
+        async with semaphore:
+            try:
+                result = await search_client.get_document(id)  # Retrieve text chunks via id
+            except Exception as error:
+                logging.warning("Unable to retrieve chunk %s for feedback: %s", id, error)
+                return None
+        return result["chunks"]
+
+    results = await asyncio.gather(*[get_chunk(id) for id in ids])
+    return {id: chunk for id, chunk in zip(ids, results) if chunk is not None}
@@ -6,18 +6,18 @@ import time
 from typing import Any, AsyncGenerator, List
 
 import pytz
-from azure.cosmos import ContainerProxy
-from azure.cosmos.exceptions import CosmosHttpResponseError
-from config import CONFIG_CHAT_HISTORY_CONTAINER_CLIENT, CONFIG_TEXT_TO_SPEECH_SERVICE
+from config import CONFIG_CHAT_HISTORY_WRITER, CONFIG_TEXT_TO_SPEECH_SERVICE
 from models.apilog import APILog
 from models.chat import TextChatResponse, TextChatResponseWithChunk
-from models.chat_history import ChatHistory
 from models.chat_message import ChatMessageWithSource
+from models.chat_turn import ChatTurn
 from models.request_type import RequestType
 from models.source import Source, SourceWithChunk
 from models.voice import VoiceChatResponse
 from opentelemetry import trace
 from quart import current_app, request, stream_with_context
+from speech.synthesis_pipeline import SynthesisPipeline
+from utils.chat_history_writer import ChatHistoryWriter
 from utils.json_encoder import JSONEncoder
 
 # Get the global tracer provider
@@ -49,62 +49,60 @@ class ResponseHandler:
         @stream_with_context
         async def generator() -> AsyncGenerator[str, None]:
             tts = current_app.config[CONFIG_TEXT_TO_SPEECH_SERVICE]
+            # Sentences are synthesized in the background so that synthesis overlaps with the LLM stream
+            synthesis_pipeline = SynthesisPipeline(tts, language) if request_type == RequestType.VOICE else None
             apiLog = APILog()
             response_message = ""
             count = 0
-            async for res in JSONEncoder.format_as_ndjson(result, language):
-                res = json.loads(res)
-                error_msg = res.get("error", None)
-                thoughts = res.get("context", {}).get("thoughts", [])
-                text_response_chunk = ""
-                if error_msg is not None:
-                    yield construct_error_response(error_msg, request_type, language)
-                elif not thoughts == []:
-                    yield construct_source_response(thoughts, request_type)
-                    apiLog = extract_thoughts_for_logging(thoughts, apiLog)
-                else:
-                    # Extract text response
-                    text_response_chunk = res.get("delta", {}).get("content", "")
-
-                    if text_response_chunk is None:
-                        if not response_message == "":
-                            audio_data = tts.readText(response_message, True, language)
-                            response = VoiceChatResponse(
-                                response_message=response_message,
-                                sources=[],
-                                audio_base64=audio_data,
-                            )
-                            yield response.model_dump_json()
-                            response_message = ""
-                        break
-
-                    apiLog.response_message += text_response_chunk
-                    apiLog.output_token_count += 1
-
-                    if request_type == RequestType.CHAT:
-                        response = TextChatResponse(
-                            response_message=text_response_chunk,
-                            sources=[],
-                        )
-                        yield response.model_dump_json()
+            try:
+                async for res in JSONEncoder.format_as_events(result, language):
+                    error_msg = res.get("error", None)
+                    thoughts = res.get("context", {}).get("thoughts", [])
+                    text_response_chunk = ""
+                    if error_msg is not None:
+                        if synthesis_pipeline is not None:  # Send audio of earlier sentences before the error
+                            async for message, audio_data in synthesis_pipeline.drain():
+                                yield construct_audio_response(message, audio_data)
+                        yield await construct_error_response(error_msg, request_type, language)
+                    elif not thoughts == []:
+                        yield construct_source_response(thoughts, request_type)
+                        apiLog = extract_thoughts_for_logging(thoughts, apiLog)
                     else:
-                        response_message += text_response_chunk
-                        if bool(
-                            re.search(r"[.,!?。，！？]\s", text_response_chunk)
-                        ):  # Transcribe text only when punctuation is detected
-                            audio_data = tts.readText(response_message, True, language)
-                            response = VoiceChatResponse(
-                                response_message=response_message,
-                                sources=[],
-                                audio_base64=audio_data,
-                            )
-                            yield response.model_dump_json()
-                            response_message = ""
-
-                    # Get time of first stream
-                    if not count:
-                        apiLog.first_stream_time_taken = time.time() - start_time
-                        count += 1
+                        # Extract text response
+                        text_response_chunk = res.get("delta", {}).get("content", "")
+
+                        if text_response_chunk is None:
+                            if synthesis_pipeline is not None and not response_message == "":
+                                synthesis_pipeline.submit(response_message)
+                                response_message = ""
+                            break
+
+                        apiLog.response_message += text_response_chunk
+                        apiLog.output_token_count += 1
+
+                        if synthesis_pipeline is None:  # Chat requests are not synthesized
+                            yield construct_text_response(text_response_chunk)
+                        else:
+                            response_message += text_response_chunk
+                            if bool(
+                                re.search(r"[.,!?。，！？]\s", text_response_chunk)
+                            ):  # Transcribe text only when punctuation is detected
+                                synthesis_pipeline.submit(response_message)
+                                response_message = ""
+                            for message, audio_data in synthesis_pipeline.ready():
+                                yield construct_audio_response(message, audio_data)
+
+                        # Get time of first stream
+                        if not count:
+                            apiLog.first_stream_time_taken = time.time() - start_time
+                            count += 1
+
+                if synthesis_pipeline is not None:
+                    async for message, audio_data in synthesis_pipeline.drain():
+                        yield construct_audio_response(message, audio_data)
+            finally:
+                if synthesis_pipeline is not None:
+                    synthesis_pipeline.cancel()
 
             await send_custom_logs(apiLog)  # Send custom logs to app insights
             await store_chat_history(request.cookies.get("session"), apiLog)  # Store chat history in Cosmos DB
@@ -221,7 +219,7 @@ def extract_thoughts_for_logging(thoughts: List[dict[str, Any]], log: APILog) ->
     return log
 
 
-def construct_error_response(error_msg: str, request_type: RequestType, language: str) -> str:
+async def construct_error_response(error_msg: str, request_type: RequestType, language: str) -> str:
     """
     Utility function to construct error response from LLM into a json string
 
@@ -242,7 +240,7 @@ def construct_error_response(error_msg: str, request_type: RequestType, language
             sources=[],
         )
     else:
-        audio_data = tts.readText(error_msg, True, language)
+        audio_data = await tts.readTextAsync(error_msg, True, language)
         response = VoiceChatResponse(
             response_message=error_msg,
             sources=[],
@@ -251,6 +249,40 @@ def construct_error_response(error_msg: str, request_type: RequestType, language
     return response.model_dump_json()
 
 
+def construct_text_response(response_message: str) -> str:
+    """
+    Utility function to construct a chat response for a chunk of streamed text into a json string
+
+    This is called for every token, so the json is encoded directly instead of going through TextChatResponse
+
+    Args:
+        response_message (str): The chunk of text from the LLM
+
+    Returns:
+        str: The chat response in our json format, identical to TextChatResponse.model_dump_json
+    """
+    return JSONEncoder.dumps({"response_message": response_message, "sources": []})
+
+
+def construct_audio_response(response_message: str, audio_data: str) -> str:
+    """
+    Utility function to construct a voice response for a synthesized sentence into a json string
+
+    Args:
+        response_message (str): The sentence that was synthesized
+        audio_data (str): The base64 encoded audio of the sentence
+
+    Returns:
+        str: The voice response in our json format
+    """
+    response = VoiceChatResponse(
+        response_message=response_message,
+        sources=[],
+        audio_base64=audio_data,
+    )
+    return response.model_dump_json()
+
+
 def construct_source_response(thoughts: List[dict[str, Any]], request_type: RequestType) -> str:
     """
     Utility function to construct source response from LLM into a json string
@@ -309,13 +341,13 @@ async def send_custom_logs(apiLog: APILog):
 @staticmethod
 async def store_chat_history(session_id, apiLog: APILog):
     """
-    Utility function to store chat history in Cosmos DB
+    Utility function to queue the chat history to be stored in Cosmos DB in the background
 
     Args:
         session_id (str): The session id of the chat
         apiLog (APILog): The APILog object containing the logs that will be stored
     """
-    chat_history_client: ContainerProxy = current_app.config[CONFIG_CHAT_HISTORY_CONTAINER_CLIENT]
+    chat_history_writer: ChatHistoryWriter = current_app.config[CONFIG_CHAT_HISTORY_WRITER]
     response_message = ChatMessageWithSource(
         role="assistant", content=apiLog.response_message, sources=apiLog.retrieved_sources
     )
@@ -325,19 +357,8 @@ async def store_chat_history(session_id, apiLog: APILog):
     date_time = str(datetime.datetime.now(pytz.timezone("Asia/Singapore")))
 
     try:
-        try:
-            chat_history_item = await chat_history_client.read_item(item=session_id, partition_key=session_id)
-            chat_history = ChatHistory(**chat_history_item)
-            chat_history.chat_messages.extend(chat_message)
-            chat_history.last_modified = date_time
-        except CosmosHttpResponseError:  # If the chat history does not exist
-            chat_history = ChatHistory(
-                id=session_id,
-                session_id=session_id,
-                created_at=date_time,
-                last_modified=date_time,
-                chat_messages=chat_message,
-            )
-        await chat_history_client.upsert_item(chat_history.model_dump())
+        await chat_history_writer.write(
+            ChatTurn(session_id=session_id, created_at=date_time, chat_messages=chat_message)
+        )
     except Exception as e:
         logging.info("Error storing chat history: ", e)
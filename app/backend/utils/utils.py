@@ -1,23 +1,69 @@
-from lingua import Language, LanguageDetectorBuilder
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
 from opentelemetry import trace
 
 # Get the global tracer provider
 tracer = trace.get_tracer(__name__)
 
+SUPPORTED_LANGUAGES = [Language.ENGLISH, Language.CHINESE, Language.TAMIL, Language.MALAY]
+LANGUAGE_CACHE_SIZE = 1024
+
+# The detector loads n-gram models for every supported language, so it is built once and shared by the process
+_detector: Optional[LanguageDetector] = None
+_detector_lock = threading.Lock()
+
 
 class Utils:
     """
     Utility function to get the language of the query text if language selected is "spoken"
     """
 
+    @staticmethod
+    def configure_language_detector(preload: bool = False, low_accuracy: bool = False):
+        """
+        Utility function to build the language detector shared by every request
+
+        Args:
+            preload (bool): Whether to load the language models now instead of on first use
+            low_accuracy (bool): Whether to use lingua's low accuracy mode, which is faster and uses less memory
+                but is less reliable for short texts
+        """
+        global _detector
+        detector = _build_language_detector(preload, low_accuracy)
+        with _detector_lock:
+            _detector = detector
+            _detect_language.cache_clear()
+
+    @staticmethod
+    def get_language_detector() -> LanguageDetector:
+        global _detector
+        with _detector_lock:
+            if _detector is None:
+                _detector = _build_language_detector(preload=False, low_accuracy=False)
+            return _detector
+
     @staticmethod
     def get_language(query_text: str):
-        languages = [Language.ENGLISH, Language.CHINESE, Language.TAMIL, Language.MALAY]
-        detector = LanguageDetectorBuilder.from_languages(*languages).build()
-        language = detector.detect_language_of(query_text)
-        if language is None:
-            language = "english"
-            print("Language not detected. Defaulting to English.")
-        else:
-            language = str(language).split(".")[1].lower()  # get language name from enum
-        return language
+        return _detect_language(query_text)
+
+
+def _build_language_detector(preload: bool, low_accuracy: bool) -> LanguageDetector:
+    builder = LanguageDetectorBuilder.from_languages(*SUPPORTED_LANGUAGES)
+    if preload:
+        builder = builder.with_preloaded_language_models()
+    if low_accuracy:
+        builder = builder.with_low_accuracy_mode()
+    return builder.build()
+
+
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def _detect_language(query_text: str) -> str:
+    language = Utils.get_language_detector().detect_language_of(query_text)
+    if language is None:
+        logging.info("Language not detected. Defaulting to English.")
+        return "english"
+    return language.name.lower()  # get language name from enum
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import logging
+from typing import Any, List
+
+from azure.cosmos.aio import ContainerProxy, CosmosClient
+from azure.identity.aio import AzureDeveloperCliCredential
+
+logger = logging.getLogger("migratechathistory")
+
+
+class MigrateChatHistory:
+    """
+    Migrates chat history stored as one item per session to one item per turn, as stored by the app when
+    AZURE_CHAT_HISTORY_STORAGE_MODE is set to "append".
+    """
+
+    def __init__(self, container_client: ContainerProxy, dry_run: bool = False):
+        """
+        Initializes the command
+
+        Parameters
+        ----------
+        container_client
+            Client of the chat history container
+        dry_run
+            Whether to only log the sessions that would be migrated
+        """
+        self.container_client = container_client
+        self.dry_run = dry_run
+
+    async def run(self) -> int:
+        migrated = 0
+        # Turn items have a type, session items do not
+        async for session in self.container_client.query_items(query="SELECT * FROM c WHERE NOT IS_DEFINED(c.type)"):
+            await self.migrate_session(session)
+            migrated += 1
+        logger.info("Migrated %d sessions", migrated)
+        return migrated
+
+    async def migrate_session(self, session: dict[str, Any]):
+        session_id = session["session_id"]
+        turns = self.split_turns(session)
+        logger.info("Migrating session %s with %d turns", session_id, len(turns))
+        if self.dry_run:
+            return
+        # The turn ids only depend on the session and the position of the turn, so the migration can be rerun
+        await asyncio.gather(*[self.container_client.upsert_item(turn) for turn in turns])
+        # The app reads a session item before the turn items, so it is deleted once its turns are written
+        await self.container_client.delete_item(item=session["id"], partition_key=session_id)
+
+    @staticmethod
+    def split_turns(session: dict[str, Any]) -> List[dict[str, Any]]:
+        """
+        Splits the messages of a session into turns, each starting with a message from the user
+
+        The time of each turn was not stored, so every turn but the last is given the time the session was created,
+        and the last turn the time the session was last modified. The turns are numbered from 0, which orders them
+        before any turn stored by the app.
+        """
+        turn_messages: List[List[dict[str, Any]]] = []
+        for message in session["chat_messages"]:
+            if message["role"] == "user" or not turn_messages:
+                turn_messages.append([])
+            turn_messages[-1].append(message)
+
+        session_id = session["session_id"]
+        return [
+            {
+                "id": f"{session_id}:{sequence}",
+                "type": "turn",
+                "session_id": session_id,
+                "sequence": sequence,
+                "created_at": session["last_modified"] if sequence == len(turn_messages) - 1 else session["created_at"],
+                "chat_messages": messages,
+            }
+            for sequence, messages in enumerate(turn_messages)
+        ]
+
+
+async def main(args: Any):
+    azd_credential = (
+        AzureDeveloperCliCredential()
+        if args.tenant_id is None
+        else AzureDeveloperCliCredential(tenant_id=args.tenant_id, process_timeout=60)
+    )
+    async with CosmosClient(
+        url=f"https://{args.cosmos_account}.documents.azure.com:443/", credential=azd_credential
+    ) as cosmos_client:
+        container_client = cosmos_client.get_database_client(args.database).get_container_client(args.container)
+        command = MigrateChatHistory(container_client, dry_run=args.dry_run)
+        await command.run()
+    await azd_credential.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate chat history from one item per session to one item per turn",
+        epilog="Example: migrate_chat_history.py --cosmos-account mycosmos --database chathistory --container history",
+    )
+    parser.add_argument("--cosmos-account", required=True, help="Name of the Azure Cosmos DB account")
+    parser.add_argument("--database", required=True, help="Name of the chat history database")
+    parser.add_argument("--container", required=True, help="Name of the chat history container")
+    parser.add_argument("--dry-run", action="store_true", help="Optional. Only log the sessions that would be migrated")
+    parser.add_argument(
+        "--tenant-id", required=False, help="Optional. Use this to define the Azure directory where to authenticate)"
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    args = parser.parse_args()
+    if args.verbose:
+        logging.basicConfig(level=logging.WARNING, format="%(message)s")
+        logger.setLevel(logging.INFO)
+
+    asyncio.run(main(args))
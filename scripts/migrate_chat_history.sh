@@ -0,0 +1,6 @@
+ #!/bin/sh
+
+. ./scripts/loadenv.sh
+
+echo "Running migrate_chat_history.py. Arguments to script: $@"
+  ./.venv/bin/python ./scripts/migrate_chat_history.py --cosmos-account "$AZURE_COSMOS_DB_NAME" --database "$AZURE_CHAT_HISTORY_DATABASE_ID" --container "$AZURE_CHAT_HISTORY_CONTAINER_ID" $@
@@ -0,0 +1,60 @@
+"""
+Benchmark of Utils.get_language, comparing building the detector per call with the shared detector
+
+Usage: python tests/benchmarks/bench_language_detection.py [--iterations N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app" / "backend"))
+
+from lingua import LanguageDetectorBuilder  # noqa: E402
+from utils.utils import SUPPORTED_LANGUAGES, Utils, _detect_language  # noqa: E402
+
+QUERIES = [
+    "What are the symptoms of dengue fever?",
+    "How can I lower my blood pressure naturally?",
+    "糖尿病患者应该吃什么？",
+    "Apakah tanda-tanda awal strok?",
+    "நீரிழிவு நோயை எவ்வாறு கட்டுப்படுத்துவது?",
+    "Is it safe to exercise during pregnancy?",
+]
+
+
+def rebuild_per_call(query_text: str) -> str:
+    # The previous behaviour of Utils.get_language
+    detector = LanguageDetectorBuilder.from_languages(*SUPPORTED_LANGUAGES).build()
+    language = detector.detect_language_of(query_text)
+    return "english" if language is None else language.name.lower()
+
+
+def measure(name: str, detect, iterations: int):
+    start = time.perf_counter()
+    for i in range(iterations):
+        detect(QUERIES[i % len(QUERIES)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed / iterations * 1000:8.3f} ms/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=60)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    Utils.configure_language_detector(preload=True)
+    print(f"{'preload':<32} {(time.perf_counter() - start) * 1000:8.3f} ms (once per process)")
+
+    measure("rebuild detector per call", rebuild_per_call, args.iterations)
+    measure("shared detector, uncached", _detect_language.__wrapped__, args.iterations)
+    measure("shared detector, cached", Utils.get_language, args.iterations)
+
+    Utils.configure_language_detector(preload=True, low_accuracy=True)
+    measure("low accuracy, uncached", _detect_language.__wrapped__, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the per-event work in ResponseHandler.construct_streaming_response for a 500 chunk chat stream,
+comparing the json round trip through format_as_ndjson with the direct event path
+
+Usage: python tests/benchmarks/bench_streaming_response.py [--chunks N] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app" / "backend"))
+
+from approaches.approach import ThoughtStep  # noqa: E402
+from models.chat import TextChatResponse  # noqa: E402
+from utils.json_encoder import HAS_ORJSON, JSONEncoder  # noqa: E402
+from utils.response_handler import construct_text_response  # noqa: E402
+
+
+def make_stream(chunks: int) -> list[dict]:
+    results = [{"id": str(i), "title": f"Article {i}", "chunks": "Lorem ipsum " * 100} for i in range(3)]
+    thoughts = [ThoughtStep("Step", "description") for _ in range(8)]
+    thoughts[2] = ThoughtStep("Search results", results)
+    events = [{"delta": {"role": "assistant"}, "context": {"thoughts": thoughts}, "session_state": None}]
+    words = ["Dengue ", "is ", "a ", "mosquito-borne ", "viral ", "infection, ", "常见 ", "di ", "Singapura. "]
+    events += [{"delta": {"content": words[i % len(words)], "role": None}} for i in range(chunks)]
+    events.append({"delta": {"content": None, "role": None}})
+    return events
+
+
+async def replay(events: list[dict]):
+    for event in events:
+        yield event
+
+
+async def round_trip(events: list[dict]) -> int:
+    # The previous behaviour of construct_streaming_response
+    size = 0
+    async for res in JSONEncoder.format_as_ndjson(replay(events), "english"):
+        res = json.loads(res)
+        content = res.get("delta", {}).get("content", "")
+        if not res.get("context", {}).get("thoughts", []) and content is not None:
+            size += len(TextChatResponse(response_message=content, sources=[]).model_dump_json())
+    return size
+
+
+async def direct(events: list[dict]) -> int:
+    size = 0
+    async for res in JSONEncoder.format_as_events(replay(events), "english"):
+        content = res.get("delta", {}).get("content", "")
+        if not res.get("context", {}).get("thoughts", []) and content is not None:
+            size += len(construct_text_response(content))
+    return size
+
+
+def measure(name: str, path, events: list[dict], repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        asyncio.run(path(events))
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<12} {elapsed * 1000:8.3f} ms/stream {elapsed / len(events) * 1e6:8.3f} us/event")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    events = make_stream(args.chunks)
+    print(f"orjson {'enabled' if HAS_ORJSON else 'not installed'}, {len(events)} events")
+    measure("round trip", round_trip, events, args.repeat)
+    measure("direct", direct, events, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,10 @@ from .mocks import (
     MockAzureCredential,
     MockAzureCredentialExpired,
     MockBlobClient,
+    MockPushAudioInputStream,
+    MockRecognizerConnection,
     MockResponse,
+    MockSpeechRecognizer,
     mock_computervision_response,
     mock_speak_text_cancelled,
     mock_speak_text_failed,
@@ -76,6 +79,14 @@ def mock_speech_failed(monkeypatch):
     monkeypatch.setattr(azure.cognitiveservices.speech.SpeechSynthesizer, "speak_text_async", mock_speak_text_failed)
 
 
+@pytest.fixture
+def mock_speech_recognizer(monkeypatch):
+    monkeypatch.setattr(azure.cognitiveservices.speech.audio, "PushAudioInputStream", MockPushAudioInputStream)
+    monkeypatch.setattr(azure.cognitiveservices.speech.audio, "AudioConfig", lambda stream: None)
+    monkeypatch.setattr(azure.cognitiveservices.speech, "SpeechRecognizer", MockSpeechRecognizer)
+    monkeypatch.setattr(azure.cognitiveservices.speech, "Connection", MockRecognizerConnection)
+
+
 @pytest.fixture
 def mock_openai_embedding(monkeypatch):
     async def mock_acreate(*args, **kwargs):
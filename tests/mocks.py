@@ -251,3 +251,48 @@ def mock_speak_text_cancelled(self, text):
 
 def mock_speak_text_failed(self, text):
     return MockSynthesisResult(MockAudioFailure("mock_audio_data"))
+
+
+class MockEventSignal:
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, callback):
+        self.callbacks.append(callback)
+
+    def disconnect_all(self):
+        self.callbacks = []
+
+    def fire(self, evt):
+        for callback in self.callbacks:
+            callback(evt)
+
+
+class MockSpeechRecognizer:
+    def __init__(self, **kwargs):
+        self.recognizing = MockEventSignal()
+        self.recognized = MockEventSignal()
+        self.canceled = MockEventSignal()
+        self.session_stopped = MockEventSignal()
+
+
+class MockPushAudioInputStream:
+    def __init__(self, on_close=None):
+        self.on_close = on_close
+
+    def close(self):
+        if self.on_close is not None:
+            self.on_close()
+
+
+class MockRecognizerConnection:
+    def __init__(self, recognizer):
+        self.disconnected = MockEventSignal()
+        self.opened = False
+
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        return cls(recognizer)
+
+    def open(self, for_continuous_recognition):
+        self.opened = for_continuous_recognition
@@ -0,0 +1,79 @@
+import pytest
+from authentication.account_authenticator import AccountAuthenticator
+from azure.core.exceptions import ResourceNotFoundError
+from config import CONFIG_KEYVAULT_CLIENT
+from models.account import Account
+from quart import Quart
+
+
+class MockSecretProperties:
+    def __init__(self, version, enabled):
+        self.version = version
+        self.enabled = enabled
+
+
+class MockSecret:
+    def __init__(self, value):
+        self.value = value
+
+
+class MockKeyvaultClient:
+    def __init__(self, secrets):
+        # secrets maps a secret name to a list of (value, enabled) versions
+        self.secrets = secrets
+        self.get_secret_calls = 0
+
+    async def list_properties_of_secret_versions(self, name):
+        if name not in self.secrets:
+            raise ResourceNotFoundError("Secret not found")
+        for version, (_, enabled) in enumerate(self.secrets[name]):
+            yield MockSecretProperties(str(version), enabled)
+
+    async def get_secret(self, name, version):
+        self.get_secret_calls += 1
+        return MockSecret(self.secrets[name][int(version)][0])
+
+
+@pytest.fixture
+def app():
+    return Quart(__name__)
+
+
+@pytest.mark.asyncio
+async def test_verify_user_checks_enabled_versions(app):
+    keyvault_client = MockKeyvaultClient(
+        {
+            "username": [("admin", True)],
+            "password": [("old-password", False), ("password-1", True), ("password-2", True)],
+        }
+    )
+    app.config[CONFIG_KEYVAULT_CLIENT] = keyvault_client
+    async with app.app_context():
+        authenticator = AccountAuthenticator()
+        assert await authenticator.verify_user(Account(username="admin", password="password-2")) == (
+            True,
+            "Login successful",
+        )
+        assert await authenticator.verify_user(Account(username="admin", password="password-1")) == (
+            True,
+            "Login successful",
+        )
+        for account in [
+            Account(username="admin", password="old-password"),
+            Account(username="x", password="password-1"),
+        ]:
+            assert await authenticator.verify_user(account) == (False, "Username or password is incorrect")
+
+    # The enabled versions are only fetched once
+    assert keyvault_client.get_secret_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_verify_user_secret_not_set(app):
+    app.config[CONFIG_KEYVAULT_CLIENT] = MockKeyvaultClient({"username": [("admin", True)]})
+    async with app.app_context():
+        authenticator = AccountAuthenticator()
+        assert await authenticator.verify_user(Account(username="admin", password="password")) == (
+            False,
+            "Username or password has not been set. Please contact the administrator.",
+        )
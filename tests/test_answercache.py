@@ -0,0 +1,47 @@
+from core.answercache import AnswerCache, CachedAnswer
+
+
+def make_answer(query, language="english"):
+    return CachedAnswer(query=query, language=language, context={}, content=f"Answer to {query}", followup_questions=[])
+
+
+def test_answer_cache_exact_match():
+    cache = AnswerCache(max_size=2, ttl=60)
+    cache.set(make_answer("How to get better sleep?"))
+
+    assert cache.get("how to get better  sleep", "english").content == "Answer to How to get better sleep?"
+    assert cache.get("How to get better sleep?", "chinese") is None
+
+    # The least recently used answer is evicted
+    cache.set(make_answer("What is dengue?"))
+    cache.set(make_answer("What is diabetes?"))
+    assert cache.get("How to get better sleep?", "english") is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 2, 1)
+
+
+def test_answer_cache_similarity():
+    cache = AnswerCache(max_size=10, ttl=60, similarity_threshold=0.9)
+    cache.set(make_answer("How to get better sleep?"), embedding=[1.0, 0.0, 0.0])
+    cache.set(make_answer("What is dengue?"), embedding=[0.0, 1.0, 0.0])
+    cache.set(make_answer("Bagaimana untuk tidur lebih baik?", language="malay"), embedding=[1.0, 0.05, 0.0])
+
+    assert cache.get("Tips for sleeping better", "english", record_miss=False) is None
+    similar = cache.get_similar("Tips for sleeping better", "english", [0.95, 0.1, 0.05])
+    assert similar.query == "How to get better sleep?"
+    assert cache.get_similar("Tips for eating better", "english", [0.5, 0.5, 0.7]) is None
+    assert cache.get("What is dengue?", "english").query == "What is dengue?"
+
+    # Every lookup is counted once, as an exact hit, a semantic hit or a miss
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_answer_cache_similarity_skips_evicted_answers():
+    cache = AnswerCache(max_size=1, ttl=60, similarity_threshold=0.9)
+    cache.set(make_answer("How to get better sleep?"), embedding=[1.0, 0.0])
+    cache.set(make_answer("What is dengue?"), embedding=[0.0, 1.0])
+
+    assert cache.get_similar("Tips for sleeping better", "english", [1.0, 0.1]) is None
+    assert list(cache.embeddings) == [("english", "what is dengue")]
@@ -1,6 +1,8 @@
 import json
 
+import aiohttp
 import pytest
+import tenacity
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.indexes.models import SearchField, SearchIndex
@@ -64,6 +66,21 @@ async def test_get_auth_claims_overage_success(
     assert auth_claims.get("groups") == ["OVERAGE_GROUP_Y", "OVERAGE_GROUP_Z"]
 
 
+@pytest.mark.asyncio
+async def test_get_auth_claims_overage_caches_groups(
+    mock_confidential_client_overage, mock_list_groups_success, mock_validate_token_success
+):
+    helper = create_authentication_helper()
+    auth_claims = await helper.get_auth_claims_if_enabled(headers={"Authorization": "Bearer Token"})
+    # The groups are read from the cache, the mock Graph API fails if the groups are listed again
+    cached_auth_claims = await helper.get_auth_claims_if_enabled(headers={"Authorization": "Bearer Token"})
+    assert cached_auth_claims == auth_claims
+    assert helper.groups_cache.get_stats()["hits"] == 1
+
+    cached_auth_claims["groups"].append("OTHER_GROUP")
+    assert helper.groups_cache.get("OID_X") == ["OVERAGE_GROUP_Y", "OVERAGE_GROUP_Z"]
+
+
 @pytest.mark.asyncio
 async def test_get_auth_claims_overage_unauthorized(
     mock_confidential_client_overage, mock_list_groups_unauthorized, mock_validate_token_success
@@ -478,3 +495,53 @@ async def test_check_path_auth_allowed_public_without_access_control(
     )
     assert filter is None
     assert called_search is False
+
+
+def test_build_security_filters_cached(mock_confidential_client_success, mock_validate_token_success):
+    auth_helper = create_authentication_helper(require_access_control=True)
+    auth_claims = {"oid": "OID_X", "groups": ["GROUP_Y", "GROUP_Z"]}
+    security_filter = auth_helper.build_security_filters(overrides={}, auth_claims=auth_claims)
+    assert auth_helper.build_security_filters(overrides={}, auth_claims=auth_claims) == security_filter
+    assert auth_helper.security_filter_cache.get_stats()["hits"] == 1
+
+    assert (
+        auth_helper.build_security_filters(overrides={}, auth_claims={"oid": "OID_X", "groups": ["GROUP_Y"]})
+        == "(oids/any(g:search.in(g, 'OID_X')) or groups/any(g:search.in(g, 'GROUP_Y')))"
+    )
+
+    auth_helper = create_authentication_helper()
+    assert auth_helper.build_security_filters(overrides={}, auth_claims=auth_claims) is None
+    assert auth_helper.build_security_filters(overrides={}, auth_claims=auth_claims) is None
+    assert (
+        auth_helper.build_security_filters(overrides={"use_oid_security_filter": True}, auth_claims=auth_claims)
+        == "oids/any(g:search.in(g, 'OID_X'))"
+    )
+
+
+@pytest.mark.asyncio
+async def test_fetch_jwks_gives_up_after_a_quick_retry(monkeypatch, mock_confidential_client_success):
+    timeouts = []
+
+    class MockKeysResponse:
+        status = 503
+
+        async def text(self):
+            return "Service unavailable"
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+
+    def mock_get(*args, **kwargs):
+        timeouts.append(kwargs["timeout"].total)
+        return MockKeysResponse()
+
+    monkeypatch.setattr(aiohttp.ClientSession, "get", mock_get)
+    monkeypatch.setattr(tenacity.wait_random_exponential, "__call__", lambda x, y: 0)
+
+    # The signing key cache serves the expired keys during an outage, so the download does not hold requests
+    with pytest.raises(AuthError):
+        await create_authentication_helper().fetch_jwks()
+    assert timeouts == [5, 5]
@@ -0,0 +1,87 @@
+import pytest
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from models.chat_message import ChatMessageWithSource
+from models.chat_turn import ChatTurn
+from utils.chat_history_store import AppendOnlyChatHistoryStore, CosmosChatHistoryStore
+
+from scripts.migrate_chat_history import MigrateChatHistory
+
+from .mocks import MockAsyncPageIterator
+
+
+class MockChatHistoryContainer:
+    def __init__(self):
+        self.items = {}
+
+    async def upsert_item(self, item):
+        self.items[(item["session_id"], item["id"])] = item
+
+    async def read_item(self, item, partition_key):
+        if (partition_key, item) not in self.items:
+            raise CosmosResourceNotFoundError(message="Not found")
+        return self.items[(partition_key, item)]
+
+    async def delete_item(self, item, partition_key):
+        del self.items[(partition_key, item)]
+
+    def query_items(self, query, parameters=None, partition_key=None):
+        items = [item for (session_id, _), item in self.items.items() if partition_key in (None, session_id)]
+        if "NOT IS_DEFINED(c.type)" in query:
+            items = [item for item in items if "type" not in item]
+        # Cosmos DB does not return the items of a partition in any particular order
+        return MockAsyncPageIterator(list(reversed(items)))
+
+
+def make_turn(session_id, query, created_at, sequence=None):
+    turn = ChatTurn(
+        session_id=session_id,
+        created_at=created_at,
+        chat_messages=[
+            ChatMessageWithSource(role="user", content=query, sources=[]),
+            ChatMessageWithSource(role="assistant", content=f"Answer to {query}", sources=[]),
+        ],
+    )
+    if sequence is not None:
+        turn.sequence = sequence
+    return turn
+
+
+@pytest.mark.asyncio
+async def test_append_only_store_reads_turns_in_order():
+    container = MockChatHistoryContainer()
+    store = AppendOnlyChatHistoryStore(container)
+    await store.append_turns("a", [make_turn("a", "q1", "t1", sequence=1), make_turn("a", "q2", "t2", sequence=2)])
+    await store.append_turns("a", [make_turn("a", "q3", "t3", sequence=3)])
+    await store.append_turns("b", [make_turn("b", "other", "t1")])
+    # A retried write replaces the turn instead of adding it again
+    await store.append_turns("a", [make_turn("a", "q3", "t3", sequence=3)])
+
+    assert len(container.items) == 4
+    chat_history = await store.read_history("a")
+    assert [message.content for message in chat_history.chat_messages[::2]] == ["q1", "q2", "q3"]
+    assert (chat_history.id, chat_history.created_at, chat_history.last_modified) == ("a", "t1", "t3")
+    assert await store.read_history("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_migrated_session_reads_the_same_history():
+    container = MockChatHistoryContainer()
+    session_store = CosmosChatHistoryStore(container)
+    await session_store.append_turns("a", [make_turn("a", "q1", "t1"), make_turn("a", "q2", "t2")])
+    await session_store.append_turns("a", [make_turn("a", "q3", "t3")])
+    expected = await session_store.read_history("a")
+
+    append_store = AppendOnlyChatHistoryStore(container)
+    # Sessions which have not been migrated yet are read alongside the turns stored since
+    await append_store.append_turns("a", [make_turn("a", "q4", "t4")])
+    chat_history = await append_store.read_history("a")
+    assert chat_history.chat_messages == expected.chat_messages + make_turn("a", "q4", "t4").chat_messages
+    assert chat_history.last_modified == "t4"
+
+    assert await MigrateChatHistory(container, dry_run=True).run() == 1
+    assert await append_store.read_history("a") == chat_history
+
+    assert await MigrateChatHistory(container).run() == 1
+    assert ("a", "a") not in container.items
+    assert await append_store.read_history("a") == chat_history
+    assert await MigrateChatHistory(container).run() == 0
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from models.chat_message import ChatMessageWithSource
+from models.chat_turn import ChatTurn
+from utils.chat_history_store import InMemoryChatHistoryStore
+from utils.chat_history_writer import ChatHistoryWriter
+
+
+def make_turn(session_id, query, created_at="2024-10-01 10:00:00"):
+    return ChatTurn(
+        session_id=session_id,
+        created_at=created_at,
+        chat_messages=[
+            ChatMessageWithSource(role="user", content=query, sources=[]),
+            ChatMessageWithSource(role="assistant", content=f"Answer to {query}", sources=[]),
+        ],
+    )
+
+
+class RecordingStore(InMemoryChatHistoryStore):
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.writes = []
+
+    async def append_turns(self, session_id, turns):
+        self.writes.append((session_id, len(turns)))
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Cosmos DB unavailable")
+        await asyncio.sleep(0.01)
+        await super().append_turns(session_id, turns)
+
+
+@pytest.mark.asyncio
+async def test_chat_history_writer_coalesces_turns_in_order():
+    store = RecordingStore()
+    writer = ChatHistoryWriter(store)
+    for i in range(3):
+        await writer.write(make_turn("a", f"a{i}", created_at=f"2024-10-01 10:00:0{i}"))
+        await writer.write(make_turn("b", f"b{i}"))
+    writer.start()
+    await writer.close()
+
+    assert sorted(store.writes) == [("a", 3), ("b", 3)]
+    chat_history = store.chat_histories["a"]
+    assert [message.content for message in chat_history.chat_messages[::2]] == ["a0", "a1", "a2"]
+    assert (chat_history.created_at, chat_history.last_modified) == ("2024-10-01 10:00:00", "2024-10-01 10:00:02")
+    assert writer.get_stats() == {"queued": 0, "written": 6, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_chat_history_writer_retries_failed_writes():
+    store = RecordingStore(failures=2)
+    writer = ChatHistoryWriter(store, retry_attempts=3, retry_wait_max=0.01)
+    writer.start()
+    await writer.write(make_turn("a", "a0"))
+    await writer.flush()
+
+    assert store.writes == [("a", 1)] * 3
+    assert len(store.chat_histories["a"].chat_messages) == 2
+
+    store.failures = 3
+    await writer.write(make_turn("a", "a1"))
+    await writer.close()
+    assert writer.get_stats() == {"queued": 0, "written": 1, "failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_chat_history_writer_backpressure():
+    writer = ChatHistoryWriter(RecordingStore(), max_queue_size=1)
+    await writer.write(make_turn("a", "a0"))
+    blocked_write = asyncio.ensure_future(writer.write(make_turn("a", "a1")))
+    await asyncio.sleep(0.01)
+    assert not blocked_write.done()
+
+    writer.start()
+    await blocked_write
+    await writer.close()
+    assert writer.get_stats()["written"] == 2
@@ -1,10 +1,15 @@
+import asyncio
 import json
+from types import SimpleNamespace
 
 import pytest
+from approaches.approach import ThoughtStep
 from approaches.chatreadretrieveread import ChatReadRetrieveReadApproach
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents.aio import SearchClient
-from openai.types.chat import ChatCompletion
+from core.answercache import AnswerCache
+from models.profile import Profile
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
 
 from .mocks import (
     MOCK_EMBEDDING_DIMENSIONS,
@@ -196,3 +201,207 @@ async def test_search_results_filtering_by_scores(
     assert (
         len(filtered_results) == expected_result_count
     ), f"Expected {expected_result_count} results with minimum_search_score={minimum_search_score} and minimum_reranker_score={minimum_reranker_score}"
+
+
+def make_chunk(content, role=None, choices=True):
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "test-123",
+            "object": "chat.completion.chunk",
+            "created": 1703462735,
+            "model": "gpt-35-turbo",
+            "choices": (
+                [{"index": 0, "delta": {"content": content, "role": role}, "finish_reason": None}] if choices else []
+            ),
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_with_streaming_extracts_deltas(chat_approach, monkeypatch):
+    chunks = [
+        make_chunk(None, choices=False),
+        make_chunk("", role="assistant"),
+        make_chunk("Paris is the capital."),
+        make_chunk(" Learn more. <<What is"),
+        make_chunk(" the capital of Spain?>>"),
+        make_chunk(None),
+    ]
+
+    async def chat_stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def mock_run_until_final_call(*args, **kwargs):
+        async def chat_coroutine():
+            return chat_stream()
+
+        return {"thoughts": []}, chat_coroutine()
+
+    monkeypatch.setattr(chat_approach, "run_until_final_call", mock_run_until_final_call)
+
+    events = [event async for event in chat_approach.run_with_streaming([], None, "english", {})]
+    assert events == [
+        {"delta": {"role": "assistant"}, "context": {"thoughts": []}, "session_state": None},
+        {"delta": {"role": "assistant", "content": ""}},
+        {"delta": {"role": None, "content": "Paris is the capital."}},
+        {"delta": {"role": None, "content": " Learn more. "}},
+        {"delta": {"role": "assistant"}, "context": {"followup_questions": ["What is the capital of Spain?"]}},
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query_text, expected_embedded",
+    [
+        ("what is dengue fever", ["speculative"]),
+        ("Dengue fever symptoms", ["speculative", "Dengue fever symptoms"]),
+    ],
+)
+async def test_get_query_embedding_reuses_speculative_embedding(chat_approach, query_text, expected_embedded):
+    embedded = []
+
+    async def mock_compute_text_embedding(q):
+        embedded.append(q)
+        return q
+
+    chat_approach.compute_text_embedding = mock_compute_text_embedding
+    speculative_embedding = asyncio.create_task(mock_compute_text_embedding("speculative"))
+    await asyncio.sleep(0)
+
+    vector = await chat_approach.get_query_embedding(query_text, "What is Dengue fever?", speculative_embedding)
+    assert vector == expected_embedded[-1]
+    assert embedded == expected_embedded
+
+
+class MockChatCompletions:
+    async def create(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+
+@pytest.mark.asyncio
+async def test_run_until_final_call_cancels_speculative_embedding_when_search_fails(chat_approach, monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_CHATGPT_MODEL", "gpt-35-turbo")
+    chat_approach.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=MockChatCompletions()))
+    chat_approach.use_speculative_embedding = True
+    speculative_embeddings = []
+
+    async def mock_compute_text_embedding(q):
+        if q == "What is Dengue fever?":
+            speculative_embeddings.append(asyncio.current_task())
+            # The speculative embedding is still running when the search fails
+            await asyncio.sleep(10)
+        return q
+
+    async def mock_search(*args, **kwargs):
+        raise ValueError("Search failed")
+
+    monkeypatch.setattr(chat_approach, "compute_text_embedding", mock_compute_text_embedding)
+    monkeypatch.setattr(chat_approach, "get_search_query", lambda *args: "Dengue fever symptoms")
+    monkeypatch.setattr(chat_approach, "search", mock_search)
+
+    with pytest.raises(ValueError, match="Search failed"):
+        await chat_approach.run_until_final_call(
+            [{"role": "user", "content": "What is Dengue fever?"}], Profile(profile_type="general"), "english", {}
+        )
+    await asyncio.sleep(0)
+    assert len(speculative_embeddings) == 1
+    assert speculative_embeddings[0].cancelled()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("profile_type, expected_calls", [("general", 1), ("user_profile", 2)])
+async def test_run_with_streaming_replays_cached_answer(chat_approach, monkeypatch, profile_type, expected_calls):
+    calls = []
+
+    async def mock_run_until_final_call(messages, *args, **kwargs):
+        calls.append(messages[-1]["content"])
+
+        async def chat_stream():
+            for content in ["", "Sleep ", "8 hours.", " Avoid caffeine.", None]:
+                yield make_chunk(content, role="assistant" if content == "" else None)
+
+        async def chat_coroutine():
+            return chat_stream()
+
+        thoughts = [
+            ThoughtStep("Search results", [{"id": "1"}]),
+            ThoughtStep("Time taken", 1.5),
+            ThoughtStep("Original query", messages[-1]["content"]),
+            ThoughtStep("Total input tokens", 100),
+        ]
+        return {"thoughts": thoughts}, chat_coroutine()
+
+    async def consume(query):
+        # Reads the stream the way ResponseHandler does, stopping at the first chunk without content
+        events = []
+        async for event in chat_approach.run_with_streaming(
+            [{"role": "user", "content": query}], Profile(profile_type=profile_type), "english", {}
+        ):
+            events.append(event)
+            if event["delta"].get("content", "") is None:
+                break
+        return events
+
+    chat_approach.answer_cache = AnswerCache(max_size=10, ttl=60)
+    monkeypatch.setattr(chat_approach, "run_until_final_call", mock_run_until_final_call)
+
+    live = await consume("How much sleep do I need?")
+    replayed = await consume("how much sleep do I need")
+
+    assert len(calls) == expected_calls
+    if profile_type == "general":
+        thoughts = replayed[0]["context"]["thoughts"]
+        assert thoughts[0] == live[0]["context"]["thoughts"][0]
+        assert thoughts[1].props == {"answer_cache": "hit"}
+        assert thoughts[2].description == "how much sleep do I need"
+        assert thoughts[3].description == 0
+        assert [event["delta"]["content"] for event in replayed[1:]] == [
+            "Sleep ",
+            "8 ",
+            "hours. ",
+            "Avoid ",
+            "caffeine.",
+            None,
+        ]
+
+
+@pytest.mark.asyncio
+async def test_run_with_streaming_embeds_question_only_on_exact_miss(chat_approach, monkeypatch):
+    embedded = []
+
+    async def mock_compute_text_embedding(q):
+        embedded.append(q)
+        return SimpleNamespace(vector=[1.0, 0.0, 0.0])
+
+    async def mock_run_until_final_call(messages, *args, **kwargs):
+        async def chat_stream():
+            for content in ["", "Sleep 8 hours.", None]:
+                yield make_chunk(content, role="assistant" if content == "" else None)
+
+        async def chat_coroutine():
+            return chat_stream()
+
+        return {"thoughts": []}, chat_coroutine()
+
+    async def consume(query):
+        return [
+            event
+            async for event in chat_approach.run_with_streaming(
+                [{"role": "user", "content": query}], Profile(profile_type="general"), "english", {}
+            )
+        ]
+
+    chat_approach.answer_cache = AnswerCache(max_size=10, ttl=60, similarity_threshold=0.9)
+    monkeypatch.setattr(chat_approach, "compute_text_embedding", mock_compute_text_embedding)
+    monkeypatch.setattr(chat_approach, "run_until_final_call", mock_run_until_final_call)
+
+    await consume("How much sleep do I need?")
+    await consume("how much sleep do I need")
+    await consume("Hours of sleep needed")
+
+    # The repeated question is answered from the exact match without an embedding
+    assert embedded == ["How much sleep do I need?", "Hours of sleep needed"]
+    stats = chat_approach.answer_cache.get_stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
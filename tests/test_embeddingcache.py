@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from core.embeddingcache import EmbeddingCache, SQLiteEmbeddingCacheBackend
+
+
+class MockEmbeddingsAPI:
+    def __init__(self):
+        self.calls = []
+
+    def compute(self, text):
+        async def create_embedding():
+            self.calls.append(text)
+            await asyncio.sleep(0.01)
+            return [0.1, 0.2, float(len(self.calls))]
+
+        return create_embedding
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_normalizes_query():
+    api = MockEmbeddingsAPI()
+    cache = EmbeddingCache(max_size=10, ttl=60)
+
+    first = await cache.get_or_compute("text-embedding-3-large", 3072, "How to get better sleep?", api.compute("a"))
+    second = await cache.get_or_compute("text-embedding-3-large", 3072, "how to get  better sleep", api.compute("b"))
+    # Another model or dimensions is a different embedding
+    await cache.get_or_compute("text-embedding-3-large", 256, "How to get better sleep?", api.compute("c"))
+
+    assert first == second
+    assert api.calls == ["a", "c"]
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["memory_entries"]) == (1, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+    assert stats["saved_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_expires(monkeypatch):
+    api = MockEmbeddingsAPI()
+    cache = EmbeddingCache(max_size=10, ttl=60)
+    await cache.get_or_compute("text-embedding-ada-002", None, "Dengue", api.compute("a"))
+
+    monkeypatch.setattr(cache.memory, "is_expired", lambda stored_at: True)
+    await cache.get_or_compute("text-embedding-ada-002", None, "Dengue", api.compute("b"))
+    assert api.calls == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_shared_backend(tmp_path):
+    api = MockEmbeddingsAPI()
+    path = str(tmp_path / "embeddings.db")
+    worker_1 = EmbeddingCache(max_size=10, ttl=60, backend=SQLiteEmbeddingCacheBackend(path))
+    worker_2 = EmbeddingCache(max_size=10, ttl=60, backend=SQLiteEmbeddingCacheBackend(path))
+
+    first = await worker_1.get_or_compute("text-embedding-ada-002", None, "Dengue", api.compute("a"))
+    second = await worker_2.get_or_compute("text-embedding-ada-002", None, "Dengue", api.compute("b"))
+    assert first == second == [0.1, 0.2, 1.0]
+    assert api.calls == ["a"]
+    assert worker_2.get_stats()["memory_entries"] == 1
+
+    expired = EmbeddingCache(max_size=10, ttl=-1, backend=SQLiteEmbeddingCacheBackend(path))
+    await expired.get_or_compute("text-embedding-ada-002", None, "Sleep", api.compute("c"))
+    await worker_1.get_or_compute("text-embedding-ada-002", None, "Sleep", api.compute("d"))
+    assert api.calls == ["a", "c", "d"]
+
+    for cache in [worker_1, worker_2, expired]:
+        await cache.close()
@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.httpsessions import HTTPSessionRegistry, client_session
+
+
+@pytest.mark.asyncio
+async def test_http_session_registry_reuses_connections(caplog):
+    async def handle(request):
+        return web.json_response({"vector": [0.1, 0.2]})
+
+    app = web.Application()
+    app.router.add_post("/vectorize", handle)
+    server = TestServer(app)
+    await server.start_server()
+
+    http_sessions = HTTPSessionRegistry(limit_per_host=1)
+    try:
+        for _ in range(3):
+            async with client_session(http_sessions) as session:
+                async with session.post(server.make_url("/vectorize"), json={"text": "hello"}) as response:
+                    assert (await response.json())["vector"] == [0.1, 0.2]
+        assert http_sessions.get_session() is session
+    finally:
+        with caplog.at_level(logging.INFO):
+            await http_sessions.close()
+        await server.close()
+
+    stats = http_sessions.get_stats()[server.host]
+    assert (stats["requests"], stats["in_flight"], stats["errors"]) == (3, 0, 0)
+    assert (stats["new_connections"], stats["reused_connections"]) == (1, 2)
+    assert stats["reuse_rate"] == pytest.approx(2 / 3)
+    assert session.closed
+    assert f"HTTP connection pool usage for {server.host}" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_client_session_without_registry_closes_session():
+    async with client_session(None) as session:
+        assert not session.closed
+    assert session.closed
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from approaches.approach import ThoughtStep
+from models.chat import TextChatResponse
+from utils.json_encoder import JSONEncoder
+from utils.response_handler import construct_text_response
+
+
+@pytest.mark.parametrize("text", ["Hello", " 你好，", 'He said "hi"\n', ""])
+def test_construct_text_response_matches_model(text):
+    assert construct_text_response(text) == TextChatResponse(response_message=text, sources=[]).model_dump_json()
+
+
+@pytest.mark.asyncio
+async def test_format_as_events_matches_ndjson_round_trip():
+    events = [
+        {
+            "delta": {"role": "assistant"},
+            "context": {"thoughts": [ThoughtStep("Search results", [{"id": "1", "title": "Dengue"}], {"top": 3})]},
+            "session_state": None,
+        },
+        {"delta": {"content": "Hi", "role": None}},
+        {"delta": {"content": None, "role": None}},
+    ]
+
+    async def stream():
+        for event in events:
+            yield event
+
+    expected = [json.loads(line) async for line in JSONEncoder.format_as_ndjson(stream(), "english")]
+    assert [event async for event in JSONEncoder.format_as_events(stream(), "english")] == expected
+
+
+@pytest.mark.asyncio
+async def test_format_as_events_error():
+    async def stream():
+        yield {"delta": {"content": "Hi"}}
+        raise ValueError("Stream broke")
+
+    assert [event async for event in JSONEncoder.format_as_events(stream(), "english")] == [
+        {"delta": {"content": "Hi"}},
+        {"error": "Stream broke"},
+    ]
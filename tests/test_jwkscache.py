@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from core.jwkscache import JWKSCache, parse_max_age
+
+
+def create_jwks(*kids):
+    return {"keys": [{"kty": "RSA", "kid": kid, "use": "sig", "n": "n", "e": "AQAB"} for kid in kids]}
+
+
+class MockJWKSFetcher:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=86400") == 86400
+    assert parse_max_age("no-store, no-cache") == 0
+    assert parse_max_age("public") is None
+    assert parse_max_age(None) is None
+
+
+@pytest.mark.asyncio
+async def test_jwks_cache_single_flight():
+    fetcher = MockJWKSFetcher([(create_jwks("key1"), 3600)])
+    cache = JWKSCache(fetcher.fetch)
+
+    keys = await asyncio.gather(*[cache.get_key("key1") for _ in range(20)])
+    assert all(key["kid"] == "key1" for key in keys)
+    assert (await cache.get_key("key1"))["kid"] == "key1"
+    assert fetcher.calls == 1
+    assert cache.get_stats()["hits"] == 21
+
+
+@pytest.mark.asyncio
+async def test_jwks_cache_refetches_unknown_key_at_most_once_per_interval():
+    fetcher = MockJWKSFetcher([(create_jwks("key1"), 3600), (create_jwks("key1", "key2"), 3600)])
+    cache = JWKSCache(fetcher.fetch, min_refresh_interval=60)
+
+    await cache.get_key("key1")
+    cache.last_fetch -= 60
+    # The keys were rotated since they were downloaded
+    assert (await cache.get_key("key2"))["kid"] == "key2"
+    assert fetcher.calls == 2
+
+    # A forged key id does not download the key set again
+    assert await cache.get_key("unknown") is None
+    assert await cache.get_key("unknown") is None
+    assert fetcher.calls == 2
+    assert cache.get_stats()["rate_limited"] == 2
+
+
+@pytest.mark.asyncio
+async def test_jwks_cache_uses_expired_keys_when_refresh_fails():
+    fetcher = MockJWKSFetcher([(create_jwks("key1"), 0), ValueError("Entra unavailable")])
+    cache = JWKSCache(fetcher.fetch, max_stale=60, min_refresh_interval=0)
+
+    await cache.get_key("key1")
+    assert (await cache.get_key("key1"))["kid"] == "key1"
+    await cache.background_refresh
+    assert fetcher.calls == 2
+    assert (await cache.get_key("key1"))["kid"] == "key1"
+    assert cache.get_stats()["stale_hits"] >= 2
+
+    # The keys are not used once they are too old
+    cache.expires_at -= 60
+    with pytest.raises(ValueError, match="Entra unavailable"):
+        await cache.get_key("key1")
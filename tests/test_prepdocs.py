@@ -1,12 +1,20 @@
+import asyncio
 import logging
+import time
 
 import openai
 import openai.types
 import pytest
 import tenacity
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from httpx import Request, Response
 from openai.types.create_embedding_response import Usage
-from prepdocslib.embeddings import AzureOpenAIEmbeddingService, OpenAIEmbeddingService
+from prepdocslib.embeddings import (
+    AzureOpenAIEmbeddingService,
+    ImageEmbeddings,
+    OpenAIEmbeddingService,
+)
 
 from .mocks import (
     MOCK_EMBEDDING_DIMENSIONS,
@@ -206,3 +214,136 @@ async def test_compute_embedding_autherror(monkeypatch, capsys):
         )
         monkeypatch.setattr(embeddings, "create_client", create_auth_error_limit_client)
         await embeddings.create_embeddings(texts=["foo"])
+
+
+class RetryAfterMockEmbeddingsClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, *args, **kwargs) -> openai.types.CreateEmbeddingResponse:
+        self.calls += 1
+        if self.calls == 1:
+            raise openai.RateLimitError(
+                message="Rate limited on the OpenAI embeddings API",
+                response=Response(
+                    429, headers={"retry-after-ms": "10"}, request=Request(method="get", url="https://foo.bar/")
+                ),
+                body=None,
+            )
+        return openai.types.CreateEmbeddingResponse(
+            object="list",
+            data=[openai.types.Embedding(embedding=[0.1, 0.2, 0.3], index=0, object="embedding")],
+            model="text-embedding-ada-002",
+            usage=Usage(prompt_tokens=8, total_tokens=8),
+        )
+
+
+@pytest.mark.asyncio
+async def test_compute_embedding_honors_retry_after(monkeypatch):
+    embeddings_client = RetryAfterMockEmbeddingsClient()
+
+    async def mock_create_client(*args, **kwargs):
+        return MockClient(embeddings_client=embeddings_client)
+
+    embeddings = AzureOpenAIEmbeddingService(
+        open_ai_service="x",
+        open_ai_deployment="x",
+        open_ai_model_name=MOCK_EMBEDDING_MODEL_NAME,
+        open_ai_dimensions=MOCK_EMBEDDING_DIMENSIONS,
+        credential=MockAzureCredential(),
+        disable_batch=True,
+    )
+    monkeypatch.setattr(embeddings, "create_client", mock_create_client)
+    start_time = time.monotonic()
+    assert await embeddings.create_embeddings(texts=["foo"]) == [[0.1, 0.2, 0.3]]
+    # The wait comes from the Retry-After header instead of the exponential backoff
+    assert 0.01 <= time.monotonic() - start_time < 1
+    assert embeddings_client.calls == 2
+    assert embeddings.get_stats()["tokens"] == 8
+
+
+class ConcurrentMockEmbeddingsClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, *args, **kwargs) -> openai.types.CreateEmbeddingResponse:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        texts = kwargs["input"]
+        # Later batches finish first
+        await asyncio.sleep(0.01 * (10 - int(texts[0])))
+        self.in_flight -= 1
+        return openai.types.CreateEmbeddingResponse(
+            object="list",
+            data=[
+                openai.types.Embedding(embedding=[float(text)], index=index, object="embedding")
+                for index, text in enumerate(texts)
+            ],
+            model="text-embedding-ada-002",
+            usage=Usage(prompt_tokens=len(texts), total_tokens=len(texts)),
+        )
+
+
+@pytest.mark.asyncio
+async def test_compute_embedding_concurrent_batches(monkeypatch):
+    embeddings_client = ConcurrentMockEmbeddingsClient()
+
+    async def mock_create_client(*args, **kwargs):
+        return MockClient(embeddings_client=embeddings_client)
+
+    embeddings = AzureOpenAIEmbeddingService(
+        open_ai_service="x",
+        open_ai_deployment="x",
+        open_ai_model_name=MOCK_EMBEDDING_MODEL_NAME,
+        open_ai_dimensions=MOCK_EMBEDDING_DIMENSIONS,
+        credential=MockAzureCredential(),
+        disable_batch=False,
+        max_concurrency=3,
+    )
+    monkeypatch.setattr(embeddings, "create_client", mock_create_client)
+    texts = [str(index % 10) for index in range(160)]
+    # The embeddings are in the order of the texts, whatever order the batches finish in
+    assert await embeddings.create_embeddings(texts=texts) == [[float(text)] for text in texts]
+    assert embeddings_client.max_in_flight == 3
+    assert embeddings.get_stats()["requests"] == 10
+
+
+@pytest.mark.asyncio
+async def test_image_embeddings_reuses_session():
+    async def handle(request):
+        return web.json_response({"vector": [0.1, 0.2]})
+
+    app = web.Application()
+    app.router.add_post("/computervision/retrieval:vectorizeImage", handle)
+    server = TestServer(app)
+    await server.start_server()
+
+    async def token_provider():
+        return "token"
+
+    image_embeddings = ImageEmbeddings(endpoint=str(server.make_url("/")), token_provider=token_provider)
+    try:
+        assert await image_embeddings.create_embeddings(["https://blob/a.png"]) == [[0.1, 0.2]]
+        session = image_embeddings.session
+        assert await image_embeddings.create_embeddings(["https://blob/b.png"]) == [[0.1, 0.2]]
+        assert image_embeddings.session is session
+    finally:
+        await image_embeddings.close()
+        await server.close()
+    assert session.closed
+    assert image_embeddings.session is None
+
+
+@pytest.mark.asyncio
+async def test_openai_embeddings_close():
+    embeddings = OpenAIEmbeddingService(
+        open_ai_model_name=MOCK_EMBEDDING_MODEL_NAME,
+        open_ai_dimensions=MOCK_EMBEDDING_DIMENSIONS,
+        credential="XYZ",
+    )
+    client = await embeddings.get_client()
+    assert await embeddings.get_client() is client
+    await embeddings.close()
+    assert client.is_closed()
+    assert embeddings.client is None
@@ -1,3 +1,4 @@
+import asyncio
 import os
 
 import pytest
@@ -5,7 +6,8 @@ from azure.search.documents.aio import SearchClient
 from prepdocslib.blobmanager import BlobManager
 from prepdocslib.fileprocessor import FileProcessor
 from prepdocslib.filestrategy import FileStrategy
-from prepdocslib.listfilestrategy import ADLSGen2ListFileStrategy
+from prepdocslib.listfilestrategy import ADLSGen2ListFileStrategy, LocalListFileStrategy
+from prepdocslib.searchmanager import SearchManager
 from prepdocslib.strategy import SearchInfo
 from prepdocslib.textparser import TextParser
 from prepdocslib.textsplitter import SimpleTextSplitter
@@ -98,3 +100,102 @@ async def test_file_strategy_adls2(monkeypatch, mock_env, mock_data_lake_service
             "storageUrl": "https://test.blob.core.windows.net/c.txt",
         },
     ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency, upload_workers", [(4, None), (1, 4)])
+async def test_file_strategy_concurrent_pipeline(monkeypatch, tmp_path, concurrency, upload_workers):
+    for index in range(10):
+        (tmp_path / f"file{index}.txt").write_text(f"text {index}")
+    (tmp_path / "skipped.bin").write_bytes(b"no parser")
+
+    uploaded_to_blob = []
+    in_flight = 0
+    max_in_flight = 0
+
+    async def mock_upload_blob(self, file):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        uploaded_to_blob.append(file.filename())
+        file.url = f"https://test.blob.core.windows.net/{file.filename()}"
+        return None
+
+    monkeypatch.setattr(BlobManager, "upload_blob", mock_upload_blob)
+
+    indexed = []
+
+    async def mock_update_content(self, sections, image_embeddings=None, url=None):
+        indexed.append((sections[0].content.filename(), url))
+
+    monkeypatch.setattr(SearchManager, "update_content", mock_update_content)
+
+    file_strategy = FileStrategy(
+        list_file_strategy=LocalListFileStrategy(path_pattern=str(tmp_path / "*")),
+        blob_manager=BlobManager(
+            endpoint="https://test.blob.core.windows.net",
+            credential=MockAzureCredential(),
+            container="test",
+            account="test",
+            resourceGroup="test",
+            subscriptionId="test",
+        ),
+        search_info=SearchInfo(
+            endpoint="https://testsearchclient.blob.core.windows.net",
+            credential=MockAzureCredential(),
+            index_name="test",
+        ),
+        file_processors={".txt": FileProcessor(TextParser(), SimpleTextSplitter())},
+        concurrency=concurrency,
+        upload_workers=upload_workers,
+    )
+
+    await file_strategy.run()
+
+    assert sorted(uploaded_to_blob) == [f"file{index}.txt" for index in range(10)]
+    assert sorted(indexed) == [
+        (f"file{index}.txt", f"https://test.blob.core.windows.net/file{index}.txt") for index in range(10)
+    ]
+    assert 1 < max_in_flight <= 4
+
+
+@pytest.mark.asyncio
+async def test_file_strategy_concurrent_pipeline_error(monkeypatch, tmp_path):
+    for index in range(10):
+        (tmp_path / f"file{index}.txt").write_text(f"text {index}")
+
+    async def mock_upload_blob(self, file):
+        if file.filename() == "file5.txt":
+            raise ValueError("Upload failed")
+        return None
+
+    monkeypatch.setattr(BlobManager, "upload_blob", mock_upload_blob)
+
+    async def mock_update_content(self, sections, image_embeddings=None, url=None):
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(SearchManager, "update_content", mock_update_content)
+
+    file_strategy = FileStrategy(
+        list_file_strategy=LocalListFileStrategy(path_pattern=str(tmp_path / "*")),
+        blob_manager=BlobManager(
+            endpoint="https://test.blob.core.windows.net",
+            credential=MockAzureCredential(),
+            container="test",
+            account="test",
+            resourceGroup="test",
+            subscriptionId="test",
+        ),
+        search_info=SearchInfo(
+            endpoint="https://testsearchclient.blob.core.windows.net",
+            credential=MockAzureCredential(),
+            index_name="test",
+        ),
+        file_processors={".txt": FileProcessor(TextParser(), SimpleTextSplitter())},
+        concurrency=2,
+    )
+
+    with pytest.raises(ValueError, match="Upload failed"):
+        await file_strategy.run()
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+from prepdocslib.ratelimiter import RateLimiter, get_retry_after
+
+
+def test_get_retry_after():
+    assert get_retry_after({"retry-after-ms": "1500", "retry-after": "2"}) == 1.5
+    assert get_retry_after({"retry-after": "2"}) == 2
+    assert get_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert get_retry_after({}) is None
+    assert get_retry_after(None) is None
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_waits_for_token_budget():
+    # 600 tokens per minute refill 10 tokens per second
+    rate_limiter = RateLimiter(tokens_per_minute=600)
+    await rate_limiter.acquire(600)
+    start_time = time.monotonic()
+    await rate_limiter.acquire(1)
+    assert 0.05 <= time.monotonic() - start_time < 0.5
+    assert rate_limiter.get_stats()["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_follows_remaining_headers():
+    rate_limiter = RateLimiter(tokens_per_minute=60000, requests_per_minute=6000)
+    rate_limiter.update({"x-ratelimit-remaining-requests": "0", "x-ratelimit-remaining-tokens": "invalid"})
+    start_time = time.monotonic()
+    await rate_limiter.acquire(1)
+    # 6000 requests per minute refill one request every 10 milliseconds
+    assert time.monotonic() - start_time >= 0.005
+    assert rate_limiter.tokens.level > 50000
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pause():
+    rate_limiter = RateLimiter()
+    rate_limiter.pause(0.05)
+    start_time = time.monotonic()
+    await asyncio.gather(rate_limiter.acquire(10), rate_limiter.acquire(10))
+    assert time.monotonic() - start_time >= 0.05
+    rate_limiter.record(20)
+    assert rate_limiter.get_stats()["tokens"] == 20
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_learns_budget_from_headers():
+    rate_limiter = RateLimiter()
+    rate_limiter.update({"x-ratelimit-limit-requests": "6000", "x-ratelimit-remaining-requests": "0"})
+    assert rate_limiter.tokens is None
+    assert rate_limiter.requests.capacity == 6000
+    start_time = time.monotonic()
+    await rate_limiter.acquire(1)
+    # 6000 requests per minute refill one request every 10 milliseconds
+    assert time.monotonic() - start_time >= 0.005
+
+    # Without the limit header, the budget grows to the largest remaining budget reported
+    rate_limiter.update({"x-ratelimit-remaining-tokens": "1000"})
+    rate_limiter.update({"x-ratelimit-remaining-tokens": "5000"})
+    assert rate_limiter.tokens.capacity == 5000
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import azure.cognitiveservices.speech as speechsdk
+import pytest
+from speech.recognizer_pool import RecognizerPool
+
+
+@pytest.fixture
+def speech_config():
+    return speechsdk.SpeechConfig(auth_token="token", region="southeastasia")
+
+
+@pytest.mark.asyncio
+async def test_recognizer_pool_reuses_warm_sessions(mock_speech_recognizer, speech_config):
+    pool = RecognizerPool(speech_config, min_size=2, max_idle=2)
+    await pool.start()
+    assert pool.getStats()["idle"] == 2
+    assert all(session.connection.opened for session, _ in pool.idle)
+
+    session = pool.acquire()
+    recognizer = session.getSpeechRecognizer()
+    session.recognized_cb(SimpleNamespace(result=SimpleNamespace(text="hello")))
+    assert pool.getStats()["utilization"] == 0.5
+
+    pool.release(session)
+    # The session is rebuilt for the next websocket, and the old recognizer no longer calls back into it
+    assert session.getSpeechRecognizer() is not recognizer
+    assert session.all_result == ""
+    assert recognizer.recognized.callbacks == []
+    assert session.connection.opened
+
+    assert pool.acquire() is session
+    pool.acquire()
+    pool.acquire()
+    stats = pool.getStats()
+    assert (stats["created"], stats["acquired"], stats["warm_hits"], stats["in_use"]) == (3, 4, 3, 3)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_recognizer_pool_discards_unhealthy_sessions(mock_speech_recognizer, speech_config):
+    pool = RecognizerPool(speech_config, min_size=2)
+    await pool.start()
+    disconnected, canceled = (session for session, _ in pool.idle)
+    disconnected.disconnected_cb(SimpleNamespace())
+    canceled.canceled_cb(SimpleNamespace(result=SimpleNamespace(reason="Canceled")))
+
+    session = pool.acquire()
+    assert session not in (disconnected, canceled)
+    stats = pool.getStats()
+    assert (stats["created"], stats["unhealthy"], stats["warm_hits"]) == (3, 2, 0)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_recognizer_pool_evicts_idle_sessions_above_minimum(mock_speech_recognizer, speech_config):
+    pool = RecognizerPool(speech_config, min_size=1, max_idle=3, idle_timeout=0)
+    await pool.start()
+    sessions = [pool.acquire() for _ in range(3)]
+    for session in sessions:
+        pool.release(session)
+    assert pool.getStats()["idle"] == 3
+
+    pool.evictIdle()
+    # The most recently returned session is kept warm
+    assert [session for session, _ in pool.idle] == [sessions[-1]]
+    assert pool.getStats()["evicted"] == 2
+    await pool.close()
@@ -0,0 +1,65 @@
+import pytest
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from config import CONFIG_SEARCH_CLIENT
+from models.chat_message import ChatMessageWithSource
+from models.feedback import FeedbackRequest
+from models.profile import Profile
+from models.source import Source, SourceWithChunk
+from quart import Quart
+from utils.request_handler import RequestHandler
+
+SOURCE_FIELDS = {
+    "title": "Dengue",
+    "cover_image_url": "https://example.com/dengue.png",
+    "full_url": "https://example.com/dengue",
+    "content_category": "disease",
+    "category_description": "",
+    "pr_name": "",
+    "date_modified": "",
+}
+
+
+class MockSearchClient:
+    def __init__(self, documents):
+        self.documents = documents
+        self.lookups = []
+
+    async def search(self, *args, **kwargs):
+        # The id key field is not filterable in the default index schema
+        raise HttpResponseError(message="Invalid expression: 'id' is not a filterable field.")
+
+    async def get_document(self, key):
+        self.lookups.append(key)
+        if key not in self.documents:
+            raise ResourceNotFoundError(message=f"Document {key} not found")
+        return {"id": key, "chunks": self.documents[key]}
+
+
+@pytest.mark.asyncio
+async def test_construct_feedback_for_storing_looks_up_each_id_once():
+    app = Quart(__name__)
+    search_client = MockSearchClient({"1": "chunk 1", "2": "chunk 2", "3": "chunk 3"})
+    app.config[CONFIG_SEARCH_CLIENT] = search_client
+    feedback_request = FeedbackRequest(
+        date_time="2024-10-01",
+        feedback_type="positive",
+        feedback_category=[],
+        user_profile=Profile(profile_type="general"),
+        chat_history=[
+            ChatMessageWithSource(role="assistant", content="a", sources=[Source(ids=["1", "2"], **SOURCE_FIELDS)]),
+            ChatMessageWithSource(role="assistant", content="b", sources=[Source(ids=["2", "4"], **SOURCE_FIELDS)]),
+            ChatMessageWithSource(
+                role="assistant", content="c", sources=[SourceWithChunk(id="3", chunk="chunk 3", **SOURCE_FIELDS)]
+            ),
+        ],
+    )
+
+    async with app.app_context():
+        feedback_store = await RequestHandler.construct_feedback_for_storing(feedback_request)
+
+    assert sorted(search_client.lookups) == ["1", "2", "4"]
+    assert [[(source.id, source.chunk) for source in message.sources] for message in feedback_store.chat_history] == [
+        [("1", "chunk 1"), ("2", "chunk 2")],
+        [("2", "chunk 2"), ("4", "Chunk for source cannot be found")],
+        [("3", "chunk 3")],
+    ]
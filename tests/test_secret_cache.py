@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from authentication.jwt_authenticator import JWTAuthenticator
+from authentication.secret_cache import SecretCache
+from config import CONFIG_KEYVAULT_CLIENT
+from models.account import Account
+from quart import Quart
+
+
+class MockSecretLoader:
+    def __init__(self, values):
+        self.values = values
+        self.calls = 0
+
+    async def load(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        value = self.values[min(self.calls, len(self.values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+@pytest.mark.asyncio
+async def test_secret_cache_single_flight():
+    loader = MockSecretLoader(["secret"])
+    cache = SecretCache(loader.load, ttl=60)
+
+    assert await asyncio.gather(*[cache.get() for _ in range(20)]) == ["secret"] * 20
+    assert await cache.get() == "secret"
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_secret_cache_refreshes_ahead_of_expiry():
+    loader = MockSecretLoader(["old", "new"])
+    cache = SecretCache(loader.load, ttl=60, refresh_ahead=60)
+
+    assert await cache.get() == "old"
+    # The cached value is returned while the new value loads in the background, only once
+    assert await asyncio.gather(cache.get(), cache.get()) == ["old", "old"]
+    await cache.background_refresh
+    assert await cache.get() == "new"
+    await cache.background_refresh
+    assert loader.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_secret_cache_keeps_value_when_refresh_fails():
+    loader = MockSecretLoader(["secret", ValueError("Keyvault unavailable")])
+    cache = SecretCache(loader.load, ttl=60, refresh_ahead=60)
+
+    await cache.get()
+    assert await cache.get() == "secret"
+    await cache.background_refresh
+    assert await cache.get() == "secret"
+
+    cache.invalidate()
+    with pytest.raises(ValueError, match="Keyvault unavailable"):
+        await cache.get()
+
+
+class MockKeyvaultClient:
+    def __init__(self, secret_key):
+        self.versions = []
+        self.calls = 0
+        self.add_version(secret_key)
+
+    def add_version(self, secret_key, age=0):
+        created_on = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=age)
+        properties = SimpleNamespace(version=str(len(self.versions)), created_on=created_on, enabled=True)
+        self.versions.append(SimpleNamespace(properties=properties, value=secret_key))
+
+    async def get_secret(self, name, version=None):
+        self.calls += 1
+        if version is None:
+            return self.versions[-1]
+        return next(secret for secret in self.versions if secret.properties.version == version)
+
+    async def list_properties_of_secret_versions(self, name):
+        for secret in self.versions:
+            yield secret.properties
+
+
+async def create_token(authenticator):
+    return await authenticator.generate_jwt_token(Account(username="user", password="password"))
+
+
+@pytest.mark.asyncio
+async def test_jwt_authenticator_accepts_previous_secret_key_during_grace_period():
+    app = Quart(__name__)
+    keyvault_client = MockKeyvaultClient("old-secret-key-with-enough-length")
+    app.config[CONFIG_KEYVAULT_CLIENT] = keyvault_client
+    async with app.app_context():
+        # Two workers, which load the secret keys at different times
+        worker = JWTAuthenticator(secret_ttl=60, secret_refresh_ahead=0, min_refresh_interval=0)
+        other_worker = JWTAuthenticator(secret_ttl=60, secret_refresh_ahead=0, min_refresh_interval=0)
+        old_token = await create_token(worker)
+        await other_worker.decode_jwt(old_token)
+        await worker.decode_jwt(old_token)
+        # The keys are loaded once per worker
+        assert keyvault_client.calls == 2
+
+        keyvault_client.add_version("new-secret-key-with-enough-length")
+        worker.secret_keys_cache.invalidate()
+        new_token = await create_token(worker)
+        await worker.decode_jwt(new_token)
+        await worker.decode_jwt(old_token)
+        # The other worker still has the old key cached, and loads the new key for a token signed with it
+        await other_worker.decode_jwt(old_token)
+        await other_worker.decode_jwt(new_token)
+        await other_worker.decode_jwt(old_token)
+
+        forged_token = jwt.encode(
+            {"username": "user", "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+            "forged-secret-key-with-enough-length",
+            algorithm="HS256",
+        )
+        with pytest.raises(ValueError, match="Invalid token"):
+            await worker.decode_jwt(forged_token)
+
+
+@pytest.mark.asyncio
+async def test_jwt_authenticator_rejects_previous_secret_key_after_grace_period():
+    app = Quart(__name__)
+    keyvault_client = MockKeyvaultClient("old-secret-key-with-enough-length")
+    app.config[CONFIG_KEYVAULT_CLIENT] = keyvault_client
+    async with app.app_context():
+        authenticator = JWTAuthenticator(secret_ttl=60, secret_refresh_ahead=0, grace_period=60)
+        old_token = await create_token(authenticator)
+
+        keyvault_client.add_version("new-secret-key-with-enough-length", age=120)
+        authenticator.secret_keys_cache.invalidate()
+        await authenticator.decode_jwt(await create_token(authenticator))
+        assert authenticator.secret_keys_cache.value.previous is None
+        calls = keyvault_client.calls
+
+        # A token signed with an unknown key does not reload the keys more than once per interval
+        with pytest.raises(ValueError, match="Invalid token"):
+            await authenticator.decode_jwt(old_token)
+        assert keyvault_client.calls == calls
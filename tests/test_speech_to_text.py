@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import azure.cognitiveservices.speech as speechsdk
+import pytest
+from speech.speech_to_text import SpeechAsync
+
+
+def make_event(text):
+    return SimpleNamespace(result=SimpleNamespace(text=text))
+
+
+@pytest.mark.asyncio
+async def test_speech_async_delivers_results_from_recognizer_threads():
+    speech_config = speechsdk.SpeechConfig(auth_token="token", region="southeastasia")
+    stt_async = await SpeechAsync.create(speech_config)
+
+    def recognize():
+        stt_async.recognizing_cb(make_event("hello"))
+        stt_async.recognized_cb(make_event("hello world"))
+
+    thread = threading.Thread(target=recognize)
+    thread.start()
+    results = [await asyncio.wait_for(stt_async.getQueue().get(), timeout=1) for _ in range(2)]
+    thread.join()
+
+    assert results == [{"text": "hello", "is_final": False}, {"text": "hello world ", "is_final": True}]
+    assert stt_async.finished_recognising
+
+
+@pytest.mark.asyncio
+async def test_finish_recognition_keeps_event_loop_responsive(mock_speech_recognizer):
+    stt_async = await SpeechAsync.create(speechsdk.SpeechConfig(auth_token="token", region="southeastasia"))
+    recognizer = stt_async.getSpeechRecognizer()
+
+    def finish_recognizing():
+        # The recognizer takes a while to recognize the end of the audio after the stream is closed
+        threading.Event().wait(0.1)
+        recognizer.recognizing.fire(make_event("good"))
+        recognizer.recognized.fire(make_event("good morning"))
+        recognizer.session_stopped.fire(SimpleNamespace())
+
+    stt_async.getStream().on_close = lambda: threading.Thread(target=finish_recognizing).start()
+
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    await stt_async.finishRecognition(timeout=1)
+    ticker.cancel()
+
+    assert ticks >= 5
+    results = [stt_async.getQueue().get_nowait() for _ in range(stt_async.getQueue().qsize())]
+    assert results == [{"text": "good", "is_final": False}, {"text": "good morning ", "is_final": True}]
+
+
+@pytest.mark.asyncio
+async def test_finish_recognition_queues_final_result_on_timeout(mock_speech_recognizer):
+    stt_async = await SpeechAsync.create(speechsdk.SpeechConfig(auth_token="token", region="southeastasia"))
+    stt_async.recognizing_cb(make_event("good"))
+
+    await stt_async.finishRecognition(timeout=0.05)
+
+    results = [stt_async.getQueue().get_nowait() for _ in range(stt_async.getQueue().qsize())]
+    assert results == [{"text": "good", "is_final": False}, {"text": "good", "is_final": True}]
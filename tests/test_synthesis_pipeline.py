@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from speech.synthesis_pipeline import SynthesisPipeline
+
+
+class MockTextToSpeech:
+    def __init__(self, delays: dict[str, float]):
+        self.delays = delays
+
+    async def readTextAsync(self, text, encode, language=None):
+        await asyncio.sleep(self.delays[text])
+        return f"audio({text})"
+
+
+@pytest.mark.asyncio
+async def test_synthesis_pipeline_keeps_sentence_order():
+    pipeline = SynthesisPipeline(MockTextToSpeech({"First. ": 0.1, "Second. ": 0.01, "Third.": 0.05}), "english")
+    for sentence in ["First. ", "Second. ", "Third."]:
+        pipeline.submit(sentence)
+
+    # The second sentence finishes first, but has to wait for the first one
+    await asyncio.sleep(0.03)
+    assert pipeline.ready() == []
+
+    results = [result async for result in pipeline.drain()]
+    assert results == [
+        ("First. ", "audio(First. )"),
+        ("Second. ", "audio(Second. )"),
+        ("Third.", "audio(Third.)"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_synthesis_pipeline_overlaps_synthesis():
+    pipeline = SynthesisPipeline(MockTextToSpeech({"One. ": 0.1, "Two. ": 0.1, "Three.": 0.1}), "english")
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for sentence in ["One. ", "Two. ", "Three."]:
+        pipeline.submit(sentence)
+    results = [result async for result in pipeline.drain()]
+
+    assert len(results) == 3
+    assert loop.time() - start < 0.25
+
+
+@pytest.mark.asyncio
+async def test_synthesis_pipeline_cancel():
+    pipeline = SynthesisPipeline(MockTextToSpeech({"Slow.": 10}), "english")
+    pipeline.submit("Slow.")
+    task = pipeline.pending[0][1]
+    pipeline.cancel()
+    await asyncio.sleep(0)
+
+    assert not pipeline.pending
+    assert task.cancelled()
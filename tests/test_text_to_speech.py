@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import os
+import time
+
+import azure.cognitiveservices.speech
+import pytest
+import pytest_asyncio
+from config import (
+    CONFIG_CREDENTIAL,
+    CONFIG_SPEECH_SERVICE_ID,
+    CONFIG_SPEECH_SERVICE_LOCATION,
+)
+from quart import Quart
+from speech.audio_cache import AudioCache
+from speech.text_to_speech import TextToSpeech
+
+from .mocks import (
+    MockAudio,
+    MockAzureCredential,
+    MockSynthesisResult,
+    mock_speak_text_cancelled,
+)
+
+
+@pytest_asyncio.fixture
+async def text_to_speech():
+    app = Quart(__name__)
+    app.config[CONFIG_SPEECH_SERVICE_ID] = "test-id"
+    app.config[CONFIG_SPEECH_SERVICE_LOCATION] = "eastus"
+    app.config[CONFIG_CREDENTIAL] = MockAzureCredential()
+    async with app.app_context():
+        tts = await TextToSpeech.create(max_workers=2, synthesizers_per_voice=2)
+        yield tts
+        tts.close()
+
+
+def mock_speak_text_slow(self, text):
+    time.sleep(0.2)
+    return MockSynthesisResult(MockAudio(text.encode()))
+
+
+@pytest.mark.asyncio
+async def test_read_text_async_does_not_block_event_loop(monkeypatch, text_to_speech):
+    monkeypatch.setattr(azure.cognitiveservices.speech.SpeechSynthesizer, "speak_text_async", mock_speak_text_slow)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    synthesis = asyncio.gather(*[text_to_speech.readTextAsync(f"Hello {i}", True, "english") for i in range(4)])
+    await asyncio.sleep(0.05)
+    stats = text_to_speech.getStats()
+    assert (stats["max_workers"], stats["queued"], stats["in_flight"]) == (2, 2, 2)
+    assert stats["synthesizers"]["english"]["checked_out"] == 2
+
+    results = await synthesis
+    ticker_task.cancel()
+
+    assert [base64.b64decode(result).decode() for result in results] == [f"Hello {i}" for i in range(4)]
+    assert ticks > 20
+    stats = text_to_speech.getStats()
+    assert (stats["queued"], stats["in_flight"]) == (0, 0)
+    # Two synthesizers are pre-warmed per voice, and they are reused rather than rebuilt for every sentence
+    assert stats["synthesizers"]["english"] == {"size": 2, "idle": 2, "checked_out": 0, "created": 2}
+
+
+@pytest.mark.asyncio
+async def test_read_text_async_cancelled(monkeypatch, text_to_speech):
+    monkeypatch.setattr(azure.cognitiveservices.speech.SpeechSynthesizer, "speak_text_async", mock_speak_text_cancelled)
+
+    with pytest.raises(Exception, match="Speech synthesis canceled"):
+        await text_to_speech.readTextAsync("Hello", False, "english")
+    assert text_to_speech.getStats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_read_text_async_reuses_cached_audio(monkeypatch, tmp_path):
+    synthesized = []
+
+    def mock_speak_text_counted(self, text):
+        synthesized.append(text)
+        return MockSynthesisResult(MockAudio(text.encode()))
+
+    monkeypatch.setattr(azure.cognitiveservices.speech.SpeechSynthesizer, "speak_text_async", mock_speak_text_counted)
+
+    app = Quart(__name__)
+    app.config[CONFIG_SPEECH_SERVICE_ID] = "test-id"
+    app.config[CONFIG_SPEECH_SERVICE_LOCATION] = "eastus"
+    app.config[CONFIG_CREDENTIAL] = MockAzureCredential()
+    async with app.app_context():
+        tts = await TextToSpeech.create(
+            max_workers=2, synthesizers_per_voice=1, audio_cache=AudioCache(max_entries=8, directory=str(tmp_path))
+        )
+        first = await tts.readTextAsync("**Hello**  there", True, "english")
+        second = await tts.readTextAsync("Hello there", True, "english")
+        assert first == second
+        assert synthesized == ["Hello  there"]
+        assert tts.getStats()["audio_cache"]["memory_hits"] == 1
+        tts.close()
+
+        # A new instance with an empty memory tier still finds the audio on disk
+        tts = await TextToSpeech.create(
+            max_workers=2, synthesizers_per_voice=1, audio_cache=AudioCache(max_entries=8, directory=str(tmp_path))
+        )
+        assert await tts.readTextAsync("Hello there", False, "english") == b"Hello  there"
+        assert len(synthesized) == 1
+        assert tts.getStats()["audio_cache"]["disk_hits"] == 1
+        tts.close()
+
+
+def test_audio_cache_prunes_least_recently_used_files(tmp_path):
+    audio_cache = AudioCache(max_entries=0, directory=str(tmp_path), max_disk_bytes=350)
+    for index in range(3):
+        audio_cache.set(f"key{index}", b"a" * 100)
+        # Modification times order the files, so they are spaced out on filesystems with coarse timestamps
+        os.utime(audio_cache.getPath(str(tmp_path), f"key{index}"), (index, index))
+    assert audio_cache.get("key0") is not None
+
+    audio_cache.set("key3", b"a" * 100)
+    # key0 was read since it was written, so key1 is the least recently used file
+    assert sorted(os.listdir(tmp_path)) == ["key0.mp3", "key2.mp3", "key3.mp3"]
+    stats = audio_cache.getStats()
+    assert stats["disk_bytes"] == 300
+    assert stats["disk_evictions"] == 1
+
+    # A new instance measures the files left by the previous one
+    assert AudioCache(max_entries=0, directory=str(tmp_path), max_disk_bytes=350).disk_bytes == 300
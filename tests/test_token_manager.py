@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import azure.cognitiveservices.speech as speechsdk
+import pytest
+from config import (
+    CONFIG_CREDENTIAL,
+    CONFIG_SPEECH_SERVICE_ID,
+    CONFIG_SPEECH_SERVICE_LOCATION,
+)
+from quart import Quart
+from speech.recognizer_pool import RecognizerPool
+from speech.text_to_speech import TextToSpeech
+from speech.token_manager import SpeechTokenManager
+
+from .mocks import MockAzureCredential, MockToken
+
+
+class MockRotatingCredential:
+    def __init__(self, lifetimes):
+        self.lifetimes = list(lifetimes)
+        self.calls = 0
+
+    async def get_token(self, scope):
+        self.calls += 1
+        lifetime = self.lifetimes.pop(0) if self.lifetimes else None
+        if isinstance(lifetime, Exception):
+            raise lifetime
+        if lifetime is None:
+            return MockToken("token-last", 9999999999, "")
+        return MockToken(f"token-{self.calls}", time.time() + lifetime, "")
+
+
+@pytest.mark.asyncio
+async def test_speech_token_manager_refreshes_ahead_of_expiry():
+    credential = MockRotatingCredential([1.05, ConnectionError("Unable to get token"), 1.05])
+    manager = SpeechTokenManager(credential, "resource", refresh_ahead=1, retry_interval=0.01)
+    auth_tokens = []
+    manager.subscribe(auth_tokens.append)
+    await manager.start()
+    assert manager.getAuthToken() == "aad#resource#token-1"
+
+    await asyncio.sleep(0.3)
+    await manager.close()
+    # The failed refresh is retried, and subscribers are only called when the token changes
+    assert auth_tokens == ["aad#resource#token-1", "aad#resource#token-3", "aad#resource#token-last"]
+    stats = manager.getStats()
+    assert (stats["refreshes"], stats["failures"]) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_speech_token_manager_updates_pooled_synthesizers_and_recognizers(mock_speech_recognizer):
+    app = Quart(__name__)
+    app.config[CONFIG_SPEECH_SERVICE_ID] = "test-id"
+    app.config[CONFIG_SPEECH_SERVICE_LOCATION] = "eastus"
+    app.config[CONFIG_CREDENTIAL] = MockAzureCredential()
+    async with app.app_context():
+        tts = await TextToSpeech.create(max_workers=1, synthesizers_per_voice=1)
+    recognizer_pool = RecognizerPool(speechsdk.SpeechConfig(auth_token="old", region="eastus"), min_size=1)
+    await recognizer_pool.start()
+    session = recognizer_pool.acquire()
+
+    manager = SpeechTokenManager(MockRotatingCredential([None]), "test-id")
+    manager.subscribe(tts.updateAuthToken)
+    manager.subscribe(recognizer_pool.updateAuthToken)
+    await manager.start()
+    await manager.close()
+
+    pool = tts.synthesizer_pools["english"]
+    with pool.checkout() as speech_synthesizer:
+        assert speech_synthesizer.authorization_token == "aad#test-id#token-last"
+    assert pool.speech_config.authorization_token == "aad#test-id#token-last"
+    assert session.getSpeechRecognizer().authorization_token == "aad#test-id#token-last"
+    assert recognizer_pool.speech_config.authorization_token == "aad#test-id#token-last"
+    tts.close()
+    await recognizer_pool.close()
@@ -0,0 +1,78 @@
+import pytest
+import pytest_asyncio
+from config import (
+    CONFIG_TRANSLATOR_SERVICE_API_KEY,
+    CONFIG_TRANSLATOR_SERVICE_ENDPOINT,
+    CONFIG_TRANSLATOR_SERVICE_LOCATION,
+)
+from quart import Quart
+from speech import translate
+from speech.translate import Translator
+
+
+class MockTranslatorResponse:
+    def __init__(self, body):
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self):
+        return self.body
+
+
+class MockTranslatorSession:
+    def __init__(self):
+        self.requests = []
+
+    def post(self, url, params, headers, json):
+        self.requests.append((params["to"], [item["text"] for item in json]))
+        return MockTranslatorResponse(
+            [{"translations": [{"text": f"{params['to']}:{item['text']}", "to": params["to"]}]} for item in json]
+        )
+
+
+@pytest_asyncio.fixture
+async def translator():
+    app = Quart(__name__)
+    app.config[CONFIG_TRANSLATOR_SERVICE_API_KEY] = "key"
+    app.config[CONFIG_TRANSLATOR_SERVICE_ENDPOINT] = "https://api.cognitive.microsofttranslator.com"
+    app.config[CONFIG_TRANSLATOR_SERVICE_LOCATION] = "southeastasia"
+    async with app.app_context():
+        yield Translator(session=MockTranslatorSession())
+
+
+@pytest.mark.asyncio
+async def test_translate_batch_uses_translation_memory(translator):
+    translations = await translator.translateBatch(["Hello.", "Goodbye.", "Hello."], "en", "ms")
+    assert translations == ["ms:Hello.", "ms:Goodbye.", "ms:Hello."]
+    assert translator.session.requests == [("ms", ["Hello.", "Goodbye."])]
+
+    assert await translator.translate("Goodbye.", "ms") == "ms:Goodbye."
+    assert await translator.translate("Goodbye.", "ta") == "ta:Goodbye."
+    assert await translator.translateToEng("Selamat pagi.", "ms") == "en:Selamat pagi."
+    assert translator.session.requests[1:] == [("ta", ["Goodbye."]), ("en", ["Selamat pagi."])]
+    assert translator.getStats()["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_translate_batch_splits_large_batches(monkeypatch, translator):
+    monkeypatch.setattr(translate, "MAX_BATCH_TEXTS", 2)
+    monkeypatch.setattr(translate, "MAX_BATCH_CHARACTERS", 8)
+
+    texts = ["one", "two", "three", "four", "a much longer sentence"]
+    translations = await translator.translateBatch(texts, "en", "zh-Hans")
+
+    assert translations == [f"zh-Hans:{text}" for text in texts]
+    assert [batch for _, batch in translator.session.requests] == [
+        ["one", "two"],
+        ["three"],
+        ["four"],
+        ["a much longer sentence"],
+    ]
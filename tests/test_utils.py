@@ -0,0 +1,16 @@
+from utils.utils import Utils, _detect_language
+
+
+def test_get_language_reuses_detector():
+    Utils.configure_language_detector()
+    detector = Utils.get_language_detector()
+
+    assert Utils.get_language("What are the symptoms of dengue fever?") == "english"
+    assert Utils.get_language("糖尿病患者应该吃什么？") == "chinese"
+    assert Utils.get_language("What are the symptoms of dengue fever?") == "english"
+    assert Utils.get_language_detector() is detector
+    assert _detect_language.cache_info().hits == 1
+
+
+def test_get_language_defaults_to_english():
+    assert Utils.get_language("12345") == "english"